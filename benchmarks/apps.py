@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import requests
+import psutil
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Application directory and the port each service advertises as its SERVICE_ADDRESS
+APPS = {
+    "customer-operational": ("customer-domain/applications/operational", 8001),
+    "customer-analytical": ("customer-domain/applications/analytical", 8000),
+    "weather-operational": ("weather-domain/applications/operational", 8006),
+    "weather-analytical": ("weather-domain/applications/analytical", 8005),
+    "telemetry-processor": ("telemetry-processor-application", 8008),
+    "data-scientist": ("data-scientist-external-application", 8010),
+}
+
+STARTUP_TIMEOUT = 60  # seconds to wait for an application to answer on /
+RSS_SAMPLE_INTERVAL = 0.05  # seconds between peak RSS samples
+
+
+class AppProcess:
+    """
+    One FastAPI service run under uvicorn in its own process, with its own working
+    directory for input files and SQLite databases. Every service has a top-level main
+    module, a utilities package and module-level Prometheus metrics, so they cannot share
+    an interpreter.
+    """
+
+    def __init__(self, name, workdir, env=None):
+        app_dir, self.port = APPS[name]
+        self.name = name
+        self.app_dir = os.path.join(REPO_ROOT, app_dir)
+        self.workdir = workdir
+        self.env = dict(os.environ, METRICS_PORT="0", PYTHONUNBUFFERED="1", **(env or {}))
+        self.process = None
+        self.log_path = os.path.join(workdir, f"{name}.log")
+        self._log = None
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
+
+    def start(self, timeout=STARTUP_TIMEOUT):
+        os.makedirs(self.workdir, exist_ok=True)
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "--app-dir", self.app_dir, "--port", str(self.port), "--log-level", "warning", "main:app"],
+            cwd=self.workdir,
+            env=self.env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with status {self.process.returncode}; see {self.log_path}")
+            try:
+                requests.get(self.url, timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{self.name} did not start within {timeout}s; see {self.log_path}")
+
+    def stop(self, timeout=15):
+        if self.process is not None and self.process.poll() is None:
+            # SIGTERM lets uvicorn run the shutdown handlers, which delete the consumers
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def rss(self):
+        """Resident set size of the service and its worker processes, in bytes."""
+        try:
+            process = psutil.Process(self.process.pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+        except psutil.Error:
+            return 0
+
+
+class PeakRssSampler:
+    """Samples the combined RSS of a set of processes in the background and keeps the peak."""
+
+    def __init__(self, apps, interval=RSS_SAMPLE_INTERVAL):
+        self.apps = apps
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = self.sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.sample())
+
+    def sample(self):
+        return sum(app.rss() for app in self.apps)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, self.sample())
@@ -0,0 +1,112 @@
+import csv
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+FIRST_NAMES = ["Ada", "Grace", "Alan", "Edsger", "Barbara", "Donald", "Frances", "Ken", "Radia", "Tim"]
+CITIES = ["Helsinki", "Lisbon", "Nairobi", "Osaka", "Quito", "Reykjavik", "Santiago", "Toronto"]
+
+
+def customer_record(index, rng):
+    return {
+        "customer_id": index,
+        "name": f"{rng.choice(FIRST_NAMES)} {index}",
+        "email": f"customer{index}@example.com",
+        "city": rng.choice(CITIES),
+        "signup_date": (date(2020, 1, 1) + timedelta(days=index % 1500)).isoformat(),
+        "lifetime_value": round(rng.uniform(0, 10000), 2),
+        "orders": [{"order_id": f"{index}-{n}", "amount": round(rng.uniform(1, 500), 2)} for n in range(rng.randint(1, 5))],
+    }
+
+
+def write_customer_array(path, total_bytes, rng, first_index=0):
+    """Write one JSON array of customer records of roughly total_bytes; returns the record count."""
+    records = 0
+    with open(path, "w") as f:
+        f.write("[")
+        size = 1
+        while size < total_bytes:
+            encoded = json.dumps(customer_record(first_index + records, rng))
+            f.write("," + encoded if records else encoded)
+            size += len(encoded) + bool(records)
+            records += 1
+        f.write("]")
+    return records
+
+
+def write_customer_lines(path, total_bytes, seed=0):
+    """Write customer records as newline-delimited JSON; returns the record count."""
+    rng = random.Random(seed)
+    records = size = 0
+    with open(path, "w") as f:
+        while size < total_bytes:
+            encoded = json.dumps(customer_record(records, rng)) + "\n"
+            f.write(encoded)
+            size += len(encoded)
+            records += 1
+    return records
+
+
+def write_customer_files(directory, total_bytes, files, seed=0):
+    """
+    Write files JSON arrays of synthetic customer records that add up to roughly
+    total_bytes, as the customer operational service expects them in its working
+    directory. Returns the number of records and bytes written.
+    """
+    rng = random.Random(seed)
+    per_file = max(total_bytes // max(files, 1), 1)
+    records = written = 0
+
+    for file_index in range(files):
+        path = os.path.join(directory, f"customers_{file_index:05d}.json")
+        records += write_customer_array(path, per_file, rng, records)
+        written += os.path.getsize(path)
+
+    return records, written
+
+
+def weather_row(minute, rng, start=datetime(2000, 1, 1)):
+    return (start + timedelta(minutes=minute)).isoformat(), round(rng.gauss(12, 9), 1), round(max(rng.gauss(2, 4), 0), 1)
+
+
+def write_weather_files(directory, total_bytes, seed=0):
+    """
+    Write temperature.csv and precipitation.csv with one reading per minute, joined on
+    'date' by the weather operational service. Returns the number of merged rows and
+    bytes written.
+    """
+    rng = random.Random(seed)
+    # Each reading is roughly 60 bytes across both files
+    readings = max(total_bytes // 60, 1)
+
+    with open(os.path.join(directory, "temperature.csv"), "w", newline="") as temperature, \
+            open(os.path.join(directory, "precipitation.csv"), "w", newline="") as precipitation:
+        temperature_writer = csv.writer(temperature)
+        precipitation_writer = csv.writer(precipitation)
+        temperature_writer.writerow(["date", "temperature"])
+        precipitation_writer.writerow(["date", "precipitation"])
+        for minute in range(readings):
+            timestamp, temperature_value, precipitation_value = weather_row(minute, rng)
+            temperature_writer.writerow([timestamp, temperature_value])
+            precipitation_writer.writerow([timestamp, precipitation_value])
+
+    written = sum(os.path.getsize(os.path.join(directory, name)) for name in ("temperature.csv", "precipitation.csv"))
+    return readings, written
+
+
+def write_merged_weather_csv(path, total_bytes, seed=0):
+    """
+    Write the merged date,temperature,precipitation CSV the weather analytical service
+    fetches from MinIO; returns the number of rows.
+    """
+    rng = random.Random(seed)
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "temperature", "precipitation"])
+        while f.tell() < total_bytes:
+            for _ in range(1000):
+                writer.writerow(weather_row(rows, rng))
+                rows += 1
+    return rows
@@ -0,0 +1,288 @@
+"""
+End-to-end benchmark of the mesh against local stand-ins.
+
+The real services run as uvicorn processes; the Kafka REST Proxy, MinIO, Vault and Data
+Lichen are replaced by the in-process fakes of benchmarks.standins, listening on the
+addresses the services have configured. The synthetic datasets go through the full
+publish -> consume -> fetch -> store -> query flow, and every stage reports records/s,
+bytes/s, p50/p99 latency and the peak RSS of the services involved.
+
+    python -m benchmarks.e2e --size-mb 100 --files 50 --output results.json
+
+Run it from the repository root with an interpreter that has the services' dependencies
+plus uvicorn and psutil. The fakes bind the services' fixed ports (80 for the REST Proxy).
+
+Consume stages are measured from the start of the stage that produced their records,
+since consumers poll concurrently with the producer; their latencies are per record,
+from produce to the commit of the consuming group.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import requests
+from benchmarks import datasets
+from benchmarks.apps import AppProcess, PeakRssSampler
+from benchmarks.standins import DataLichenStub, FakeKafkaRestProxy, FakeS3, VaultStub
+
+REQUEST_TIMEOUT = 600  # seconds allowed for one synchronous service call
+JOB_POLL_INTERVAL = 0.05  # seconds between /jobs/{id} polls
+TELEMETRY_FLUSH_DELAY_MS = 500  # span batch delay of the services while benchmarking
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class StageResult:
+    def __init__(self, name, apps):
+        self.name = name
+        self.apps = apps
+        self.status = "ok"
+        self.records = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.latencies = []
+        self.peak_rss = 0
+
+    def as_dict(self):
+        seconds = self.seconds or None
+        return {
+            "stage": self.name,
+            "status": self.status,
+            "records": self.records,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 4),
+            "records_per_second": self.records / seconds if seconds else None,
+            "bytes_per_second": self.bytes / seconds if seconds else None,
+            "p50_seconds": percentile(self.latencies, 0.50),
+            "p99_seconds": percentile(self.latencies, 0.99),
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+
+class Benchmark:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.kafka = FakeKafkaRestProxy()
+        self.s3 = FakeS3()
+        self.stand_ins = [self.kafka, self.s3, VaultStub(), DataLichenStub()]
+        env = {"TELEMETRY_EXPORT_DELAY_MS": str(TELEMETRY_FLUSH_DELAY_MS)}
+        self.apps = {
+            name: AppProcess(name, os.path.join(workdir, name), env)
+            for name in ("customer-operational", "customer-analytical", "weather-operational", "weather-analytical", "telemetry-processor", "data-scientist")
+        }
+        self.results = []
+        self.run_started = None
+        self.customer_records = self.customer_bytes = 0
+        self.weather_rows = self.weather_bytes = 0
+
+    def run(self):
+        self.run_started = time.monotonic()
+        for stand_in in self.stand_ins:
+            stand_in.start()
+        try:
+            self.prepare_datasets()
+            for app in self.apps.values():
+                app.start(self.args.startup_timeout)
+            self.run_stages()
+        finally:
+            for app in self.apps.values():
+                app.stop()
+            for stand_in in self.stand_ins:
+                stand_in.stop()
+        return self.results
+
+    def prepare_datasets(self):
+        size = int(self.args.size_mb * 1024 * 1024)
+        customer_dir = self.apps["customer-operational"].workdir
+        weather_dir = self.apps["weather-operational"].workdir
+        os.makedirs(customer_dir, exist_ok=True)
+        os.makedirs(weather_dir, exist_ok=True)
+        self.customer_records, self.customer_bytes = datasets.write_customer_files(customer_dir, size, self.args.files)
+        self.weather_rows, self.weather_bytes = datasets.write_weather_files(weather_dir, size)
+
+    def stage(self, name, apps, measure):
+        """Run measure(result) under the peak RSS sampler; a failure is reported, not raised."""
+        result = StageResult(name, apps)
+        started = time.monotonic()
+        try:
+            with PeakRssSampler([self.apps[app] for app in apps]) as sampler:
+                measure(result)
+            result.peak_rss = sampler.peak
+        except Exception as e:
+            result.status = f"failed: {e}"
+            if self.args.verbose:
+                traceback.print_exc()
+        if not result.seconds:
+            result.seconds = time.monotonic() - started
+        self.results.append(result)
+        print(format_row(result.as_dict()), flush=True)
+        return result
+
+    def call(self, app, path, result, repeat=1):
+        """GET a service endpoint repeat times, recording each request's latency."""
+        responses = []
+        for _ in range(repeat):
+            started = time.monotonic()
+            response = requests.get(f"{self.apps[app].url}{path}", timeout=REQUEST_TIMEOUT)
+            result.latencies.append(time.monotonic() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"{app} {path} returned {response.status_code}: {response.text[:200]}")
+            responses.append(response)
+        return responses
+
+    def run_job(self, app, path, result):
+        """Start a job through a service endpoint and wait for it; its latency is the job's duration."""
+        started = time.monotonic()
+        job_id = self.call(app, path, result)[0].json()["job_id"]
+        result.latencies.clear()
+        deadline = started + self.args.timeout
+        while True:
+            job = requests.get(f"{self.apps[app].url}/jobs/{job_id}", timeout=REQUEST_TIMEOUT).json()
+            if job["status"] not in ("queued", "running"):
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{app} {path} job {job_id} did not finish within {self.args.timeout}s")
+            time.sleep(JOB_POLL_INTERVAL)
+        result.latencies.append(time.monotonic() - started)
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"{app} {path} job {job_id} {job['status']}: {job['error']}")
+        return job
+
+    def mark(self, group, topic):
+        """Position of topic and of group's latency samples, taken before records are produced."""
+        return self.kafka.end_offset(topic), len(self.kafka.commit_latencies(group, topic)), time.monotonic()
+
+    def consumed(self, group, topic, mark):
+        """Measure a consumer group catching up with everything produced to topic since mark."""
+        start_offset, latency_start, since = mark
+
+        def measure(result):
+            end_offset = self.kafka.end_offset(topic)
+            if not self.kafka.wait_for_commit(group, topic, end_offset, self.args.timeout):
+                raise RuntimeError(f"{group} committed {self.kafka.committed(group, topic)}/{end_offset} of {topic} within {self.args.timeout}s")
+            result.seconds = time.monotonic() - since
+            result.records = end_offset - start_offset
+            result.bytes = self.kafka.topic_bytes(topic, start_offset, end_offset)
+            result.latencies = self.kafka.commit_latencies(group, topic, latency_start)
+        return measure
+
+    def run_stages(self):
+        args = self.args
+
+        # Customer domain: operational files -> MinIO + Kafka -> analytical SQLite -> published objects
+        mark = self.mark("customer-domain-operational-data-consumer", "domain-customer-operational-data")
+        def store_customer(result):
+            self.call("customer-operational", "/store-operational-data", result)
+            result.records, result.bytes = self.customer_records, self.customer_bytes
+        self.stage("customer-operational.publish", ["customer-operational"], store_customer)
+        self.stage("customer-analytical.consume", ["customer-analytical"],
+                   self.consumed("customer-domain-operational-data-consumer", "domain-customer-operational-data", mark))
+
+        def register_customer(result):
+            self.run_job("customer-analytical", "/register-data-to-data-lichen", result)
+            result.records = self.s3.object_count("customer-domain-operational-data")
+            result.bytes = self.s3.bucket_bytes("customer-domain-operational-data")
+        self.stage("customer-analytical.fetch-store", ["customer-analytical"], register_customer)
+
+        mark = self.mark("customer-domain-data-consumer", "customer-domain-data")
+        def publish_customer(result):
+            self.call("customer-analytical", "/publish-domains-data", result)
+            result.records = self.s3.object_count("custom-domain-analytical-data")
+            result.bytes = self.s3.bucket_bytes("custom-domain-analytical-data")
+        self.stage("customer-analytical.publish", ["customer-analytical"], publish_customer)
+        self.stage("weather-analytical.consume-customer", ["weather-analytical"],
+                   self.consumed("customer-domain-data-consumer", "customer-domain-data", mark))
+
+        # Weather domain: merged CSV -> MinIO (multipart) + Kafka -> analytical
+        mark = self.mark("weather-domain-operational-data-consumers", "domain-weather-operational-data")
+        def store_weather(result):
+            self.call("weather-operational", "/store-operational-data", result)
+            result.records, result.bytes = self.weather_rows, self.weather_bytes
+        self.stage("weather-operational.publish", ["weather-operational"], store_weather)
+        self.stage("weather-analytical.consume-operational", ["weather-analytical"],
+                   self.consumed("weather-domain-operational-data-consumers", "domain-weather-operational-data", mark))
+
+        def register_weather(result):
+            self.run_job("weather-analytical", "/register-data-to-data-lichen", result)
+            result.records = self.s3.object_count("weather-domain-operational-data")
+            result.bytes = self.s3.bucket_bytes("weather-domain-operational-data")
+        self.stage("weather-analytical.fetch-store", ["weather-analytical"], register_weather)
+
+        # Query side
+        def query(result):
+            responses = self.call("data-scientist", "/query-data/custom-domain-analytical-data", result, repeat=args.queries)
+            result.records = sum(len(response.json()["objects"]) for response in responses)
+            result.bytes = sum(len(response.content) for response in responses)
+        self.stage("data-scientist.query", ["data-scientist"], query)
+
+        # Telemetry: every span exported by the services above, once their batches have flushed
+        time.sleep(2 * TELEMETRY_FLUSH_DELAY_MS / 1000)
+        self.stage("telemetry-processor.consume", ["telemetry-processor"],
+                   self.consumed("telemetry-data-consumer", "telemetry-data", (0, 0, self.run_started)))
+
+
+def format_row(row):
+    def number(value, scale=1, digits=1):
+        return "-" if value is None else f"{value / scale:.{digits}f}"
+
+    return (
+        f"{row['stage']:<42} {row['records']:>10} {number(row['records_per_second']):>12} "
+        f"{number(row['bytes_per_second'], 1024 * 1024, 2):>10} {number(row['p50_seconds'], 0.001):>10} "
+        f"{number(row['p99_seconds'], 0.001):>10} {number(row['peak_rss_bytes'], 1024 * 1024):>10}  {row['status']}"
+    )
+
+
+HEADER = f"{'stage':<42} {'records':>10} {'records/s':>12} {'MB/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'RSS MB':>10}  status"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--size-mb", type=float, default=10, help="input size of each domain's operational data")
+    parser.add_argument("--files", type=int, default=20, help="number of customer JSON files the input is split into")
+    parser.add_argument("--queries", type=int, default=10, help="data scientist queries issued")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds a consumer group may take to catch up")
+    parser.add_argument("--startup-timeout", type=float, default=60, help="seconds a service may take to start")
+    parser.add_argument("--workdir", help="keep service working directories and logs here instead of a temporary directory")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="print tracebacks of failed stages")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mesh-benchmark-")
+
+    print(HEADER)
+    benchmark = Benchmark(args, workdir)
+    try:
+        results = benchmark.run()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "size_mb": args.size_mb,
+        "files": args.files,
+        "customer_records": benchmark.customer_records,
+        "weather_rows": benchmark.weather_rows,
+        "stages": [result.as_dict() for result in results],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if all(result.status == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+"""
+Micro-benchmarks of the ingest hot paths: save_data_to_sqlite (both domains), the
+weather pandas engine ingest_csv_with_pandas on the same CSV, insert_into_db with
+record_exists, fetch_data_from_minio (the join it does against a byte-string
+concatenation reference), create_metadata, chunker.chunk_json and
+KafkaRESTProxyExporter.serialize_span.
+
+    python -m benchmarks.micro --sizes 1,16,256,1024 --repeat 3
+
+Each application's helpers run in their own process, with the application directory on
+sys.path, because every application ships its own utilities package and metrics. Data
+sizes are in MB; objects are served by the FakeS3 stand-in on an ephemeral port.
+
+Every run is appended to a JSON-lines history file. A case whose best time exceeds the
+median of its last --baseline-runs runs on the same host by more than --threshold is a
+regression, and the command then exits with status 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from benchmarks import datasets
+from benchmarks.apps import REPO_ROOT
+
+SUITE_APPS = {
+    "weather-analytical": "weather-domain/applications/analytical",
+    "customer-analytical": "customer-domain/applications/analytical",
+    "customer-operational": "customer-domain/applications/operational",
+}
+
+MB = 1024 * 1024
+DEFAULT_HISTORY = os.path.join(REPO_ROOT, "benchmarks", "micro-history.jsonl")
+CONCAT_LIMIT_MB = 64  # The concatenation reference is quadratic; larger objects are skipped
+MIN_COMPARABLE_SECONDS = 0.001  # Faster cases are too noisy to flag as regressions
+
+
+class Case:
+    """
+    One timed call. setup() builds fresh state outside the timing for every repetition
+    and its result is passed to run(); teardown() receives it afterwards.
+    """
+
+    def __init__(self, name, run, setup=None, teardown=None, size_bytes=None, items=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+        self.size_bytes = size_bytes
+        self.items = items
+
+    @property
+    def key(self):
+        if self.size_bytes is not None:
+            return f"{self.name}@{self.size_bytes / MB:g}MB"
+        return f"{self.name}@{self.items}"
+
+    def measure(self, repeat):
+        times = []
+        for _ in range(repeat):
+            state = self.setup() if self.setup else None
+            start = time.perf_counter()
+            self.run(state)
+            times.append(time.perf_counter() - start)
+            if self.teardown:
+                self.teardown(state)
+
+        best = min(times)
+        return {
+            "key": self.key,
+            "case": self.name,
+            "bytes": self.size_bytes,
+            "items": self.items,
+            "best_seconds": best,
+            "median_seconds": statistics.median(times),
+            "mb_per_second": self.size_bytes / MB / best if self.size_bytes and best else None,
+            "items_per_second": self.items / best if self.items and best else None,
+        }
+
+
+class Context:
+    """Datasets, the S3 stand-in and scratch space shared by the cases of one suite."""
+
+    def __init__(self, args, scratch):
+        self.args = args
+        self.scratch = scratch
+        self.s3 = None
+        self.minio_client = None
+
+    def dataset(self, kind, size_mb):
+        """Path of a cached synthetic dataset; generated on first use."""
+        path = os.path.join(self.args.data_dir, f"{kind}-{size_mb}mb")
+        if not os.path.exists(path):
+            writers = {
+                "weather-csv": datasets.write_merged_weather_csv,
+                "customer-array": lambda target, size: datasets.write_customer_array(target, size, random.Random(0)),
+                "customer-lines": datasets.write_customer_lines,
+            }
+            writers[kind](path + ".partial", int(size_mb * MB))
+            os.replace(path + ".partial", path)
+        return path
+
+    def read_dataset(self, kind, size_mb):
+        with open(self.dataset(kind, size_mb)) as f:
+            return f.read()
+
+    def storage_address(self):
+        if self.s3 is None:
+            from minio import Minio
+            from benchmarks.standins import FakeS3
+
+            self.s3 = FakeS3(port=0).start()
+            self.minio_client = Minio(f"localhost:{self.s3.port}", access_key="minioadmin", secret_key="minioadmin", secure=False)
+            self.minio_client.make_bucket("benchmark")
+        return f"localhost:{self.s3.port}"
+
+    def upload(self, kind, size_mb, content_type):
+        address = self.storage_address()
+        object_name = f"{kind}-{size_mb}mb"
+        path = self.dataset(kind, size_mb)
+        self.minio_client.fput_object("benchmark", object_name, path, content_type=content_type)
+        return address, object_name
+
+    def fresh_dir(self, name):
+        path = os.path.join(self.scratch, name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def close(self):
+        if self.s3 is not None:
+            self.s3.stop()
+
+
+def storage_infos(count, bucket="benchmark"):
+    return [
+        {
+            "distributedStorageAddress": "localhost:9001",
+            "minio_access_key": "minioadmin",
+            "minio_secret_key": "minioadmin",
+            "bucket_name": bucket,
+            "object_name": f"data_object_{index}.json",
+        }
+        for index in range(count)
+    ]
+
+
+def fetch_by_concatenation(minio_client, bucket_name, object_name):
+    """Reference for fetch_data_from_minio: the byte-string concatenation it replaced."""
+    response = minio_client.get_object(bucket_name, object_name)
+    try:
+        data = b""
+        for chunk in response.stream(32 * 1024):
+            data += chunk
+    finally:
+        response.close()
+        response.release_conn()
+    return data.decode("utf-8")
+
+
+def weather_analytical_cases(context):
+    from utilities import create_metadata, fetch_data_from_minio, ingest_csv_with_pandas, insert_into_db, save_data_to_sqlite
+
+    db_path = os.path.join(context.scratch, "weather_domain.db")
+
+    def fresh_db():
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        return db_path
+
+    for size_mb in context.args.sizes:
+        size = int(size_mb * MB)
+        text = context.read_dataset("weather-csv", size_mb)
+        yield Case("save_data_to_sqlite.weather", lambda db, text=text: save_data_to_sqlite.save_data_to_sqlite(text, db), setup=fresh_db, size_bytes=size)
+        # The pandas engine writes the same rows and rollups from the same text
+        yield Case("ingest_csv_with_pandas.weather", lambda db, text=text: ingest_csv_with_pandas.ingest_csv_with_pandas(io.StringIO(text), db), setup=fresh_db, size_bytes=size)
+        yield Case("create_metadata.weather", lambda _, text=text: create_metadata.create_metadata("", 0, text), size_bytes=size)
+
+        address, object_name = context.upload("weather-csv", size_mb, "text/csv")
+        yield Case(
+            "fetch_data_from_minio.weather.join",
+            lambda _, name=object_name: fetch_data_from_minio.fetch_data_from_minio(address, "minioadmin", "minioadmin", "benchmark", name),
+            size_bytes=size,
+        )
+        if size_mb <= CONCAT_LIMIT_MB:
+            yield Case(
+                "fetch_data_from_minio.weather.concat",
+                lambda _, name=object_name: fetch_by_concatenation(context.minio_client, "benchmark", name),
+                size_bytes=size,
+            )
+
+    records = storage_infos(context.args.records)
+
+    def insert_each(db):
+        for storage_info in records:
+            insert_into_db.insert_into_db(storage_info, db)
+
+    yield Case("insert_into_db.weather", insert_each, setup=fresh_db, items=len(records))
+    yield Case("insert_batch_into_db.weather", lambda db: insert_into_db.insert_batch_into_db(records, db), setup=fresh_db, items=len(records))
+
+
+def customer_analytical_cases(context):
+    from utilities import create_metadata, ensure_table_exists, fetch_data_from_minio, insert_into_db, record_exists, save_data_to_sqlite
+
+    # The customer helpers use fixed database names relative to the working directory
+    def fresh_cwd():
+        os.chdir(context.fresh_dir("customer-analytical"))
+
+    for size_mb in context.args.sizes:
+        size = int(size_mb * MB)
+        text = context.read_dataset("customer-array", size_mb)
+        data = text.encode("utf-8")
+        yield Case("save_data_to_sqlite.customer", lambda _, text=text: save_data_to_sqlite.save_data_to_sqlite(text), setup=fresh_cwd, size_bytes=size)
+        yield Case("save_data_to_sqlite.customer.bytes", lambda _, data=data: save_data_to_sqlite.save_data_to_sqlite(data), setup=fresh_cwd, size_bytes=size)
+        yield Case("create_metadata.customer", lambda _, text=text: create_metadata.create_metadata("", 0, text), size_bytes=size)
+        yield Case("create_metadata.customer.bytes", lambda _, data=data: create_metadata.create_metadata("", 0, data), size_bytes=size)
+
+        address, object_name = context.upload("customer-array", size_mb, "application/json")
+        storage_info = {
+            "distributedStorageAddress": address,
+            "minio_access_key": "minioadmin",
+            "minio_secret_key": "minioadmin",
+            "bucket_name": "benchmark",
+            "object_name": object_name,
+        }
+        yield Case("fetch_data_from_minio.customer.join", lambda _, info=storage_info: fetch_data_from_minio.fetch_data_from_minio(info), size_bytes=size)
+        yield Case("fetch_object_from_minio.customer", lambda _, info=storage_info: fetch_data_from_minio.fetch_object_from_minio(info), size_bytes=size)
+        if size_mb <= CONCAT_LIMIT_MB:
+            yield Case(
+                "fetch_data_from_minio.customer.concat",
+                lambda _, name=object_name: fetch_by_concatenation(context.minio_client, "benchmark", name),
+                size_bytes=size,
+            )
+
+    records = storage_infos(context.args.records)
+
+    def empty_table():
+        fresh_cwd()
+        ensure_table_exists.ensure_table_exists("object_storage_address.db")
+
+    def populated_table():
+        empty_table()
+        insert_into_db.insert_batch_into_db(records)
+
+    def insert_each(_):
+        for storage_info in records:
+            insert_into_db.insert_into_db(storage_info)
+
+    def check_each(_):
+        for storage_info in records:
+            record_exists.record_exists(storage_info)
+
+    yield Case("insert_into_db.customer.new", insert_each, setup=empty_table, items=len(records))
+    yield Case("insert_into_db.customer.existing", insert_each, setup=populated_table, items=len(records))
+    yield Case("record_exists.customer", check_each, setup=populated_table, items=len(records))
+    yield Case("insert_batch_into_db.customer", lambda _: insert_into_db.insert_batch_into_db(records), setup=empty_table, items=len(records))
+
+
+def customer_operational_cases(context):
+    import chunker
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+    from utilities.kafka_rest_proxy_exporter import KafkaRESTProxyExporter
+
+    for size_mb in context.args.sizes:
+        size = int(size_mb * MB)
+        for mode, kind in (("lines", "customer-lines"), ("array", "customer-array")):
+            source = context.dataset(kind, size_mb)
+
+            def link_input(source=source, mode=mode):
+                # chunk_json writes next to its input, so it reads through a link in scratch space
+                directory = context.fresh_dir(f"chunker-{mode}")
+                path = os.path.join(directory, "input.json")
+                os.symlink(source, path)
+                return path
+
+            yield Case(
+                f"chunker.chunk_json.{mode}",
+                lambda path, mode=mode: chunker.chunk_json(path, context.args.chunk_mb, mode),
+                setup=link_input,
+                teardown=lambda path: shutil.rmtree(os.path.dirname(path)),
+                size_bytes=size,
+            )
+
+    class CollectingExporter(SpanExporter):
+        def __init__(self):
+            self.spans = []
+
+        def export(self, spans):
+            self.spans.extend(spans)
+            return SpanExportResult.SUCCESS
+
+    collector = CollectingExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(collector))
+    tracer = provider.get_tracer("benchmark")
+    with tracer.start_as_current_span("publish_domains_data_span"):
+        for index in range(context.args.spans - 1):
+            with tracer.start_as_current_span(f"process_data_object_{index}") as span:
+                span.set_attribute("object_id", index)
+                span.set_attribute("status", "data_ready")
+                span.add_event("Uploaded to Minio", {"bytes": 1024})
+
+    exporter = KafkaRESTProxyExporter("telemetry-data", "http://localhost/kafka-rest-proxy", "BENCHMARK_SERVICE", "http://localhost:0")
+    utilization = {"cpu_utilization": 0.0, "memory_utilization": 0}
+    spans = collector.spans
+
+    yield Case("serialize_span", lambda _: [exporter.serialize_span(span, utilization) for span in spans], items=len(spans))
+
+
+SUITES = {
+    "weather-analytical": weather_analytical_cases,
+    "customer-analytical": customer_analytical_cases,
+    "customer-operational": customer_operational_cases,
+}
+
+
+def run_suite(args):
+    """Worker side: run one suite in this process and write its results as JSON lines."""
+    sys.path.insert(0, os.path.join(REPO_ROOT, SUITE_APPS[args.suite]))
+    scratch = tempfile.mkdtemp(prefix=f"micro-{args.suite}-")
+    context = Context(args, scratch)
+    try:
+        with open(args.results_file, "w") as results:
+            for case in SUITES[args.suite](context):
+                if args.cases and not any(case.name.startswith(prefix) for prefix in args.cases):
+                    continue
+                os.chdir(scratch)
+                result = case.measure(args.repeat)
+                result["suite"] = args.suite
+                results.write(json.dumps(result) + "\n")
+                results.flush()
+    finally:
+        context.close()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_suites(args):
+    """Run every selected suite in its own process and collect the results."""
+    results = []
+    for suite in args.suites:
+        print(f"Running {suite}...", flush=True)
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as results_file:
+            results_path = results_file.name
+        command = [
+            sys.executable, "-m", "benchmarks.micro", "--suite", suite, "--results-file", results_path,
+            "--sizes", ",".join(str(size) for size in args.sizes), "--repeat", str(args.repeat),
+            "--records", str(args.records), "--spans", str(args.spans), "--chunk-mb", str(args.chunk_mb),
+            "--data-dir", args.data_dir,
+        ]
+        if args.cases:
+            command += ["--cases", *args.cases]
+
+        # The helpers print as they go; only the results file is read back
+        completed = subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+        with open(results_path) as f:
+            suite_results = [json.loads(line) for line in f if line.strip()]
+        os.remove(results_path)
+        if completed.returncode != 0:
+            print(f"{suite}: suite exited with status {completed.returncode} after {len(suite_results)} cases", file=sys.stderr)
+        results.extend(suite_results)
+    return results
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(results, history, host, threshold, baseline_runs):
+    """Annotate results with their baseline and return those slower than it by more than threshold."""
+    runs = [run for run in history if run.get("host") == host]
+    regressions = []
+    for result in results:
+        previous = [run["results"][result["key"]]["best_seconds"] for run in runs if result["key"] in run["results"]][-baseline_runs:]
+        if not previous:
+            continue
+        baseline = statistics.median(previous)
+        result["baseline_seconds"] = baseline
+        result["change"] = result["best_seconds"] / baseline - 1 if baseline else None
+        if baseline >= MIN_COMPARABLE_SECONDS and result["change"] > threshold:
+            regressions.append(result)
+    return regressions
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_row(result):
+    rate = f"{result['mb_per_second']:.1f} MB/s" if result.get("mb_per_second") else f"{result['items_per_second']:.0f}/s"
+    change = f"{result['change']:+.1%}" if result.get("change") is not None else ""
+    return f"{result['key']:<52} {result['best_seconds'] * 1000:>12.2f} ms {rate:>16} {change:>9}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=lambda value: [float(size) if "." in size else int(size) for size in value.split(",")], default=[1, 16], help="comma-separated dataset sizes in MB, from 1 up to 1024")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per case; the best time is compared")
+    parser.add_argument("--records", type=int, default=1000, help="storage_info records for the insert_into_db cases")
+    parser.add_argument("--spans", type=int, default=10000, help="spans for the serialize_span case")
+    parser.add_argument("--chunk-mb", type=float, default=4, help="chunk size for the chunk_json cases")
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--cases", nargs="+", help="only run cases whose name starts with one of these prefixes")
+    parser.add_argument("--data-dir", help="where generated datasets are cached between runs (default: a temporary directory)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON-lines file the results are appended to")
+    parser.add_argument("--no-record", action="store_true", help="compare against the history without appending this run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--baseline-runs", type=int, default=5, help="previous runs whose median is the baseline")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the benchmarked helpers")
+    parser.add_argument("--suite", choices=list(SUITES), help=argparse.SUPPRESS)
+    parser.add_argument("--results-file", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.suite:
+        run_suite(args)
+        return 0
+
+    temporary_data_dir = None
+    if not args.data_dir:
+        args.data_dir = temporary_data_dir = tempfile.mkdtemp(prefix="micro-data-")
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    try:
+        results = run_suites(args)
+    finally:
+        if temporary_data_dir:
+            shutil.rmtree(temporary_data_dir, ignore_errors=True)
+
+    host = platform.node()
+    regressions = find_regressions(results, load_history(args.history), host, args.threshold, args.baseline_runs)
+    if not args.no_record:
+        run = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": current_commit(),
+            "host": host,
+            "python": platform.python_version(),
+            "results": {result["key"]: result for result in results},
+        }
+        with open(args.history, "a") as f:
+            f.write(json.dumps(run) + "\n")
+
+    for result in results:
+        print(format_row(result))
+    for result in regressions:
+        print(f"REGRESSION {result['key']}: {result['best_seconds']:.4f}s against a baseline of {result['baseline_seconds']:.4f}s ({result['change']:+.1%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+KAFKA_HEADERS = {"Content-Type": "application/vnd.kafka.v2+json"}
+S3_XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+MAX_POLL_RECORDS = 500  # Records returned by one fake REST Proxy poll
+
+
+class StandIn:
+    """
+    Base of the in-process stand-ins: a threaded HTTP server on a fixed address whose
+    requests are answered by handle(method, path, query, headers, body), which returns
+    (status, headers, body).
+    """
+
+    def __init__(self, host="localhost", port=0):
+        self.host = host
+        self.port = port
+        self.requests_served = 0
+        self._server = None
+        self._thread = None
+
+    def handle(self, method, path, query, headers, body):
+        raise NotImplementedError
+
+    def start(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                query = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+                try:
+                    status, headers, payload = stand_in.handle(self.command, unquote(url.path), query, self.headers, body)
+                except Exception as e:
+                    status, headers, payload = 500, JSON_HEADERS, json.dumps({"error_code": 500, "message": str(e)}).encode()
+                stand_in.requests_served += 1
+
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                payload = payload or b""
+                if "Content-Length" not in (headers or {}):
+                    self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            raise RuntimeError(f"{type(self).__name__} cannot listen on {self.host}:{self.port}: {e}") from e
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def json_response(status, payload, headers=JSON_HEADERS):
+    return status, headers, json.dumps(payload).encode()
+
+
+class FakeKafkaRestProxy(StandIn):
+    """
+    Kafka REST Proxy v2/v3 subset used by the services: JSON and binary produce, consumer
+    instances with subscribe/poll/commit/seek, clusters and consumer group lags. Every
+    topic has a single partition. The instances of a group share the group's position, so
+    replicas split the records between them as they would split partitions.
+
+    The produce time of each record is kept, so the latency from produce to the commit of
+    the consuming group can be read per (group, topic) with commit_latencies().
+    """
+
+    def __init__(self, host="localhost", port=80, prefix="/kafka-rest-proxy", cluster_id="benchmark-cluster"):
+        super().__init__(host, port)
+        self.prefix = prefix.rstrip("/")
+        self.cluster_id = cluster_id
+        self.topics = {}  # topic -> [(key bytes, value bytes, produced_at)]
+        self.groups = {}  # group -> {"instances": {name: {...}}, "positions": {}, "committed": {}}
+        self.latencies = {}  # (group, topic) -> [seconds from produce to commit]
+        self._lock = threading.Condition()
+
+    # Inspection helpers for the benchmark driver
+
+    def end_offset(self, topic):
+        with self._lock:
+            return len(self.topics.get(topic, ()))
+
+    def topic_bytes(self, topic, start=0, end=None):
+        with self._lock:
+            return sum(len(value) for _, value, _ in self.topics.get(topic, ())[start:end])
+
+    def committed(self, group, topic):
+        with self._lock:
+            return self.groups.get(group, {}).get("committed", {}).get(topic, 0)
+
+    def wait_for_commit(self, group, topic, offset, timeout):
+        """Block until group has committed topic up to offset (exclusive); False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self.groups.get(group, {}).get("committed", {}).get(topic, 0) < offset:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+            return True
+
+    def commit_latencies(self, group, topic, start=0):
+        with self._lock:
+            return list(self.latencies.get((group, topic), ())[start:])
+
+    # Request handling
+
+    def handle(self, method, path, query, headers, body):
+        if not path.startswith(self.prefix):
+            return json_response(404, {"error_code": 404, "message": "Not found"})
+        parts = [part for part in path[len(self.prefix):].split("/") if part]
+
+        if parts[:1] == ["v3"]:
+            return self.handle_v3(method, parts[1:])
+        if method == "POST" and len(parts) == 2 and parts[0] == "topics":
+            return self.produce(parts[1], headers.get("Content-Type", ""), json.loads(body or b"{}"))
+        if len(parts) >= 2 and parts[0] == "consumers":
+            return self.handle_consumer(method, parts[1], parts[2:], headers, json.loads(body or b"{}") if method == "POST" else None)
+        return json_response(404, {"error_code": 404, "message": "Not found"})
+
+    def handle_v3(self, method, parts):
+        if parts == ["clusters"]:
+            return json_response(200, {"kind": "KafkaClusterList", "data": [{"cluster_id": self.cluster_id}]})
+        if len(parts) == 5 and parts[0] == "clusters" and parts[2] == "consumer-groups" and parts[4] == "lags":
+            group = self.groups.get(parts[3])
+            if group is None:
+                return json_response(404, {"error_code": 404, "message": "Consumer group not found"})
+            with self._lock:
+                lags = []
+                for topic in group["subscribed"]:
+                    current, end = group["committed"].get(topic, 0), len(self.topics.get(topic, ()))
+                    lags.append({
+                        "cluster_id": self.cluster_id,
+                        "consumer_group_id": parts[3],
+                        "topic_name": topic,
+                        "partition_id": 0,
+                        "current_offset": current,
+                        "log_end_offset": end,
+                        "lag": end - current,
+                    })
+            return json_response(200, {"kind": "KafkaConsumerLagList", "data": lags})
+        return json_response(404, {"error_code": 404, "message": "Not found"})
+
+    def produce(self, topic, content_type, payload):
+        binary = "binary" in content_type
+        now = time.time()
+        offsets = []
+        with self._lock:
+            log = self.topics.setdefault(topic, [])
+            for record in payload.get("records", []):
+                key, value = record.get("key"), record.get("value")
+                if binary:
+                    key = base64.b64decode(key) if key is not None else None
+                    value = base64.b64decode(value) if value is not None else b""
+                else:
+                    key = json.dumps(key).encode() if key is not None else None
+                    value = json.dumps(value).encode()
+                log.append((key, value, now))
+                offsets.append({"partition": 0, "offset": len(log) - 1, "error_code": None, "error": None})
+            self._lock.notify_all()
+        return json_response(200, {"key_schema_id": None, "value_schema_id": None, "offsets": offsets}, KAFKA_HEADERS)
+
+    def handle_consumer(self, method, group_name, parts, headers, payload):
+        with self._lock:
+            group = self.groups.setdefault(group_name, {"instances": {}, "positions": {}, "committed": {}, "subscribed": set()})
+
+        if not parts and method == "POST":
+            name = payload.get("name") or uuid.uuid4().hex
+            with self._lock:
+                if name in group["instances"]:
+                    return json_response(409, {"error_code": 40902, "message": "Consumer instance with the specified name already exists."})
+                group["instances"][name] = {"format": payload.get("format", "binary"), "topics": []}
+            base_uri = f"http://{self.host}:{self.port}{self.prefix}/consumers/{group_name}/instances/{name}"
+            return json_response(200, {"instance_id": name, "base_uri": base_uri}, KAFKA_HEADERS)
+
+        if len(parts) < 2 or parts[0] != "instances":
+            return json_response(404, {"error_code": 404, "message": "Not found"})
+        name, action = parts[1], (parts[2] if len(parts) > 2 else None)
+        instance = group["instances"].get(name)
+        if instance is None:
+            return json_response(404, {"error_code": 40403, "message": "Consumer instance not found."})
+
+        if action is None and method == "DELETE":
+            with self._lock:
+                group["instances"].pop(name, None)
+            return 204, {}, b""
+        if action == "subscription":
+            if method == "POST":
+                with self._lock:
+                    instance["topics"] = list(payload.get("topics", []))
+                    for topic in instance["topics"]:
+                        group["subscribed"].add(topic)
+                        group["positions"].setdefault(topic, group["committed"].get(topic, 0))
+                return 204, {}, b""
+            if method == "DELETE":
+                instance["topics"] = []
+                return 204, {}, b""
+            return json_response(200, {"topics": instance["topics"]}, KAFKA_HEADERS)
+        if action == "records" and method == "GET":
+            return self.poll(group, instance, headers.get("Accept", ""))
+        if action == "offsets" and method == "POST":
+            self.commit(group_name, group, payload.get("offsets", []))
+            return 204, {}, b""
+        if action == "positions" and method == "POST":
+            with self._lock:
+                for offset in payload.get("offsets", []):
+                    group["positions"][offset["topic"]] = offset["offset"]
+            return 204, {}, b""
+        return json_response(404, {"error_code": 404, "message": "Not found"})
+
+    def poll(self, group, instance, accept):
+        binary = "binary" in accept or instance["format"] == "binary"
+        records = []
+        with self._lock:
+            for topic in instance["topics"]:
+                log = self.topics.get(topic, [])
+                start = group["positions"].get(topic, 0)
+                end = min(len(log), start + MAX_POLL_RECORDS - len(records))
+                for offset in range(start, end):
+                    key, value, _ = log[offset]
+                    if binary:
+                        key = base64.b64encode(key).decode() if key is not None else None
+                        value = base64.b64encode(value).decode()
+                    else:
+                        key = json.loads(key) if key is not None else None
+                        value = json.loads(value)
+                    records.append({"topic": topic, "key": key, "value": value, "partition": 0, "offset": offset})
+                group["positions"][topic] = end
+
+        content_type = "application/vnd.kafka.binary.v2+json" if binary else "application/vnd.kafka.json.v2+json"
+        return json_response(200, records, {"Content-Type": content_type})
+
+    def commit(self, group_name, group, offsets):
+        now = time.time()
+        with self._lock:
+            for offset in offsets:
+                topic = offset["topic"]
+                # The REST Proxy commits the offset after the last consumed record
+                previous, committed = group["committed"].get(topic, 0), offset["offset"] + 1
+                if committed <= previous:
+                    continue
+                log = self.topics.get(topic, [])
+                self.latencies.setdefault((group_name, topic), []).extend(
+                    now - produced_at for _, _, produced_at in log[previous:committed]
+                )
+                group["committed"][topic] = committed
+            self._lock.notify_all()
+
+
+class FakeS3(StandIn):
+    """
+    The S3 operations minio-py issues against MinIO: bucket location/exists/create, single
+    and multipart PUT, GET/HEAD object and ListObjectsV2. Request signatures are not checked.
+    """
+
+    def __init__(self, host="localhost", port=9001):
+        super().__init__(host, port)
+        self.buckets = {}  # bucket -> {key: (data, content_type, etag, last_modified)}
+        self.uploads = {}  # upload id -> (bucket, key, content_type, {part number: bytes})
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def bucket_bytes(self, bucket):
+        with self._lock:
+            return sum(len(entry[0]) for entry in self.buckets.get(bucket, {}).values())
+
+    def object_count(self, bucket):
+        with self._lock:
+            return len(self.buckets.get(bucket, {}))
+
+    def handle(self, method, path, query, headers, body):
+        bucket, _, key = path.lstrip("/").partition("/")
+        if not bucket:
+            return self.error(400, "InvalidRequest", "Bucket name missing")
+        if not key:
+            return self.handle_bucket(method, bucket, query)
+        return self.handle_object(method, bucket, key, query, headers, body)
+
+    def error(self, status, code, message):
+        payload = f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>"
+        return status, {"Content-Type": "application/xml"}, payload.encode()
+
+    def xml(self, payload):
+        return 200, {"Content-Type": "application/xml"}, ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>" + payload).encode()
+
+    def handle_bucket(self, method, bucket, query):
+        if "location" in query:
+            return self.xml(f"<LocationConstraint xmlns=\"{S3_XMLNS}\">us-east-1</LocationConstraint>")
+        if method == "PUT":
+            with self._lock:
+                self.buckets.setdefault(bucket, {})
+            return 200, {}, b""
+        if bucket not in self.buckets:
+            return self.error(404, "NoSuchBucket", "The specified bucket does not exist")
+        if method == "HEAD":
+            return 200, {}, b""
+        if method == "GET":
+            return self.list_objects(bucket, query)
+        return self.error(405, "MethodNotAllowed", method)
+
+    def list_objects(self, bucket, query):
+        prefix = query.get("prefix", "")
+        with self._lock:
+            entries = sorted((key, entry) for key, entry in self.buckets[bucket].items() if key.startswith(prefix))
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><LastModified>{last_modified}</LastModified>"
+            f"<ETag>&quot;{etag}&quot;</ETag><Size>{len(data)}</Size><StorageClass>STANDARD</StorageClass></Contents>"
+            for key, (data, _, etag, last_modified) in entries
+        )
+        return self.xml(
+            f"<ListBucketResult xmlns=\"{S3_XMLNS}\"><Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(entries)}</KeyCount><MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+        )
+
+    def handle_object(self, method, bucket, key, query, headers, body):
+        if bucket not in self.buckets:
+            return self.error(404, "NoSuchBucket", "The specified bucket does not exist")
+
+        if method == "POST" and "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with self._lock:
+                self.uploads[upload_id] = (bucket, key, headers.get("Content-Type"), {})
+            return self.xml(
+                f"<InitiateMultipartUploadResult xmlns=\"{S3_XMLNS}\"><Bucket>{escape(bucket)}</Bucket>"
+                f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            )
+        if "uploadId" in query:
+            return self.handle_multipart(method, query, body)
+
+        if method == "PUT":
+            etag = self.store(bucket, key, body, headers.get("Content-Type"))
+            return 200, {"ETag": f"\"{etag}\""}, b""
+        if method in ("GET", "HEAD"):
+            with self._lock:
+                entry = self.buckets[bucket].get(key)
+            if entry is None:
+                return self.error(404, "NoSuchKey", "The specified key does not exist")
+            data, content_type, etag, _ = entry
+            response_headers = {"Content-Type": content_type or "application/octet-stream", "ETag": f"\"{etag}\""}
+            response_headers["Content-Length"] = str(len(data))
+            if method == "HEAD":
+                return 200, response_headers, b""
+            with self._lock:
+                self.bytes_sent += len(data)
+            return 200, response_headers, data
+        if method == "DELETE":
+            with self._lock:
+                self.buckets[bucket].pop(key, None)
+            return 204, {}, b""
+        return self.error(405, "MethodNotAllowed", method)
+
+    def handle_multipart(self, method, query, body):
+        upload_id = query["uploadId"]
+        with self._lock:
+            upload = self.uploads.get(upload_id)
+        if upload is None:
+            return self.error(404, "NoSuchUpload", "The specified upload does not exist")
+        bucket, key, content_type, parts = upload
+
+        if method == "PUT":
+            with self._lock:
+                parts[int(query["partNumber"])] = body
+                self.bytes_received += len(body)
+            return 200, {"ETag": f"\"{hashlib.md5(body).hexdigest()}\""}, b""
+        if method == "DELETE":
+            with self._lock:
+                self.uploads.pop(upload_id, None)
+            return 204, {}, b""
+        if method == "POST":
+            numbers = [int(element.text) for element in ElementTree.fromstring(body).iter() if element.tag.endswith("PartNumber")]
+            data = b"".join(parts[number] for number in sorted(numbers))
+            with self._lock:
+                self.uploads.pop(upload_id, None)
+            etag = self.store(bucket, key, data, content_type, count_bytes=False)
+            return self.xml(
+                f"<CompleteMultipartUploadResult xmlns=\"{S3_XMLNS}\"><Bucket>{escape(bucket)}</Bucket>"
+                f"<Key>{escape(key)}</Key><ETag>&quot;{etag}&quot;</ETag></CompleteMultipartUploadResult>"
+            )
+        return self.error(405, "MethodNotAllowed", method)
+
+    def store(self, bucket, key, data, content_type, count_bytes=True):
+        etag = hashlib.md5(data).hexdigest()
+        last_modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        with self._lock:
+            self.buckets[bucket][key] = (data, content_type, etag, last_modified)
+            if count_bytes:
+                self.bytes_received += len(data)
+        return etag
+
+
+class VaultStub(StandIn):
+    """KV v2 reads of the secrets the data scientist service looks up."""
+
+    def __init__(self, host="localhost", port=8200, secrets=None):
+        super().__init__(host, port)
+        self.secrets = secrets or {"Data-Scientist-User-Pass": {"username": "data-scientist", "password": "benchmark"}}
+
+    def handle(self, method, path, query, headers, body):
+        prefix = "/v1/secret/data/"
+        if method != "GET" or not path.startswith(prefix) or path[len(prefix):] not in self.secrets:
+            return json_response(404, {"errors": []})
+        return json_response(200, {
+            "request_id": uuid.uuid4().hex,
+            "lease_id": "",
+            "renewable": False,
+            "lease_duration": 0,
+            "data": {
+                "data": self.secrets[path[len(prefix):]],
+                "metadata": {"created_time": "2024-01-01T00:00:00Z", "deletion_time": "", "destroyed": False, "version": 1},
+            },
+        })
+
+
+class DataLichenStub(StandIn):
+    """Accepts metadata registrations and counts them, like Data Lichen's /register."""
+
+    def __init__(self, host="localhost", port=3001):
+        super().__init__(host, port)
+        self.registrations = 0
+
+    def handle(self, method, path, query, headers, body):
+        if method != "POST" or path not in ("/register", "/register-batch"):
+            return json_response(404, {"message": "Not found"})
+        payload = json.loads(body or b"null")
+        self.registrations += len(payload) if isinstance(payload, list) else 1
+        return json_response(200, {"message": "Metadata registered successfully"})
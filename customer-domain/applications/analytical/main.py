@@ -1,17 +1,25 @@
 from http.client import HTTPException
 from xmlrpc.client import ResponseError
-from fastapi import FastAPI, HTTPException, status, BackgroundTasks
+from fastapi import FastAPI, HTTPException, status, BackgroundTasks, Response
 from minio import Minio
-import requests
 import json
 import base64
 from typing import List, Dict
 import math
 import logging
 import time 
+import asyncio
 from confluent_kafka import Producer
-from utilities import ensure_table_exists, insert_into_db, register_metadata_to_data_lichen, upload_data_to_minio, fetch_all_customer_data_from_sqlite, kafka_utils
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from utilities import ensure_table_exists, insert_into_db, register_metadata_to_data_lichen, upload_data_to_minio, fetch_all_customer_data_from_sqlite, kafka_utils, query_customer_data
+from utilities.save_data_to_sqlite import CUSTOMER_DATA_DB
 from utilities.kafka_rest_proxy_exporter import KafkaRESTProxyExporter
+from utilities.kafka_consumer_manager import KafkaConsumerManager
+from utilities.kafka_consumer_worker import KafkaConsumerWorker
+from utilities.data_lichen_client import registrar
+from utilities.jobs import job_manager
+from utilities.retry_queue import RetryQueue
+from utilities.settings import settings
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
@@ -26,17 +34,26 @@ logger = logging.getLogger(__name__)
 
 # Global variables
 SERVICE_NAME = "CUSTOMER_DOMAIN_ANALYTICAL_SERVICE"
-SERVICE_ADDRESS = "http://localhost:8000"
-consumer_base_url = None
-KAFKA_REST_PROXY_URL = "http://localhost/kafka-rest-proxy"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8000"
+KAFKA_REST_PROXY_URL = settings.KAFKA_REST_PROXY_URL
 KAFKA_REST_PROXY_TOPIC_ENDPOINT = f"{KAFKA_REST_PROXY_URL}/topics"
 
+# REST Proxy consumers used by this service, created and health-checked by the manager
+consumer_manager = KafkaConsumerManager(KAFKA_REST_PROXY_URL)
+consumer_manager.register("operational-data", "customer-domain-operational-data-consumer", "operational-data-consumer", ["domain-customer-operational-data"])
+consumer_manager.register("error-replay", "customer-domain-error-replay-consumer", "error-replay-consumer", ["customer-domain-data-error", "customer-domain-stream-data-error"])
+
 
 # Setting up the trace provider
 trace.set_tracer_provider(TracerProvider())
 
 kafka_exporter = KafkaRESTProxyExporter(topic_name="telemetry-data", rest_proxy_url=KAFKA_REST_PROXY_URL, service_name=SERVICE_NAME, service_address=SERVICE_ADDRESS)
-span_processor = BatchSpanProcessor(kafka_exporter)
+span_processor = BatchSpanProcessor(
+    kafka_exporter,
+    max_queue_size=settings.TELEMETRY_QUEUE_SIZE,
+    schedule_delay_millis=settings.TELEMETRY_EXPORT_DELAY_MS,
+    max_export_batch_size=settings.TELEMETRY_EXPORT_BATCH_SIZE
+)
 trace.get_tracer_provider().add_span_processor(span_processor)
 
 # Setting up OpenTelemetry
@@ -44,64 +61,102 @@ tracer = trace.get_tracer(__name__)
 
 # Storage info dictionary
 storage_info = {}
-MINIO_BASE_URL = "localhost:9001"
-MINIO_ACCESS_KEY = "minioadmin"
-MINIO_SECRET_KEY = "minioadmin"
+MINIO_BASE_URL = settings.MINIO_ENDPOINT
+MINIO_ACCESS_KEY = settings.MINIO_ACCESS_KEY
+MINIO_SECRET_KEY = settings.MINIO_SECRET_KEY
 
 # Initialize the Minio client
 minio_client = Minio(
     MINIO_BASE_URL,
     access_key=MINIO_ACCESS_KEY,
     secret_key=MINIO_SECRET_KEY,
-    secure=False
+    secure=settings.MINIO_SECURE
 )
 
+# Batch handler run by the operational-data consumer worker. It returns only after the
+# storage addresses are committed to SQLite, so the worker can then commit the offsets.
+def store_operational_data_batch(records):
+    global storage_info
+
+    with tracer.start_as_current_span("consume_records") as span:
+        storage_info_batch = []
+        for record in records:
+            decoded_key = base64.b64decode(record['key']).decode('utf-8') if record['key'] else None
+            decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
+            value_obj = json.loads(decoded_value_json)
+
+            storage_info = {
+                "distributedStorageAddress": value_obj.get('distributedStorageAddress', ''),
+                "minio_access_key": value_obj.get('minio_access_key', ''),
+                "minio_secret_key": value_obj.get('minio_secret_key', ''),
+                "bucket_name": value_obj.get('bucket_name', ''),
+                "object_name": value_obj.get('object_name', '')
+            }
+
+            # If distributedStorageAddress is empty, skip the storage
+            if not storage_info["distributedStorageAddress"]:
+                print("Skipping storage to SQLite since distributedStorageAddress is empty.") 
+                continue
+
+            storage_info_batch.append(storage_info)
+
+            print(f"Consumed record with key {decoded_key} and value {value_obj['message']} from topic {record['topic']}")
+            if 'distributedStorageAddress' in value_obj:
+                print(f"Distributed storage address: {value_obj['distributedStorageAddress']}")
+                print(f"Minio access key: {value_obj['minio_access_key']}")
+                print(f"Minio secret key: {value_obj['minio_secret_key']}")
+                print(f"Bucket name: {value_obj['bucket_name']}")
+                print(f"Object name: {value_obj['object_name']}")
+
+        # Insert the storage info of the whole batch into the SQLite database
+        insert_into_db.insert_batch_into_db(storage_info_batch)
+        span.set_attribute("records_processed", len(records))
+
+# Long-running worker for the operational topic; offsets are committed after each batch
+operational_data_worker = KafkaConsumerWorker(consumer_manager, "operational-data", store_operational_data_batch)
+
+# Uploads and publishes that fail are retried from a local queue instead of failing the run
+def publish_object(payload):
+    upload_data_to_minio.upload_data_to_minio(payload["bucket_name"], payload["data"], payload["object_name"], MINIO_BASE_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, payload.get("metadata"))
+    kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, 'customer-domain-data', payload["notification"])
+
+def retryable(payload):
+    # The retry queue stores JSON, so the object's bytes are kept as text only on this path
+    data = payload["data"]
+    return {**payload, "data": data if isinstance(data, str) else data.decode('utf-8')}
+
+def stream_chunk(payload):
+    kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, 'customer-domain-stream-data', payload)
+
+retry_queue = RetryQueue(KAFKA_REST_PROXY_URL)
+retry_queue.register("publish-object", publish_object, 'customer-domain-data-error')
+retry_queue.register("stream-chunk", stream_chunk, 'customer-domain-stream-data-error')
+
+# Started on demand by /replay-error-topics: queues the dead letters of the error topics again
+error_replay_worker = KafkaConsumerWorker(consumer_manager, "error-replay", retry_queue.replay_batch, dead_letter=False)
+
 @app.on_event("startup")
 async def startup_event():
-    url = f"{KAFKA_REST_PROXY_URL}/consumers/customer-domain-operational-data-consumer/"
-    headers = {
-        'Content-Type': 'application/vnd.kafka.v2+json',
-    }
-    data = {
-        "name": "operational-data-consumer",
-        "format": "binary",
-        "auto.offset.reset": "earliest",
-        "auto.commit.enable": "false"
-    }
-    try:
-        # attemping to create a consumer 
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        # will raise an HTTPError if the status code is 4xx or 5xx
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        if response.status_code == 409:
-            print("Kafka consumer already exists. Proceeding...")
-        else:
-            raise Exception("Failed to create Kafka consumer: " + str(e))
-    else:
-        print("Kafka consumer created successfully")
-        print(response.json())
-        consumer_info = response.json()
-        print("Consumer instance URI: " + consumer_info['base_uri'])
-        global consumer_base_url
-        consumer_base_url = consumer_info['base_uri'].replace(
-            'http://', 'http://localhost/')
-
-        # Subscribe the consumer to the topic
-        url = consumer_base_url + "/subscription"
-        print(url)
-        headers = {'Content-Type': 'application/vnd.kafka.v2+json'}
-        data = {"topics": ["domain-customer-operational-data"]}  # Adjusted the topic name here
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        if response.status_code != 204:
-            raise Exception(
-                "Failed to subscribe consumer to topic: " + response.text)
+    ensure_table_exists.ensure_table_exists('object_storage_address.db')
+    query_customer_data.ensure_index_exists(CUSTOMER_DATA_DB)
+
+    await asyncio.get_running_loop().run_in_executor(None, consumer_manager.start)
+    operational_data_worker.start()
+    registrar.start()
+    retry_queue.start()
         
 @app.on_event("shutdown")
 async def shutdown_event():
-    url = consumer_base_url
-    response = requests.delete(url)
-    print(f"Consumer deleted with status code {response.status_code}")
+    operational_data_worker.stop()
+    error_replay_worker.stop()
+    retry_queue.stop()
+    await asyncio.get_running_loop().run_in_executor(None, consumer_manager.stop)
+
+    # Running jobs finish first, so the metadata they register is flushed below
+    await asyncio.get_running_loop().run_in_executor(None, job_manager.shutdown)
+
+    # Metadata still waiting for a batch is sent before exiting
+    await asyncio.get_running_loop().run_in_executor(None, registrar.stop)
 
     # Shutdown OpenTelemetry
     trace.get_tracer_provider().shutdown()
@@ -110,72 +165,25 @@ async def shutdown_event():
 async def main_function(): 
     return "welcome to the customer domain analytical service"  
 
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # this endpoint should only run after the startup event has succesfully run
 @app.get("/subscribe-to-operational-data-and-store-addresses")
-async def consume_kafka_message(background_tasks: BackgroundTasks):
+async def consume_kafka_message():
     tracer = trace.get_tracer(__name__)
 
     # Start a new span for this endpoint
     with tracer.start_as_current_span("consume_kafka_message"):
         
-        # Verify Consumer existence and status before proceeding
-        if consumer_base_url:  # Check if consumer_base_url is initialized
-            response_consumer = requests.get(f"{consumer_base_url}/status")
-            if response_consumer.status_code != 200:
-                # Recreate the consumer if it doesn't exist or is in an error state
-                await startup_event()  # Reuse the startup logic to create and subscribe consumer
-        
-        # If after checking (or recreating) the consumer_base_url is still None, return an error message
-        if consumer_base_url is None:
+        # The consumer manager health-checks and recreates the consumer in the background
+        if consumer_manager.base_url("operational-data") is None:
             return {"status": "Consumer has not been initialized. Please try again later."}
 
-        print(consumer_base_url)
-        url = consumer_base_url + "/records"
-        headers = {"Accept": "application/vnd.kafka.binary.v2+json"}
-
-        ensure_table_exists.ensure_table_exists('object_storage_address.db')
-
-        # You can use the tracer within the consume_records function to instrument finer details.
-        def consume_records():
-            with tracer.start_as_current_span("consume_records"):
-                global storage_info
-
-                response = requests.get(url, headers=headers)
-                if response.status_code != 200:
-                    raise Exception(f"GET /records/ did not succeed: {response.text}")
-                else:
-                    records = response.json()
-                    for record in records:
-                        decoded_key = base64.b64decode(record['key']).decode('utf-8') if record['key'] else None
-                        decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
-                        value_obj = json.loads(decoded_value_json)
-
-                        storage_info = {
-                            "distributedStorageAddress": value_obj.get('distributedStorageAddress', ''),
-                            "minio_access_key": value_obj.get('minio_access_key', ''),
-                            "minio_secret_key": value_obj.get('minio_secret_key', ''),
-                            "bucket_name": value_obj.get('bucket_name', ''),
-                            "object_name": value_obj.get('object_name', '')
-                        }
-
-                        # If distributedStorageAddress is empty, skip the storage
-                        if not storage_info["distributedStorageAddress"]:
-                            print("Skipping storage to SQLite since distributedStorageAddress is empty.") 
-                            continue
-
-                        # Insert the storage info into the SQLite database
-                        insert_into_db.insert_into_db(storage_info)
-
-                        print(f"Consumed record with key {decoded_key} and value {value_obj['message']} from topic {record['topic']}")
-                        if 'distributedStorageAddress' in value_obj:
-                            print(f"Distributed storage address: {value_obj['distributedStorageAddress']}")
-                            print(f"Minio access key: {value_obj['minio_access_key']}")
-                            print(f"Minio secret key: {value_obj['minio_secret_key']}")
-                            print(f"Bucket name: {value_obj['bucket_name']}")
-                            print(f"Object name: {value_obj['object_name']}")
-
-        background_tasks.add_task(consume_records)
-        return {"status": "Consuming records in the background"}
+        # The worker normally runs from startup; this restarts it if it has stopped
+        operational_data_worker.start()
+        return {"status": "Consuming records in the background", "worker": operational_data_worker.status()}
 
 @app.get("/register-data-to-data-lichen")
 async def retrieve_and_save_data():
@@ -185,11 +193,49 @@ async def retrieve_and_save_data():
     if not storage_info:
         raise HTTPException(404, "Storage info not found")
 
-    try:
-        register_metadata_to_data_lichen.register_metadata_to_data_lichen()
-        return {"status": "Data successfully retrieved and saved to 'customer_data.db'"}
-    except ResponseError as err:
-        raise HTTPException(status_code=500, detail=f"An error occurred while fetching the data: {err}")
+    # Fetching, saving and profiling every object runs as a background job; a request
+    # made while a registration is queued or running joins that job
+    job, coalesced = job_manager.submit("register-data-to-data-lichen", register_metadata_to_data_lichen.register_metadata_to_data_lichen)
+    return {"status": "Registration in progress" if coalesced else "Registration started", "job_id": job.id, "coalesced": coalesced}
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.as_dict() for job in job_manager.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job.as_dict()
+
+@app.get("/retry-queue")
+async def get_retry_queue():
+    pending = await asyncio.get_running_loop().run_in_executor(None, retry_queue.pending)
+    return {"pending": pending, "replay_worker": error_replay_worker.status()}
+
+@app.get("/replay-error-topics")
+async def replay_error_topics():
+    if consumer_manager.base_url("error-replay") is None:
+        return {"status": "Consumer has not been initialized. Please try again later."}
+
+    # Dead letters are queued for retry again; the worker keeps following the error topics
+    error_replay_worker.start()
+    return {"status": "Replaying error topics in the background", "worker": error_replay_worker.status()}
+
+@app.get("/query/customer-data")
+async def query_customer_data_endpoint(min_id: int = None, max_id: int = None, data_hash: str = None, include_data: bool = False, limit: int = query_customer_data.PAGE_SIZE, cursor: str = None):
+    # Stored objects in id order, a page at a time; pass next_cursor back as cursor for the next page
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span("query-customer-data") as span:
+        try:
+            page = await asyncio.get_running_loop().run_in_executor(None, query_customer_data.query_customer_data, CUSTOMER_DATA_DB, min_id, max_id, data_hash, include_data, limit, cursor)
+        except ValueError as error:
+            raise HTTPException(400, str(error))
+        if page is None:
+            raise HTTPException(404, "No customer data has been stored yet")
+        span.set_attribute("objects", len(page["objects"]))
+    return page
 
 @app.get('/publish-domains-data')
 async def publish_domains_data():
@@ -201,56 +247,56 @@ async def publish_domains_data():
         bucket_name = 'custom-domain-analytical-data'
         
         logger.info(f"Starting to process {len(all_data)} data objects.")
+        queued = 0
         
         for index, data_obj in enumerate(all_data):
             with tracer.start_as_current_span(f"process_data_object_{index}") as data_span:
-                try:
-                    # Convert individual data object to JSON format
-                    data_json = json.dumps(data_obj)
-
-                    # Upload to Minio
-                    object_name = f"data_object_{index}.json"
-                    upload_data_to_minio.upload_data_to_minio(bucket_name, data_json, object_name, MINIO_BASE_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
+                # Get the current timestamp (you can also use datetime for more granular timestamp details)
+                current_timestamp = time.time()
+
+                # The stored object is uploaded as is; its id and hash travel as object metadata.
+                # The notification is sent once it is uploaded
+                object_id, data, data_hash = data_obj
+                payload = {
+                    "bucket_name": bucket_name,
+                    "object_name": f"data_object_{index}.json",
+                    "data": data,
+                    "metadata": {"object-id": str(object_id), "data-hash": data_hash},
+                    "notification": {
+                        "status": "data_ready",
+                        "data_location": f"{MINIO_BASE_URL}",
+                        "object_id": index,  # or any unique identifier for the data object
+                        "timestamp": current_timestamp
+                    }
+                }
 
-                    # Get the current timestamp (you can also use datetime for more granular timestamp details)
-                    current_timestamp = time.time()
+                try:
+                    # Upload to Minio and notify Kafka about this individual object
+                    publish_object(payload)
 
                     # Set custom attributes on the span
                     data_span.set_attribute("object_id", index)  # Set the object's unique identifier as an attribute
                     data_span.set_attribute("status", "data_ready")
                     data_span.set_attribute("timestamp", current_timestamp)
 
-                    # Notify Kafka about this individual object
-                    kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, 'customer-domain-data', {
-                        "status": "data_ready",
-                        "data_location": f"{MINIO_BASE_URL}",
-                        "object_id": index,  # or any unique identifier for the data object
-                        "timestamp": current_timestamp
-                    })
-
                     logger.info(f"Processed and saved object {index} to Minio.")
 
                 except Exception as e:
                     with tracer.start_as_current_span("error_handling") as error_span:
                         # Set custom attributes on the error span
                         error_span.set_attribute("object_id", index)
-                        error_span.set_attribute("status", "processing_failed")
+                        error_span.set_attribute("status", "retry_queued")
                         error_span.set_attribute("error", str(e))
                         error_span.set_attribute("timestamp", current_timestamp)
-                        
-                        # Notify Kafka of error for this specific object
-                        kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, 'customer-domain-data-error', {
-                            "status": "processing_failed",
-                            "error": str(e),
-                            "object_id": index,  # or any unique identifier for the data object
-                            "timestamp": current_timestamp
-                        })
 
-                        logger.error(f"An error occurred while processing object {index}: {e}")
-                        raise HTTPException(status_code=500, detail=f"An error occurred while processing object {index}: {e}")
+                        # Retried in the background; it reaches customer-domain-data-error only if every retry fails
+                        retry_queue.enqueue("publish-object", retryable(payload), e)
+                        queued += 1
 
-    logger.info(f"Finished processing {len(all_data)} data objects and saving to Minio.")
-    return {"status": f"Processed {len(all_data)} data objects and saved to Minio."}
+                        logger.error(f"An error occurred while processing object {index}, queued for retry: {e}")
+
+    logger.info(f"Finished processing {len(all_data)} data objects and saving to Minio, {queued} queued for retry.")
+    return {"status": f"Processed {len(all_data) - queued} data objects and saved to Minio.", "queued_for_retry": queued}
 
 def delivery_report(err, msg):
     """ Called once for each message produced to indicate delivery result. """
@@ -260,38 +306,49 @@ def delivery_report(err, msg):
         print('Message delivered to {} [{}]'.format(msg.topic(), msg.partition()))
 
 @app.get('/stream-domains-data')
-async def stream_domains_data(chunk_size: int = 1000):  # Adjust default chunk size as required
+async def stream_domains_data(chunk_size: int = settings.STREAM_CHUNK_SIZE):
     tracer = trace.get_tracer(__name__)
 
     with tracer.start_as_current_span("stream_domains_data_span") as span:
         # Fetch data from SQLite
         all_data = fetch_all_customer_data_from_sqlite.fetch_all_customer_data_from_sqlite()
         logger.info(f"Starting to stream {len(all_data)} data objects.")
+        queued = 0
 
         for record in all_data:
             object_id = record[0]
             data = record[1]
             data_hash = record[2]
 
+            # Chunks are characters inside a JSON message, so the object is decoded once here
+            if not isinstance(data, str):
+                data = data.decode('utf-8')
+
             # Split large JSON data into smaller chunks
             chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
             total_chunks = len(chunks)
 
             for index, chunk in enumerate(chunks):
                 with tracer.start_as_current_span(f"process_streaming_object_{object_id}_chunk_{index}") as data_span:
-                    try:
-                        # Convert individual chunk to JSON format
-                        chunk_json = json.dumps({
-                            'id': object_id,
-                            'chunk': chunk,
-                            'chunk_index': index,
-                            'total_chunks': total_chunks,
-                            'data_hash': data_hash
-                        })
-
-                        # Get current timestamp
-                        current_timestamp = time.time()
+                    # Convert individual chunk to JSON format
+                    chunk_json = json.dumps({
+                        'id': object_id,
+                        'chunk': chunk,
+                        'chunk_index': index,
+                        'total_chunks': total_chunks,
+                        'data_hash': data_hash
+                    })
 
+                    # Get current timestamp
+                    current_timestamp = time.time()
+                    message = {
+                        "status": "data_streamed",
+                        "data": chunk_json,
+                        "object_id": object_id,
+                        "timestamp": current_timestamp
+                    }
+
+                    try:
                         # Set custom attributes on the span
                         data_span.set_attribute("object_id", object_id)
                         data_span.set_attribute("chunk_index", index)
@@ -299,12 +356,7 @@ async def stream_domains_data(chunk_size: int = 1000):  # Adjust default chunk s
                         data_span.set_attribute("timestamp", current_timestamp)
 
                         # Notify Kafka about this chunk
-                        kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, 'customer-domain-stream-data', {
-                            "status": "data_streamed",
-                            "data": chunk_json,
-                            "object_id": object_id,
-                            "timestamp": current_timestamp
-                        })
+                        stream_chunk(message)
 
                         logger.info(f"Streamed object {object_id} chunk {index} to Kafka.")
 
@@ -313,20 +365,15 @@ async def stream_domains_data(chunk_size: int = 1000):  # Adjust default chunk s
                             # Error handling
                             error_span.set_attribute("object_id", object_id)
                             error_span.set_attribute("chunk_index", index)
-                            error_span.set_attribute("status", "streaming_failed")
+                            error_span.set_attribute("status", "retry_queued")
                             error_span.set_attribute("error", str(e))
                             error_span.set_attribute("timestamp", current_timestamp)
 
-                            # Notify Kafka of error
-                            kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, 'customer-domain-stream-data-error', {
-                                "status": "streaming_failed",
-                                "error": str(e),
-                                "object_id": object_id,
-                                "chunk_index": index,
-                                "timestamp": current_timestamp
-                            })
+                            # Retried in the background; it reaches customer-domain-stream-data-error only if every retry fails.
+                            # The consumer reassembles chunks by index, so a late chunk is still placed correctly
+                            retry_queue.enqueue("stream-chunk", message, e)
+                            queued += 1
 
-                            logger.error(f"An error occurred while streaming object {object_id} chunk {index}: {e}")
-                            raise HTTPException(status_code=500, detail=f"An error occurred while streaming object {object_id} chunk {index}: {e}")
+                            logger.error(f"An error occurred while streaming object {object_id} chunk {index}, queued for retry: {e}")
 
-        logger.info(f"Finished streaming data objects to Kafka.")
+        logger.info(f"Finished streaming data objects to Kafka, {queued} chunks queued for retry.")
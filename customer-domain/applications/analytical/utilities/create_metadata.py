@@ -1,12 +1,15 @@
 from datetime import datetime
+from utilities.settings import settings
 
-SERVICE_ADDRESS = "http://localhost:8000"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8000"
 SERVICE_UNIQUE_IDENTIFIER = "1c30061c-23cf-4883-a8c4-13379fedb59b"
-DATA_ADDRESS = "http://localhost:9001/minio/custom-domain-analytical-data/"
+DATA_ADDRESS = f"http://{settings.MINIO_ENDPOINT}/minio/custom-domain-analytical-data/"
 
-def create_metadata(actual_time, processing_duration, data_str):
-    total_rows = len(data_str.split('\n'))
-    missing_data_points = data_str.count(', ,') + data_str.count(',,')
+def create_metadata(actual_time, processing_duration, data):
+    # data is the object as bytes or text; it is counted in place rather than split
+    newline, empty, blank = (b'\n', b',,', b', ,') if not isinstance(data, str) else ('\n', ',,', ', ,')
+    total_rows = data.count(newline) + 1
+    missing_data_points = data.count(blank) + data.count(empty)
     
     # Mocking the validity and accuracy for the experiment
     completeness = 100 * (total_rows - missing_data_points) / total_rows
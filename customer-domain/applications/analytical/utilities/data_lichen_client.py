@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utilities import metrics
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = settings.DATA_LICHEN_BATCH_SIZE  # metadata entries per /register-batch request
+FLUSH_INTERVAL = settings.DATA_LICHEN_FLUSH_INTERVAL  # seconds an entry may wait for a fuller batch
+MAX_BUFFERED = settings.DATA_LICHEN_MAX_BUFFERED  # entries kept while Data Lichen is unreachable
+RETRIES = settings.DATA_LICHEN_RETRIES
+RETRY_BACKOFF = settings.DATA_LICHEN_RETRY_BACKOFF  # seconds before the first retry, doubled for each next one
+REQUEST_TIMEOUT = 10
+
+
+class DataLichenUnavailable(Exception):
+    pass
+
+
+class DataLichenRegistrar:
+    """
+    Buffers metadata entries and registers them with Data Lichen in batches. A batch is
+    sent once BATCH_SIZE entries are waiting or the oldest has waited FLUSH_INTERVAL
+    seconds, as one POST /register-batch over a pooled session, retried with exponential
+    backoff. Entries of a batch that still fails go back to the buffer for the next flush.
+    """
+
+    def __init__(self, base_url, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_buffered=MAX_BUFFERED, retries=RETRIES, retry_backoff=RETRY_BACKOFF):
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+        self.buffer = []
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()  # one batch in flight at a time keeps entries in order
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="data-lichen-registrar", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the background flusher and send whatever is still buffered."""
+        if self.thread is not None:
+            self.stop_event.set()
+            with self.condition:
+                self.condition.notify()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def register(self, metadata):
+        """Queue one metadata entry; it is sent by the background flusher."""
+        self.register_many([metadata])
+
+    def register_many(self, entries):
+        with self.condition:
+            self.buffer.extend(entries)
+            self._drop_overflow()
+            if len(self.buffer) >= self.batch_size:
+                self.condition.notify()
+
+    def flush(self):
+        """Send every buffered entry now, one batch at a time. Returns the number registered."""
+        registered = 0
+        with self.flush_lock:
+            while True:
+                with self.condition:
+                    batch = self.buffer[:self.batch_size]
+                    del self.buffer[:self.batch_size]
+                if not batch:
+                    return registered
+                try:
+                    self.send_batch(batch)
+                except DataLichenUnavailable as e:
+                    logger.error(f"Registering {len(batch)} metadata entries with Data Lichen failed: {e}")
+                    with self.condition:
+                        self.buffer[:0] = batch
+                        self._drop_overflow()
+                    return registered
+                registered += len(batch)
+
+    def send_batch(self, batch):
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._post(batch)
+                # Server errors and throttling are retried, anything else is final
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+                error = f"status code {response.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt == self.retries:
+                raise DataLichenUnavailable(f"{error} after {attempt + 1} attempts")
+            logger.warning(f"Data Lichen batch attempt {attempt + 1} failed ({error}), retrying in {delay}s")
+            time.sleep(delay)
+            delay *= 2
+
+        if response.status_code != 200:
+            # A batch Data Lichen rejects as invalid would be rejected again, so it is dropped
+            metrics.data_lichen_entries.labels("rejected").inc(len(batch))
+            logger.error(f"Data Lichen rejected {len(batch)} metadata entries with status code {response.status_code}: {response.text}")
+            return
+        metrics.data_lichen_entries.labels("registered").inc(len(batch))
+        logger.info(response.json().get('message', f"Registered {len(batch)} metadata entries"))
+
+    @metrics.timed("data_lichen_register_batch")
+    def _post(self, batch):
+        return self.session.post(f"{self.base_url}/register-batch", json=batch, timeout=REQUEST_TIMEOUT)
+
+    def _drop_overflow(self):
+        # Caller holds self.condition
+        overflow = len(self.buffer) - self.max_buffered
+        if overflow > 0:
+            del self.buffer[:overflow]
+            metrics.data_lichen_entries.labels("dropped").inc(overflow)
+            logger.error(f"Metadata buffer full, dropped the {overflow} oldest entries")
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                if len(self.buffer) < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+            if self.stop_event.is_set():
+                return
+            self.flush()
+
+
+registrar = DataLichenRegistrar(settings.DATA_LICHEN_URL)
@@ -1,29 +1,61 @@
 from concurrent.futures import ThreadPoolExecutor
 from minio import Minio
 import threading
+from utilities import content_index, metrics
+from utilities.settings import settings
 
 minio_lock = threading.Lock()
-MINIO_POOL_SIZE = 10
+MINIO_POOL_SIZE = settings.MINIO_POOL_SIZE
 executor = ThreadPoolExecutor(max_workers=MINIO_POOL_SIZE)
 
+def open_minio_object(storage_info):
+    # Returns the raw streaming response; callers must close() and release_conn() it
+    minio_client = Minio(
+        storage_info["distributedStorageAddress"],
+        access_key=storage_info["minio_access_key"],
+        secret_key=storage_info["minio_secret_key"],
+        secure=settings.MINIO_SECURE
+    )
+    return minio_client.get_object(storage_info["bucket_name"], storage_info["object_name"])
+
+@metrics.timed("minio_fetch")
 def minio_fetch(storage_info):
+    """Fetch an object as bytes; returns the bytes and their SHA-256 hex digest."""
     with minio_lock:
-        minio_client = Minio(
-            storage_info["distributedStorageAddress"],
-            access_key=storage_info["minio_access_key"],
-            secret_key=storage_info["minio_secret_key"],
-            secure=False
-        )
+        response = open_minio_object(storage_info)
+        try:
+            data, data_hash = content_index.read_object(response, settings.MINIO_FETCH_SIZE)
+        finally:
+            response.close()
+            response.release_conn()
 
-        data = minio_client.get_object(storage_info["bucket_name"], storage_info["object_name"])
-        chunks = []
+        metrics.minio_bytes_fetched.inc(len(data))
+        return data, data_hash
 
-        for d in data.stream(32*1024):
-            chunks.append(d)
+@metrics.timed("minio_fetch")
+def minio_fetch_new(storage_info, db_path):
+    """
+    Fetch an object unless db_path already holds its content; returns (data, data_hash,
+    etag), or None for a duplicate, which is detected from the ETag before the body is read.
+    """
+    with minio_lock:
+        response = open_minio_object(storage_info)
+        try:
+            fetched = content_index.read_new_object(response, db_path, settings.MINIO_FETCH_SIZE)
+        finally:
+            response.close()
+            response.release_conn()
 
-        data_str = b''.join(chunks).decode('utf-8')
-        return data_str
+        if fetched is not None:
+            metrics.minio_bytes_fetched.inc(len(fetched[0]))
+        return fetched
 
-def fetch_data_from_minio(storage_info):
+def fetch_object_from_minio(storage_info):
     return executor.submit(minio_fetch, storage_info).result()
 
+def fetch_new_object_from_minio(storage_info, db_path):
+    return executor.submit(minio_fetch_new, storage_info, db_path).result()
+
+def fetch_data_from_minio(storage_info):
+    data, _ = fetch_object_from_minio(storage_info)
+    return data.decode('utf-8')
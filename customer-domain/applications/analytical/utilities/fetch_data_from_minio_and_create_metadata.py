@@ -3,7 +3,8 @@ import time
 from utilities import fetch_data_from_minio, save_data_to_sqlite, create_metadata, get_all_storage_from_db
 from utilities import save_data_to_sqlite
 
-def fetch_data_from_minio_and_create_metadata():
+def fetch_data_from_minio_and_create_metadata(job=None):
+    """Save every stored object to SQLite and profile it; progress is reported to job when given."""
     print("Starting data fetching and metadata creation process...")
 
     actual_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -14,19 +15,40 @@ def fetch_data_from_minio_and_create_metadata():
 
     print(f"Storage Info: {all_storage_info}")
     print(f'Total number of objects to receive: {len(all_storage_info)}')
+    if job is not None:
+        job.set_total(len(all_storage_info))
 
     print(all_storage_info)
 
+    data = None
     for storage_info in all_storage_info:
         print(f"Fetching data from Minio for storage: {storage_info}...")
-        data_str = fetch_data_from_minio.fetch_data_from_minio(storage_info)
+        # Kept as bytes from Minio to SQLite, hashed while it is read. Objects already
+        # stored, by ETag or by content, are skipped before they are saved
+        fetched = fetch_data_from_minio.fetch_new_object_from_minio(storage_info, save_data_to_sqlite.CUSTOMER_DATA_DB)
+        if fetched is None:
+            print(f"Data from storage {storage_info} is already stored. Skipping.")
+            if job is not None:
+                job.advance()
+            continue
+
+        data, data_hash, etag = fetched
         print(f"Saving data from storage {storage_info} to SQLite...")
-        save_data_to_sqlite.save_data_to_sqlite(data_str)
-
+        save_data_to_sqlite.save_data_to_sqlite(data, data_hash, {
+            "etag": etag,
+            "bucket_name": storage_info["bucket_name"],
+            "object_name": storage_info["object_name"]
+        })
+        if job is not None:
+            job.advance(bytes=len(data))
+
+    if data is None:
+        print("No new data was fetched; no metadata to create.")
+        return None
 
     processing_duration = time.time() - start_time
     print(f"Creating metadata... (Processing duration: {processing_duration} seconds)")
-    metadata = create_metadata.create_metadata(actual_time, processing_duration, data_str)
+    metadata = create_metadata.create_metadata(actual_time, processing_duration, data)
 
     print("Data fetching and metadata creation process completed.")
     return metadata
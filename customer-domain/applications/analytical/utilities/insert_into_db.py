@@ -1,6 +1,7 @@
 import sqlite3
-from utilities import record_exists
+from utilities import record_exists, metrics
 
+@metrics.timed("storage_info_insert")
 def insert_into_db(storage_info):
     if not record_exists.record_exists(storage_info):
         # Your existing insertion code goes here...
@@ -21,6 +22,47 @@ def insert_into_db(storage_info):
                 storage_info['object_name']
             ))
             conn.commit()
+            metrics.rows_ingested.labels("storage_info").inc()
 
         finally:
             conn.close()
+
+@metrics.timed("storage_info_insert")
+def insert_batch_into_db(storage_info_list):
+    # Same as insert_into_db, but the existence checks and inserts of the whole
+    # batch share one connection and one transaction
+    conn = sqlite3.connect('object_storage_address.db')
+    inserted = 0
+    try:
+        with conn:
+            cursor = conn.cursor()
+            for storage_info in storage_info_list:
+                values = (
+                    storage_info['distributedStorageAddress'],
+                    storage_info['minio_access_key'],
+                    storage_info['minio_secret_key'],
+                    storage_info['bucket_name'],
+                    storage_info['object_name']
+                )
+
+                cursor.execute("""
+                    SELECT EXISTS(SELECT 1 
+                                  FROM storage_info 
+                                  WHERE distributedStorageAddress=? 
+                                  AND minio_access_key=? 
+                                  AND minio_secret_key=? 
+                                  AND bucket_name=? 
+                                  AND object_name=?)
+                """, values)
+                if cursor.fetchone()[0] == 1:
+                    continue
+
+                cursor.execute("""
+                    INSERT INTO storage_info(distributedStorageAddress, minio_access_key, minio_secret_key, bucket_name, object_name) 
+                    VALUES (?, ?, ?, ?, ?)
+                """, values)
+                inserted += 1
+    finally:
+        conn.close()
+
+    metrics.rows_ingested.labels("storage_info").inc(inserted)
@@ -1,4 +1,6 @@
+import json
 import requests
+from utilities import metrics
 
 def listen_to_kafka_topic(kafka_rest_proxy_url, topic_name):
     url = f"{kafka_rest_proxy_url}/topics/{topic_name}/records"
@@ -8,6 +10,7 @@ def listen_to_kafka_topic(kafka_rest_proxy_url, topic_name):
         raise Exception(f"Error listening to topic {topic_name}: {response.text}")
     return response.json()
 
+@metrics.timed("kafka_publish")
 def post_to_kafka_topic(kafka_rest_proxy_url, topic_name, message):
     url = f"{kafka_rest_proxy_url}/topics/{topic_name}"
     headers = {
@@ -18,6 +21,8 @@ def post_to_kafka_topic(kafka_rest_proxy_url, topic_name, message):
             {"value": message}
         ]
     }
-    response = requests.post(url, headers=headers, json=payload)
+    body = json.dumps(payload)
+    response = requests.post(url, headers=headers, data=body)
     if response.status_code != 200:
-        raise Exception(f"Error posting to topic {topic_name}: {response.text}")
\ No newline at end of file
+        raise Exception(f"Error posting to topic {topic_name}: {response.text}")
+    metrics.record_publish(topic_name, len(body))
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+from utilities import sqlite_query
+from utilities.settings import settings
+
+TABLE_NAME = "customer_data"
+PAGE_SIZE = settings.QUERY_PAGE_SIZE
+MAX_PAGE_SIZE = settings.QUERY_MAX_PAGE_SIZE
+
+
+def ensure_index(cursor):
+    """
+    Covering index for listings: a page of ids and hashes is read from the index alone,
+    without touching the table pages that hold the objects. Hash lookups are covered
+    by the table's unique data_hash index.
+    """
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE_NAME,)).fetchone():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_listing ON {TABLE_NAME} (id, data_hash)")
+
+
+def ensure_index_exists(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_index(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def query_customer_data(db_path, min_id=None, max_id=None, data_hash=None, include_data=False, limit=PAGE_SIZE, cursor=None):
+    """
+    One page of stored customer objects in id order: ids and hashes, plus each object's
+    data when include_data is set. Returns None before any customer data has been
+    stored; raises ValueError for an invalid request.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if not os.path.exists(db_path) or not sqlite_query.table_columns(db_path, TABLE_NAME):
+        return None
+
+    # Conditions are added in a fixed order, so each combination of filters has one
+    # statement text and is prepared only once per connection
+    conditions, parameters = [], []
+    if min_id is not None:
+        conditions.append("id >= ?")
+        parameters.append(min_id)
+    if max_id is not None:
+        conditions.append("id <= ?")
+        parameters.append(max_id)
+    if data_hash is not None:
+        conditions.append("data_hash = ?")
+        parameters.append(data_hash)
+    if cursor is not None:
+        conditions.append("id > ?")
+        parameters.extend(sqlite_query.decode_cursor(cursor, 1))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if include_data:
+        sql = f"SELECT id, data_hash, data FROM {TABLE_NAME} {where} ORDER BY id LIMIT ?"
+    else:
+        sql = f"SELECT id, data_hash FROM {TABLE_NAME} {where} ORDER BY id LIMIT ?"
+    rows = sqlite_query.cached_query(db_path, TABLE_NAME, sql, parameters + [limit])
+
+    objects = []
+    for row in rows:
+        entry = {"id": row[0], "data_hash": row[1]}
+        if include_data:
+            # Objects are UTF-8 JSON documents; rows stored before they were kept as bytes hold text
+            entry["data"] = row[2] if isinstance(row[2], str) else row[2].decode('utf-8')
+        objects.append(entry)
+
+    next_cursor = sqlite_query.encode_cursor([rows[-1][0]]) if len(rows) == limit else None
+    return {"objects": objects, "next_cursor": next_cursor}
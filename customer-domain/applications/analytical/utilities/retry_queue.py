@@ -0,0 +1,221 @@
+import base64
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from utilities import kafka_utils, metrics
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_QUEUE_DB = settings.RETRY_QUEUE_DB
+BASE_DELAY = settings.RETRY_BASE_DELAY  # seconds before the first retry, doubled for each next one
+MAX_DELAY = settings.RETRY_MAX_DELAY
+MAX_ATTEMPTS = settings.RETRY_MAX_ATTEMPTS  # attempts before an operation is dead-lettered
+MAX_REPLAYS = settings.RETRY_MAX_REPLAYS  # times a dead letter may be replayed from its error topic
+POLL_INTERVAL = settings.RETRY_POLL_INTERVAL
+DRAIN_BATCH_SIZE = settings.RETRY_BATCH_SIZE
+
+
+def backoff_delay(attempts, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Exponential backoff with jitter: a random delay in the upper half of base * 2^(attempts - 1)."""
+    delay = min(max_delay, base_delay * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+class RetryQueue:
+    """
+    Persistent queue of failed operations, kept in SQLite so retries survive restarts.
+
+    Each operation is registered with a handler and a dead-letter topic. A failed call
+    is enqueued with its JSON payload, and a background drainer retries it with
+    exponential backoff and jitter. After MAX_ATTEMPTS failures the payload is posted
+    to the dead-letter topic. replay_batch, run by a consumer of those topics, queues
+    the dead letters again, at most MAX_REPLAYS times each.
+    """
+
+    def __init__(self, kafka_rest_proxy_url, db_path=RETRY_QUEUE_DB, max_attempts=MAX_ATTEMPTS, max_replays=MAX_REPLAYS, poll_interval=POLL_INTERVAL):
+        self.kafka_rest_proxy_url = kafka_rest_proxy_url
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.max_replays = max_replays
+        self.poll_interval = poll_interval
+        self.operations = {}
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def register(self, operation, handler, dead_letter_topic):
+        """handler(payload) performs the operation and raises when it fails."""
+        self.operations[operation] = (handler, dead_letter_topic)
+
+    @contextmanager
+    def _connection(self):
+        # One connection per use, committed on success, as the rest of the service does
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def ensure_table_exists(self):
+        with self._connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS retry_queue (
+                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                operation TEXT NOT NULL,
+                                payload TEXT NOT NULL,
+                                attempts INTEGER NOT NULL DEFAULT 0,
+                                replays INTEGER NOT NULL DEFAULT 0,
+                                next_attempt REAL NOT NULL,
+                                last_error TEXT,
+                                created REAL NOT NULL
+                            )''')
+            conn.execute("CREATE INDEX IF NOT EXISTS retry_queue_next_attempt ON retry_queue (next_attempt)")
+        self._update_depth()
+
+    def enqueue(self, operation, payload, error=None, attempts=1, replays=0):
+        """Queue a failed operation; attempts is the number of calls that have already failed."""
+        if operation not in self.operations:
+            raise ValueError(f"Unknown retry operation '{operation}'")
+        now = time.time()
+        next_attempt = now + backoff_delay(attempts) if attempts else now
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO retry_queue (operation, payload, attempts, replays, next_attempt, last_error, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (operation, json.dumps(payload), attempts, replays, next_attempt, error and str(error), now)
+            )
+        metrics.retry_operations.labels(operation, "queued").inc()
+        self._update_depth()
+
+    def drain(self, limit=DRAIN_BATCH_SIZE):
+        """Retry the operations that are due. Returns the number that succeeded."""
+        with self._connection() as conn:
+            due = conn.execute(
+                "SELECT id, operation, payload, attempts, replays FROM retry_queue WHERE next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+
+        succeeded = 0
+        for row_id, operation, payload, attempts, replays in due:
+            if self._retry(row_id, operation, json.loads(payload), attempts, replays):
+                succeeded += 1
+        if due:
+            self._update_depth()
+        return succeeded
+
+    def _retry(self, row_id, operation, payload, attempts, replays):
+        if operation not in self.operations:
+            # Queued by an older version of the service
+            logger.error(f"Dropping queued operation '{operation}', which is no longer registered")
+            self._delete(row_id)
+            return False
+
+        handler, dead_letter_topic = self.operations[operation]
+        try:
+            handler(payload)
+        except Exception as e:
+            attempts += 1
+            if attempts < self.max_attempts:
+                self._reschedule(row_id, attempts, e)
+                metrics.retry_operations.labels(operation, "retried").inc()
+                return False
+            self._dead_letter(row_id, operation, payload, attempts, replays, dead_letter_topic, e)
+            return False
+
+        self._delete(row_id)
+        metrics.retry_operations.labels(operation, "succeeded").inc()
+        return True
+
+    def _dead_letter(self, row_id, operation, payload, attempts, replays, topic, error):
+        logger.error(f"{operation} failed {attempts} times, sending it to {topic}: {error}")
+        try:
+            kafka_utils.post_to_kafka_topic(self.kafka_rest_proxy_url, topic, {
+                "status": "retries_exhausted",
+                "error": str(error),
+                "operation": operation,
+                "payload": payload,
+                "attempts": attempts,
+                "replays": replays,
+                "timestamp": time.time()
+            })
+        except Exception as e:
+            # Kept locally and dead-lettered again at the next attempt
+            logger.error(f"Posting {operation} to {topic} failed: {e}")
+            self._reschedule(row_id, attempts, error)
+            return
+        self._delete(row_id)
+        metrics.retry_operations.labels(operation, "dead_lettered").inc()
+
+    def _reschedule(self, row_id, attempts, error):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE retry_queue SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + backoff_delay(attempts), str(error), row_id)
+            )
+
+    def _delete(self, row_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM retry_queue WHERE id = ?", (row_id,))
+
+    def replay_batch(self, records):
+        """Batch handler for a consumer of the dead-letter topics: queue the dead letters again."""
+        for record in records:
+            try:
+                value = json.loads(base64.b64decode(record['value']).decode('utf-8'))
+            except (TypeError, ValueError) as e:
+                logger.error(f"Skipping unreadable record at {record['topic']}/{record['partition']}/{record['offset']}: {e}")
+                continue
+
+            operation = value.get("operation") if isinstance(value, dict) else None
+            if operation not in self.operations:
+                # Failure notices without a payload cannot be replayed
+                logger.info(f"Skipping non-replayable record at {record['topic']}/{record['partition']}/{record['offset']}")
+                continue
+            replays = value.get("replays", 0) + 1
+            if replays > self.max_replays:
+                logger.error(f"Not replaying {operation} from {record['topic']}, already replayed {replays - 1} times")
+                metrics.retry_operations.labels(operation, "abandoned").inc()
+                continue
+            # Replayed operations are due immediately and get the full number of attempts again
+            self.enqueue(operation, value["payload"], value.get("error"), attempts=0, replays=replays)
+            metrics.retry_operations.labels(operation, "replayed").inc()
+
+    def pending(self):
+        with self._connection() as conn:
+            return {
+                operation: {"count": count, "next_attempt": next_attempt}
+                for operation, count, next_attempt in conn.execute(
+                    "SELECT operation, COUNT(*), MIN(next_attempt) FROM retry_queue GROUP BY operation"
+                )
+            }
+
+    def start(self):
+        self.ensure_table_exists()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="retry-queue-drainer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _update_depth(self):
+        with self._connection() as conn:
+            metrics.retry_queue_depth.set(conn.execute("SELECT COUNT(*) FROM retry_queue").fetchone()[0])
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                # Keep draining while retries succeed, so a recovered backlog clears quickly
+                while self.drain() and not self._stop_event.is_set():
+                    pass
+            except Exception as e:
+                logger.error(f"Draining the retry queue failed: {e}")
@@ -1,35 +1,52 @@
 import sqlite3
 import json
 import hashlib
-
-def compute_hash(data_str):
-    return hashlib.sha256(data_str.encode('utf-8')).hexdigest()
-
-def save_data_to_sqlite(data_str):
-    conn = sqlite3.connect('customer_data.db')
+from utilities import content_index, metrics, query_customer_data, sqlite_query
+
+CUSTOMER_DATA_DB = 'customer_data.db'
+
+def compute_hash(data):
+    # Text is hashed as UTF-8, so an object has the same hash as text or as bytes
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+@metrics.timed("sqlite_write")
+def save_data_to_sqlite(data, data_hash=None, source=None):
+    """
+    Store one object as a BLOB unless an object with the same hash is stored already.
+    data is bytes (or text, which is encoded); pass data_hash when it was computed
+    while the object was read. source (etag, bucket_name, object_name) records the
+    object in the content index in the same transaction.
+    """
+    conn = sqlite3.connect(CUSTOMER_DATA_DB)
     cursor = conn.cursor()
 
     # Compute the hash of the data
-    data_hash = compute_hash(data_str)
-
-    # Ensure table exists
-    cursor.execute("CREATE TABLE IF NOT EXISTS customer_data (id INTEGER PRIMARY KEY, data TEXT, data_hash TEXT UNIQUE)")
-
-    # Check if data_hash already exists
-    cursor.execute("SELECT * FROM customer_data WHERE data_hash=?", (data_hash,))
-    existing_data = cursor.fetchone()
-
-    # If the data does not already exist, save it
-    if not existing_data:
-        try:
-            cursor.execute("INSERT INTO customer_data (data, data_hash) VALUES (?, ?)", (data_str, data_hash))
-        except Exception as e:
-            print(f"Error while inserting data into SQLite: {e}")
-    else:
-        print(f"Data with hash {data_hash} already exists. Skipping.")
+    if data_hash is None:
+        data_hash = compute_hash(data)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    # Ensure table exists. Rows written before objects were kept as bytes hold TEXT
+    cursor.execute("CREATE TABLE IF NOT EXISTS customer_data (id INTEGER PRIMARY KEY, data BLOB, data_hash TEXT UNIQUE)")
+    query_customer_data.ensure_index(cursor)
+
+    # The unique data_hash skips objects that are already stored, without reading them back
+    try:
+        cursor.execute("INSERT OR IGNORE INTO customer_data (data, data_hash) VALUES (?, ?)", (data, data_hash))
+        if cursor.rowcount:
+            metrics.rows_ingested.labels("customer_data").inc()
+        else:
+            print(f"Data with hash {data_hash} already exists. Skipping.")
+        if source is not None:
+            content_index.remember(cursor, data_hash, size=len(data), **source)
+    except Exception as e:
+        print(f"Error while inserting data into SQLite: {e}")
 
     conn.commit()
     conn.close()
+    sqlite_query.invalidate("customer_data")
 
 
 # def save_data_to_sqlite(data_str):
@@ -1,18 +1,21 @@
 from minio import Minio
 import io
+from utilities import metrics
+from utilities.settings import settings
 
-def upload_data_to_minio(bucket_name, data, object_name, minio_url, minio_access_key, minio_secret_key):
+@metrics.timed("minio_upload")
+def upload_data_to_minio(bucket_name, data, object_name, minio_url, minio_access_key, minio_secret_key, metadata=None):
     minioClient = Minio(minio_url,
                         access_key=minio_access_key,
                         secret_key=minio_secret_key,
-                        secure=False)
+                        secure=settings.MINIO_SECURE)
     
     # Ensure bucket exists or create
     if not minioClient.bucket_exists(bucket_name):
         minioClient.make_bucket(bucket_name)
 
-    # Upload the data
-    data_bytes = data.encode('utf-8')
+    # Upload the data straight from the caller's bytes; BytesIO shares a bytes buffer rather than copying it
+    data_bytes = data.encode('utf-8') if isinstance(data, str) else data
     file_size = len(data_bytes)
-    minioClient.put_object(bucket_name, object_name, io.BytesIO(data_bytes), file_size, content_type='application/json')
+    minioClient.put_object(bucket_name, object_name, io.BytesIO(data_bytes), file_size, content_type='application/json', metadata=metadata)
 
@@ -1,25 +1,223 @@
+import argparse
+import gzip
 import json
+import mmap
 import os
-import sys
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 
-def chunk_json(input_filename, max_size_in_mb):
-    # Strip the file extension and prepare output filename prefix
-    output_filename = os.path.splitext(input_filename)[0] + "_chunk"
+COPY_BUFFER_SIZE = 8 * 1024 * 1024  # Block size for copying and writing chunk files
+READ_SIZE = 1024 * 1024  # Text read size when scanning a JSON array
+CHUNK_FILE_PATTERN = re.compile(r"_chunk\d+\.json$")
 
-    i = 0                               
-    with open(input_filename, 'r') as input_file:
-        chunk_file = open(f"{output_filename}{i}.json", "w")        
-        for line in input_file:
-            chunk_file.write(line)
-            chunk_file.flush()  # Ensure it's written to disk to get accurate size
-            if os.path.getsize(f"{output_filename}{i}.json") > max_size_in_mb * 1024 * 1024:
-                chunk_file.close()
-                i += 1
-                chunk_file = open(f"{output_filename}{i}.json", "w")
-        chunk_file.close()
+
+def chunk_filename(input_filename, index):
+    # Strip the file extension and number the output files
+    return f"{os.path.splitext(input_filename)[0]}_chunk{index}.json"
+
+
+def find_line_boundaries(mm, max_size):
+    """
+    Return (start, end) byte ranges that split on newlines, each at most max_size
+    unless a single line is larger than that.
+    """
+    boundaries = []
+    start = 0
+    total_size = len(mm)
+
+    while start < total_size:
+        end = start + max_size
+        if end >= total_size:
+            end = total_size
+        else:
+            cut = mm.rfind(b"\n", start, end)
+            if cut == -1:
+                # A single record is larger than max_size; keep it whole
+                cut = mm.find(b"\n", end)
+                end = total_size if cut == -1 else cut + 1
+            else:
+                end = cut + 1
+
+        boundaries.append((start, end))
+        start = end
+
+    return boundaries
+
+
+def write_byte_range(input_filename, start, end, output_filename, compress=False):
+    """Copy input[start:end] to output_filename in large blocks, optionally gzipped."""
+    if compress:
+        output_filename += ".gz"
+        output_file = gzip.open(output_filename, "wb")
+    else:
+        output_file = open(output_filename, "wb", buffering=COPY_BUFFER_SIZE)
+
+    with open(input_filename, "rb") as input_file, output_file:
+        input_file.seek(start)
+        remaining = end - start
+        while remaining:
+            block = input_file.read(min(COPY_BUFFER_SIZE, remaining))
+            if not block:
+                break
+            output_file.write(block)
+            remaining -= len(block)
+
+    return output_filename
+
+
+def compress_file(filename):
+    """Gzip filename next to itself and remove the uncompressed copy."""
+    with open(filename, "rb") as source, gzip.open(filename + ".gz", "wb") as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+    os.remove(filename)
+    return filename + ".gz"
+
+
+def run_jobs(function, jobs, workers):
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(function, *job) for job in jobs]
+            return [future.result() for future in futures]
+    return [function(*job) for job in jobs]
+
+
+def chunk_lines(input_filename, max_size, compress=False, workers=None):
+    """Split a newline-delimited file; one line is one record."""
+    if os.path.getsize(input_filename) == 0:
+        return []
+
+    with open(input_filename, "rb") as input_file:
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            boundaries = find_line_boundaries(mm, max_size)
+
+    jobs = [
+        (input_filename, start, end, chunk_filename(input_filename, i), compress)
+        for i, (start, end) in enumerate(boundaries)
+    ]
+    return run_jobs(write_byte_range, jobs, workers)
+
+
+def iter_array_records(input_file):
+    """Yield the raw text of each element of a top-level JSON array without loading it all."""
+    decoder = json.JSONDecoder()
+    buffer = input_file.read(READ_SIZE)
+    eof = not buffer
+    pos = 0
+
+    def skip(chars):
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            buffer, pos = input_file.read(READ_SIZE), 0
+            eof = not buffer
+
+    skip(" \t\r\n")
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array at the start of the input")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[pos] == "]":
+            return
+
+        try:
+            _, end = decoder.raw_decode(buffer, pos)
+            # A value that ends exactly at the buffer edge may be a truncated number
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+
+        if not complete:
+            more = input_file.read(READ_SIZE)
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+
+        yield buffer[pos:end]
+        pos = end
+
+
+def chunk_array(input_filename, max_size, compress=False, workers=None):
+    """Split a top-level JSON array into files that are each a valid JSON array."""
+    outputs = []
+    output_file = None
+    chunk_size = 0
+
+    with open(input_filename, "r", encoding="utf-8", buffering=COPY_BUFFER_SIZE) as input_file:
+        for record in iter_array_records(input_file):
+            data = record.encode("utf-8")
+
+            if output_file is not None and chunk_size + len(data) + 2 > max_size:
+                output_file.write(b"]")
+                output_file.close()
+                output_file = None
+
+            if output_file is None:
+                outputs.append(chunk_filename(input_filename, len(outputs)))
+                output_file = open(outputs[-1], "wb", buffering=COPY_BUFFER_SIZE)
+                output_file.write(b"[")
+                chunk_size = 1
+            else:
+                output_file.write(b",")
+                chunk_size += 1
+
+            output_file.write(data)
+            chunk_size += len(data)
+
+    if output_file is not None:
+        output_file.write(b"]")
+        output_file.close()
+
+    if compress:
+        outputs = run_jobs(compress_file, [(output,) for output in outputs], workers)
+    return outputs
+
+
+def chunk_json(input_filename, max_size_in_mb, mode="lines", compress=False, workers=None):
+    """
+    Split input_filename into <name>_chunk<i>.json files of at most max_size_in_mb,
+    cutting only on record boundaries. mode is "lines" for one JSON record per line
+    or "array" for a single top-level JSON array. Returns the output file names.
+    """
+    max_size = int(max_size_in_mb * 1024 * 1024)
+
+    if mode == "array":
+        return chunk_array(input_filename, max_size, compress, workers)
+    return chunk_lines(input_filename, max_size, compress, workers)
+
+
+def chunk_files_larger_than(filenames, max_size_in_mb, mode="lines"):
+    """Replace every file above max_size_in_mb with its chunks; existing chunk files pass through."""
+    max_size = max_size_in_mb * 1024 * 1024
+    result = []
+
+    for filename in filenames:
+        if CHUNK_FILE_PATTERN.search(filename) or os.path.getsize(filename) <= max_size:
+            result.append(filename)
+        else:
+            result.extend(chunk_json(filename, max_size_in_mb, mode))
+
+    # Chunks left over from an earlier run would otherwise be listed twice
+    return list(dict.fromkeys(result))
 
 
 if __name__ == "__main__":
-    filename = sys.argv[1]
-    max_size_in_mb = int(sys.argv[2])  # convert string to int
-    chunk_json(filename, max_size_in_mb)
+    parser = argparse.ArgumentParser(description="Split a large JSON export into smaller files.")
+    parser.add_argument("filename")
+    parser.add_argument("max_size_in_mb", type=float)
+    parser.add_argument("--array", action="store_true", help="input is a single top-level JSON array")
+    parser.add_argument("--compress", action="store_true", help="gzip each chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes for writing/compressing chunks")
+    args = parser.parse_args()
+
+    chunk_json(args.filename, args.max_size_in_mb, "array" if args.array else "lines", args.compress, args.workers)
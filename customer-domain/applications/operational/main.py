@@ -1,15 +1,19 @@
 from fastapi import FastAPI
 import requests
 from minio import Minio
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 import os
+import asyncio
 import logging
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from utilities.kafka_rest_proxy_exporter import KafkaRESTProxyExporter
+from utilities import store_json_file_in_minio
+from utilities.settings import settings
+import chunker
 from opentelemetry.trace import SpanKind
 
 app = FastAPI()
@@ -17,14 +21,19 @@ FastAPIInstrumentor.instrument_app(app)
 
 # Global variables
 SERVICE_NAME = "CUSTOMER_DOMAIN_OPERATIONAL_SERVICE"
-SERVICE_ADDRESS = "http://localhost:8001"
-KAFKA_REST_PROXY_URL = "http://localhost/kafka-rest-proxy"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8001"
+KAFKA_REST_PROXY_URL = settings.KAFKA_REST_PROXY_URL
 
 # Setting up the trace provider
 trace.set_tracer_provider(TracerProvider())
 
 kafka_exporter = KafkaRESTProxyExporter(topic_name="telemetry-data", rest_proxy_url=KAFKA_REST_PROXY_URL, service_name=SERVICE_NAME, service_address=SERVICE_ADDRESS)
-span_processor = BatchSpanProcessor(kafka_exporter)
+span_processor = BatchSpanProcessor(
+    kafka_exporter,
+    max_queue_size=settings.TELEMETRY_QUEUE_SIZE,
+    schedule_delay_millis=settings.TELEMETRY_EXPORT_DELAY_MS,
+    max_export_batch_size=settings.TELEMETRY_EXPORT_BATCH_SIZE
+)
 trace.get_tracer_provider().add_span_processor(span_processor)
 
 # Setting up OpenTelemetry
@@ -36,17 +45,22 @@ logger = logging.getLogger(__name__)
 
 # Constants
 cluster_id = None 
-kafka_rest_proxy_base_url = "http://localhost/kafka-rest-proxy"
-minio_url = "localhost:9001"
-minio_acces_key = "minioadmin"
-minio_secret_key = "minioadmin"
+kafka_rest_proxy_base_url = settings.KAFKA_REST_PROXY_URL
+minio_url = settings.MINIO_ENDPOINT
+minio_acces_key = settings.MINIO_ACCESS_KEY
+minio_secret_key = settings.MINIO_SECRET_KEY
+UPLOAD_POOL_SIZE = settings.MINIO_UPLOAD_POOL_SIZE  # Concurrent Minio uploads when storing a directory
+ANNOUNCE_BATCH_SIZE = settings.KAFKA_PRODUCE_BATCH_SIZE  # Stored files announced per REST Proxy request
+
+# Bounded worker pool shared by all /store-operational-data calls
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_POOL_SIZE)
 
 # Initialize the Minio client
 minio_client = Minio(
     minio_url,
     access_key=minio_acces_key,
     secret_key=minio_secret_key,
-    secure=False
+    secure=settings.MINIO_SECURE
 )
 
 @app.on_event('startup')
@@ -77,8 +91,62 @@ def list_json_files(directory='.'):
     """Return a list of all JSON files in the directory."""
     return [f for f in os.listdir(directory) if f.endswith('.json')]
 
+def announce_stored_files(url, headers, records, span):
+    """Dispatch the details of a batch of stored files to Kafka in one request."""
+    try:
+        response = requests.post(url, headers=headers, data=json.dumps({"records": records}), timeout=settings.KAFKA_PUBLISH_TIMEOUT)
+    except requests.RequestException as e:
+        span.set_attribute("error", True)
+        span.set_attribute("error_details", str(e))
+        logging.error(f"Error dispatching details of {len(records)} files to Kafka: {e}")
+        return
+    if response.status_code != 200:
+        span.set_attribute("error", True)
+        span.set_attribute("error_details", response.text)
+        logging.error(f"Error dispatching details of {len(records)} files to Kafka: {response.text}")
+
+def upload_and_announce_files(json_files, minio_bucket_name, url, headers, span):
+    """Upload the files concurrently and announce them to Kafka in batches; returns the number stored."""
+    parent_context = trace.set_span_in_context(span)
+    futures = {
+        upload_executor.submit(store_json_file_in_minio.store_json_file_in_minio, minio_client, minio_bucket_name, json_file, parent_context): json_file
+        for json_file in json_files
+    }
+
+    processed_files = 0
+    pending_records = []
+    for future in as_completed(futures):
+        json_file = futures[future]
+        try:
+            future.result()
+        except Exception as e:
+            logging.error(f"Error processing file {json_file}. Details: {str(e)}")
+            continue
+
+        pending_records.append({
+            "key": "customer-domain-operational-data-stored",
+            "value": {
+                "message": f"Stored {json_file}",
+                "distributedStorageAddress": minio_url,
+                "minio_access_key": minio_acces_key,
+                "minio_secret_key": minio_secret_key,
+                "bucket_name": minio_bucket_name,
+                "object_name": json_file
+            }
+        })
+        processed_files += 1
+        logging.info(f"Processed {processed_files}/{len(json_files)} files.")
+
+        if len(pending_records) >= ANNOUNCE_BATCH_SIZE:
+            announce_stored_files(url, headers, pending_records, span)
+            pending_records = []
+
+    if pending_records:
+        announce_stored_files(url, headers, pending_records, span)
+    return processed_files
+
 @app.get('/store-operational-data')
-async def produce_to_kafka(topic: str = 'domain-customer-operational-data'):
+async def produce_to_kafka(topic: str = 'domain-customer-operational-data', max_file_size_mb: int = 0):
     with tracer.start_as_current_span("store-operational-data", kind=SpanKind.SERVER) as span:
 
         # Kafka REST Proxy URL for producing messages to a topic
@@ -111,11 +179,14 @@ async def produce_to_kafka(topic: str = 'domain-customer-operational-data'):
 
         # List all JSON files in current directory
         json_files = list_json_files()  # Use the previously defined function
-        total_files = len(json_files)
-        processed_files = 0
 
-        print(total_files)
-        print(json_files)
+        # Optionally split oversized exports in-process before uploading them
+        if max_file_size_mb > 0:
+            span.add_event("Chunking JSON files larger than the size limit")
+            json_files = chunker.chunk_files_larger_than(json_files, max_file_size_mb)
+
+        total_files = len(json_files)
+        logging.info(f"Found {total_files} JSON files to store.")
 
         minio_bucket_name = "customer-domain-operational-data"
         
@@ -123,56 +194,8 @@ async def produce_to_kafka(topic: str = 'domain-customer-operational-data'):
         if not minio_client.bucket_exists(minio_bucket_name):
             minio_client.make_bucket(minio_bucket_name)
 
-        # Loop over all JSON files, store them in Minio, and dispatch details to Kafka
-        for json_file in json_files:
-            with tracer.start_as_current_span(f"processing-{json_file}", kind=SpanKind.INTERNAL) as file_span:
-                try:
-                    # Read the entire JSON file
-                    with open(json_file, 'r') as f:
-                        data = f.read()
-
-                    # Convert data to bytes and store in Minio
-                    data_bytes = data.encode('utf-8')
-                    data_io = BytesIO(data_bytes)
-                    
-                    # Put object in Minio
-                    minio_client.put_object(
-                        bucket_name=minio_bucket_name,
-                        object_name=json_file,
-                        data=data_io,
-                        length=len(data_bytes),
-                        content_type='application/json',
-                    )
-
-                    # Dispatch the details of the file to Kafka
-                    payload_file = {
-                        "records": [
-                            {   
-                                "key": "customer-domain-operational-data-stored",
-                                "value": {
-                                    "message": f"Stored {json_file}",
-                                    "distributedStorageAddress": minio_url,
-                                    "minio_access_key": minio_acces_key,
-                                    "minio_secret_key": minio_secret_key,
-                                    "bucket_name": minio_bucket_name,
-                                    "object_name": json_file
-                                }
-                            }
-                        ]
-                    }
-
-                    response = requests.post(url, headers=headers, data=json.dumps(payload_file))
-                    if response.status_code != 200:
-                        file_span.set_attribute("error", True)
-                        file_span.set_attribute("error_details", response.text)
-                        logging.error(f"Error dispatching details of {json_file} to Kafka: {response.text}")
-
-                    processed_files += 1
-                    logging.info(f"Processed {processed_files}/{total_files} files.")
-                except Exception as e:
-                    file_span.set_attribute("error", True)
-                    file_span.set_attribute("error_details", str(e))
-                    logging.error(f"Error processing file {json_file}. Details: {str(e)}")
+        # Waiting on the uploads blocks, so it runs off the event loop
+        processed_files = await asyncio.get_running_loop().run_in_executor(None, upload_and_announce_files, json_files, minio_bucket_name, url, headers, span)
 
         logging.info("Finished processing and storing operational data.")
         
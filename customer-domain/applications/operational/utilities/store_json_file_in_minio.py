@@ -0,0 +1,28 @@
+import os
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
+
+tracer = trace.get_tracer(__name__)
+
+def store_json_file_in_minio(minio_client, bucket_name, json_file, parent_context=None):
+    """Upload one JSON file to Minio straight from disk and return its size in bytes."""
+    with tracer.start_as_current_span(f"processing-{json_file}", context=parent_context, kind=SpanKind.INTERNAL) as file_span:
+        try:
+            # The file object is streamed by put_object using the size on disk,
+            # so the file is never read into memory as a whole
+            file_size = os.path.getsize(json_file)
+            with open(json_file, 'rb') as f:
+                minio_client.put_object(
+                    bucket_name=bucket_name,
+                    object_name=json_file,
+                    data=f,
+                    length=file_size,
+                    content_type='application/json',
+                )
+
+            file_span.set_attribute("file_size", file_size)
+            return file_size
+        except Exception as e:
+            file_span.set_attribute("error", True)
+            file_span.set_attribute("error_details", str(e))
+            raise
@@ -66,7 +66,8 @@ app.use(keycloak.middleware());
 const KAFKA_PROXY_URL = 'http://localhost/kafka-rest-proxy';
 const KAFKA_TOPIC = 'data-discovery';
 
-app.use(bodyParser.json());
+// Batches from /register-batch carry many metadata entries
+app.use(bodyParser.json({ limit: '10mb' }));
 app.use(express.static('public'));
 
 // Define your template engine
@@ -97,23 +98,78 @@ db.serialize(() => {
             )`);
 });
 
-app.post('/register', async (req, res) => {
-    const data = req.body;
-    const updateSql = `REPLACE INTO metadata(uniqueIdentifier, serviceName, serviceAddress, completeness, validity, accuracy, processingTime, actualTime, processingDuration)
-        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)`; // Added the processingDuration
-
-    db.run(updateSql,
-        [data.uniqueIdentifier, data.serviceName, data.serviceAddress, data.completeness, data.validity, data.accuracy, data.processingTime, data.actualTime, data.processingDuration],  // Added the processingDuration
-        function(err) {
-            if (err) {
-                return console.log(err.message);
+const REGISTER_SQL = `REPLACE INTO metadata(uniqueIdentifier, serviceName, serviceAddress, completeness, validity, accuracy, processingTime, actualTime, processingDuration)
+    VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)`;
+
+function metadataParams(data) {
+    return [data.uniqueIdentifier, data.serviceName, data.serviceAddress, data.completeness, data.validity, data.accuracy, data.processingTime, data.actualTime, data.processingDuration];
+}
+
+function runSql(sql) {
+    return new Promise((resolve, reject) => {
+        db.run(sql, (err) => err ? reject(err) : resolve());
+    });
+}
+
+function runStatement(statement, params) {
+    return new Promise((resolve, reject) => {
+        statement.run(params, (err) => err ? reject(err) : resolve());
+    });
+}
+
+// Writes share the one connection, so they are queued: a batch's transaction never
+// interleaves with another write
+let writeQueue = Promise.resolve();
+
+// Applies all entries in one transaction and resolves once it is committed
+function registerMetadata(entries) {
+    const write = writeQueue.then(async () => {
+        const statement = db.prepare(REGISTER_SQL);
+        await runSql('BEGIN');
+        try {
+            for (const entry of entries) {
+                await runStatement(statement, metadataParams(entry));
             }
-            console.log(`A row has been inserted/updated with UUID ${data.uniqueIdentifier}`);
-        });
+            await runSql('COMMIT');
+        } catch (err) {
+            await runSql('ROLLBACK').catch(() => {});
+            throw err;
+        } finally {
+            statement.finalize();
+        }
+    });
+    writeQueue = write.catch(() => {});
+    return write;
+}
 
+app.post('/register', async (req, res) => {
+    const data = req.body;
+    try {
+        await registerMetadata([data]);
+    } catch (err) {
+        console.error(err.message);
+        return res.status(500).json({ error: 'Failed to register metadata' });
+    }
+    console.log(`A row has been inserted/updated with UUID ${data.uniqueIdentifier}`);
     res.json({ message: 'Metadata registered successfully.' });
 });
 
+// Registers an array of metadata entries, all or none
+app.post('/register-batch', async (req, res) => {
+    const entries = req.body;
+    if (!Array.isArray(entries) || entries.some(entry => !entry || typeof entry !== 'object' || !entry.uniqueIdentifier)) {
+        return res.status(400).json({ error: 'Expected an array of metadata entries with a uniqueIdentifier' });
+    }
+    try {
+        await registerMetadata(entries);
+    } catch (err) {
+        console.error(err.message);
+        return res.status(500).json({ error: 'Failed to register metadata' });
+    }
+    console.log(`${entries.length} rows have been inserted/updated`);
+    res.json({ message: `${entries.length} metadata entries registered successfully.`, registered: entries.length });
+});
+
 app.get("/", (req,res) => {
     res.json("Welcome to Datalichen")
 })
@@ -1,11 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from utilities import kafka_rest_proxy_exporter
+from utilities.settings import settings
 from concurrent.futures import ThreadPoolExecutor
 from minio import Minio
+from minio.error import S3Error
+import asyncio
 import threading
 import logging
 from hvac import Client
@@ -18,11 +21,11 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global variables
-SERVICE_ADDRESS = "http://localhost:8010"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8010"
 SERVICE_NAME = "DATA_SCIENTIST_APPLICATION"
 SERVICE_VERSION = "1.0.0"
 ENVIRONMENT = "production"
-KAFKA_REST_PROXY_URL = "http://localhost/kafka-rest-proxy"
+KAFKA_REST_PROXY_URL = settings.KAFKA_REST_PROXY_URL
 
 # Setting up the trace provider
 trace.set_tracer_provider(TracerProvider())
@@ -32,7 +35,12 @@ kafka_exporter = kafka_rest_proxy_exporter.KafkaRESTProxyExporter(
     service_name=SERVICE_NAME,
     service_address=SERVICE_ADDRESS
 )
-span_processor = BatchSpanProcessor(kafka_exporter)
+span_processor = BatchSpanProcessor(
+    kafka_exporter,
+    max_queue_size=settings.TELEMETRY_QUEUE_SIZE,
+    schedule_delay_millis=settings.TELEMETRY_EXPORT_DELAY_MS,
+    max_export_batch_size=settings.TELEMETRY_EXPORT_BATCH_SIZE
+)
 trace.get_tracer_provider().add_span_processor(span_processor)
 
 # Setting up OpenTelemetry
@@ -40,7 +48,7 @@ tracer = trace.get_tracer(__name__)
 
 # MinIO fetch utilities
 minio_lock = threading.Lock()
-MINIO_POOL_SIZE = 10
+MINIO_POOL_SIZE = settings.MINIO_POOL_SIZE
 executor = ThreadPoolExecutor(max_workers=MINIO_POOL_SIZE)
 
 def minio_fetch(storage_info):
@@ -49,28 +57,24 @@ def minio_fetch(storage_info):
             storage_info["distributedStorageAddress"],
             access_key=storage_info["minio_access_key"],
             secret_key=storage_info["minio_secret_key"],
-            secure=False
+            secure=settings.MINIO_SECURE
         )
 
         logger.info(f"Fetching object: {storage_info['object_name']} from bucket: {storage_info['bucket_name']}")
 
-        data = minio_client.get_object(storage_info["bucket_name"], storage_info["object_name"])
-        chunks = []
-        chunk_count = 0
-        for d in data.stream(32*1024):
-            chunk_count += 1
-            chunks.append(d)
-            logger.info(f"Fetched chunk {chunk_count} for object: {storage_info['object_name']}")
-        
-        data_str = b''.join(chunks).decode('utf-8')
-        return data_str
+        # Read in one call into a single bytes object, rather than joining logged chunks
+        response = minio_client.get_object(storage_info["bucket_name"], storage_info["object_name"])
+        try:
+            return response.read(), response.headers.get("Content-Type", "application/octet-stream")
+        finally:
+            response.close()
+            response.release_conn()
 
 @app.get("/")
 async def welcome():
     return "Welcome to the Data Scientist Query Service!"
 
-@app.get("/query-data/{data_location}")
-async def query_data(data_location: str):
+def get_storage_info(data_location):
     valid_data_locations = ["custom-domain-analytical-data", "weather-domain-analytical-data"]
     if data_location not in valid_data_locations:
         logger.error(f"Invalid data location provided: {data_location}")
@@ -78,7 +82,7 @@ async def query_data(data_location: str):
     
     logger.info(f"Fetching secrets for data_location: {data_location}")
     with tracer.start_as_current_span("retrieve_secrets") as span:
-        client = Client(url='http://localhost:8200', token='root')
+        client = Client(url=settings.VAULT_URL, token=settings.VAULT_TOKEN)
         read_response = client.secrets.kv.read_secret_version(path='Data-Scientist-User-Pass')
         
         if 'data' not in read_response or 'data' not in read_response['data']:
@@ -87,32 +91,57 @@ async def query_data(data_location: str):
         
         secrets = read_response['data']['data']
     
+    return {
+        "distributedStorageAddress": settings.MINIO_ENDPOINT,
+        "minio_access_key": settings.MINIO_ACCESS_KEY,
+        "minio_secret_key": settings.MINIO_SECRET_KEY,
+        "bucket_name": data_location
+    }
+
+@app.get("/query-data/{data_location}")
+async def query_data(data_location: str, include_data: bool = True):
+    storage_info = get_storage_info(data_location)
+
     logger.info("Fetching data from Minio")
     with tracer.start_as_current_span("query_processing") as span:
-        storage_info = {
-            "distributedStorageAddress": "localhost:9001",
-            "minio_access_key": "minioadmin",
-            "minio_secret_key": "minioadmin",
-            "bucket_name": data_location
-        }
-
         logger.info(f"Connecting to Minio with storage_info: {storage_info}")
         minio_client = Minio(
             storage_info["distributedStorageAddress"],
-            access_key="minioadmin",
-            secret_key="minioadmin",
-            secure=False
+            access_key=storage_info["minio_access_key"],
+            secret_key=storage_info["minio_secret_key"],
+            secure=settings.MINIO_SECURE
         )
 
         objects_list = []
         for obj in minio_client.list_objects(storage_info["bucket_name"]):
-            object_data = minio_fetch({
+            if not include_data:
+                # Listing only; each object's bytes are served by /query-data/{data_location}/{object_name}
+                objects_list.append({"object_name": obj.object_name, "size": obj.size})
+                continue
+            object_data, _ = minio_fetch({
                 **storage_info,
                 "object_name": obj.object_name
             })
             objects_list.append({
                 "object_name": obj.object_name,
-                "data": object_data
+                "data": object_data.decode('utf-8')
             })
 
         return {"objects": objects_list}
+
+@app.get("/query-data/{data_location}/{object_name:path}")
+async def query_object(data_location: str, object_name: str):
+    storage_info = get_storage_info(data_location)
+
+    with tracer.start_as_current_span("query_object") as span:
+        span.set_attribute("object_name", object_name)
+        # The object's bytes are returned as stored, without decoding or JSON wrapping
+        try:
+            data, content_type = await asyncio.get_running_loop().run_in_executor(executor, minio_fetch, {**storage_info, "object_name": object_name})
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                raise
+            logger.error(f"Object {object_name} not found in {data_location}")
+            raise HTTPException(status_code=404, detail="Object not found")
+        span.set_attribute("bytes", len(data))
+        return Response(content=data, media_type=content_type)
@@ -1,9 +1,10 @@
 from concurrent.futures import ThreadPoolExecutor
 from minio import Minio
 import threading
+from utilities.settings import settings
 
 minio_lock = threading.Lock()
-MINIO_POOL_SIZE = 10
+MINIO_POOL_SIZE = settings.MINIO_POOL_SIZE
 executor = ThreadPoolExecutor(max_workers=MINIO_POOL_SIZE)
 
 def minio_fetch(storage_info):
@@ -12,13 +13,13 @@ def minio_fetch(storage_info):
             storage_info["distributedStorageAddress"],
             access_key=storage_info["minio_access_key"],
             secret_key=storage_info["minio_secret_key"],
-            secure=False
+            secure=settings.MINIO_SECURE
         )
 
         data = minio_client.get_object(storage_info["bucket_name"], storage_info["object_name"])
         chunks = []
 
-        for d in data.stream(32*1024):
+        for d in data.stream(settings.MINIO_FETCH_SIZE):
             chunks.append(d)
 
         data_str = b''.join(chunks).decode('utf-8')
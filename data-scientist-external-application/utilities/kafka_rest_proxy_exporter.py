@@ -1,32 +1,161 @@
 import requests
 import json
+import random
+import re
+from fnmatch import fnmatchcase
 import psutil
 from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from utilities.settings import settings
+
+# Sampling defaults, overridable per deployment through the settings
+DEFAULT_SAMPLE_RATE = settings.TELEMETRY_SAMPLE_RATE
+SLOW_SPAN_THRESHOLD_MS = settings.TELEMETRY_SLOW_SPAN_MS
+
+# Per-name sample rates as name-pattern=rate pairs, e.g. "GET *=1,process_*=0.05".
+# Per-object and per-chunk spans are collapsed into summaries unless they are kept.
+DEFAULT_SAMPLE_RATES = {
+    "process_data_object_*": 0.0,
+    "process_streaming_object_*": 0.0,
+}
+
+# Span names that are aggregated into one summary span per parent when not kept
+COLLAPSE_PATTERNS = [
+    (re.compile(r"^process_data_object_\d+$"), "process_data_object"),
+    (re.compile(r"^process_streaming_object_(\w+?)_chunk_\d+$"), r"process_streaming_object_\1_chunks"),
+]
+
+
+def parse_sample_rates(value):
+    rates = {}
+    for pair in filter(None, (item.strip() for item in value.split(","))):
+        pattern, _, rate = pair.rpartition("=")
+        rates[pattern.strip()] = float(rate)
+    return rates
+
+
+def is_error(span):
+    """
+    True for a span with an ERROR status, or marked with a truthy "error" attribute as
+    the services' error handlers do.
+    """
+    return span.status.status_code.name == "ERROR" or bool((span.attributes or {}).get("error"))
+
+
+class TailSampler:
+    """
+    Decides per finished span whether it is exported. Error spans (see is_error), spans
+    slower than slow_threshold_ms and every span of a trace that has an error in the
+    same batch are always kept; the rest are kept with the rate of the first matching
+    name pattern.
+    """
+
+    def __init__(self, default_rate=DEFAULT_SAMPLE_RATE, rates=None, slow_threshold_ms=SLOW_SPAN_THRESHOLD_MS, collapse_patterns=COLLAPSE_PATTERNS):
+        self.default_rate = default_rate
+        self.rates = dict(DEFAULT_SAMPLE_RATES)
+        self.rates.update(parse_sample_rates(settings.TELEMETRY_SAMPLE_RATES))
+        self.rates.update(rates or {})
+        self.slow_threshold_ns = slow_threshold_ms * 1e6
+        self.collapse_patterns = collapse_patterns
+        self._rate_cache = {}
+
+    def rate_for(self, name):
+        rate = self._rate_cache.get(name)
+        if rate is None:
+            rate = next((rate for pattern, rate in self.rates.items() if fnmatchcase(name, pattern)), self.default_rate)
+            if len(self._rate_cache) < 10000:
+                self._rate_cache[name] = rate
+        return rate
+
+    def collapsed_name(self, name):
+        for pattern, replacement in self.collapse_patterns:
+            if pattern.match(name):
+                return pattern.sub(replacement, name)
+        return None
+
+    def sample(self, spans):
+        """Split a batch into the spans to export and the spans to drop or collapse."""
+        error_traces = {
+            span.get_span_context().trace_id for span in spans if is_error(span)
+        }
+
+        kept, dropped = [], []
+        for span in spans:
+            keep = (
+                span.get_span_context().trace_id in error_traces
+                or span.end_time - span.start_time >= self.slow_threshold_ns
+                or random.random() < self.rate_for(span.name)
+            )
+            (kept if keep else dropped).append(span)
+        return kept, dropped
+
 
 class KafkaRESTProxyExporter(SpanExporter):
-    def __init__(self, topic_name, rest_proxy_url, service_name, service_address):
+    def __init__(self, topic_name, rest_proxy_url, service_name, service_address, sampler=None):
         self.topic_name = topic_name
         self.rest_proxy_url = rest_proxy_url
         self.service_name = service_name
         self.service_address = service_address
+        self.sampler = sampler or TailSampler()
 
     def export(self, spans):
-        telemetry_data = [self.serialize_span(span) for span in spans]
+        kept, dropped = self.sampler.sample(spans)
+
+        # Utilisation is sampled once per batch rather than once per span
+        utilization = {"cpu_utilization": psutil.cpu_percent(), "memory_utilization": psutil.virtual_memory().used}
+        telemetry_data = [self.serialize_span(span, utilization) for span in kept]
+        telemetry_data.extend(self.summarize_spans(dropped, utilization))
+        if not telemetry_data:
+            return SpanExportResult.SUCCESS
+
         headers = {
-            "Content-Type": "application/vnd.kafka.json.v2+json", 
+            "Content-Type": "application/vnd.kafka.json.v2+json",
             "Accept": "application/vnd.kafka.v2+json"
         }
+        # Keyed by trace id so all spans of a trace land in the same partition
         data = {
-            "records": [{"value": span_data} for span_data in telemetry_data]
+            "records": [{"key": str(span_data["context"]["trace_id"]), "value": span_data} for span_data in telemetry_data]
         }
         response = requests.post(f"{self.rest_proxy_url}/topics/{self.topic_name}", headers=headers, data=json.dumps(data))
-        
+
         # handle the response as necessary
         if response.status_code == 200:
             return SpanExportResult.SUCCESS
         return SpanExportResult.FAILURE
 
-    def serialize_span(self, span):
+    def summarize_spans(self, spans, utilization):
+        """
+        Collapse sampled-out spans with a collapsible name into one summary span per
+        (trace, parent, collapsed name) that carries their count and timings.
+        """
+        summaries = {}
+        for span in spans:
+            collapsed_name = self.sampler.collapsed_name(span.name)
+            if collapsed_name is None:
+                continue
+
+            span_context = span.get_span_context()
+            parent_span_id = span.parent.span_id if span.parent else None
+            key = (span_context.trace_id, parent_span_id, collapsed_name)
+            duration = span.end_time - span.start_time
+
+            summary = summaries.get(key)
+            if summary is None:
+                summary = self.serialize_span(span, utilization)
+                summary["name"] = collapsed_name
+                summary["attributes"] = {"collapsed_span_count": 0, "collapsed_total_duration_ns": 0, "collapsed_max_duration_ns": 0}
+                summary["events"] = []
+                summaries[key] = summary
+
+            attributes = summary["attributes"]
+            attributes["collapsed_span_count"] += 1
+            attributes["collapsed_total_duration_ns"] += duration
+            attributes["collapsed_max_duration_ns"] = max(attributes["collapsed_max_duration_ns"], duration)
+            summary["start_time"] = min(summary["start_time"], span.start_time)
+            summary["end_time"] = max(summary["end_time"], span.end_time)
+
+        return list(summaries.values())
+
+    def serialize_span(self, span, utilization=None):
         try:
             span_context = span.get_span_context()
 
@@ -38,7 +167,10 @@ class KafkaRESTProxyExporter(SpanExporter):
 
             # Retrieve the parent span ID
             parent_span_id = span.parent.span_id if span.parent else None
-            
+
+            if utilization is None:
+                utilization = {"cpu_utilization": psutil.cpu_percent(), "memory_utilization": psutil.virtual_memory().used}
+
             # Construct the serialized span
             serialized_span = {
                 "name": span.name,
@@ -48,18 +180,18 @@ class KafkaRESTProxyExporter(SpanExporter):
                     "parent_span_id": parent_span_id,
                     "is_remote": span_context.is_remote,
                     "trace_flags": span_context.trace_flags,
-                    "trace_state": trace_state_str  
+                    "trace_state": trace_state_str
                 },
                 "start_time": span.start_time,
                 "end_time": span.end_time,
                 "span_kind": span.kind.name,
                 "status": span.status.status_code.name,
                 "events": [{"name": event.name, "timestamp": event.timestamp, "attributes": dict(event.attributes)} for event in span.events],
-                "attributes": attributes_dict, 
+                "attributes": attributes_dict,
                 "service_name": self.service_name,
                 "service_address": self.service_address,
-                "cpu_utilization": psutil.cpu_percent(),  # Capturing CPU utilization
-                "memory_utilization": psutil.virtual_memory().used  # Capturing RAM usage in bytes
+                "cpu_utilization": utilization["cpu_utilization"],  # Capturing CPU utilization
+                "memory_utilization": utilization["memory_utilization"]  # Capturing RAM usage in bytes
             }
 
             # This is a check to identify the non-serializable part
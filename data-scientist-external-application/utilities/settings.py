@@ -0,0 +1,36 @@
+from utilities.settings_loader import Setting, Settings
+
+
+class ServiceSettings(Settings):
+    """Knobs read by the data scientist application, loaded as described in utilities/settings_loader.py."""
+
+    # Endpoints and credentials
+    SERVICE_ADDRESS = Setting("")  # Address the service advertises; empty keeps the service's own default
+    KAFKA_REST_PROXY_URL = Setting("http://localhost/kafka-rest-proxy")
+    MINIO_ENDPOINT = Setting("localhost:9001")
+    MINIO_ACCESS_KEY = Setting("minioadmin", secret=True)
+    MINIO_SECRET_KEY = Setting("minioadmin", secret=True)
+    MINIO_SECURE = Setting(False, bool)
+    VAULT_URL = Setting("http://localhost:8200")
+    VAULT_TOKEN = Setting("root", secret=True)
+
+    # MinIO transfers
+    MINIO_FETCH_SIZE = Setting(32 * 1024, int, minimum=1024)  # Read size when streaming an object
+    MINIO_POOL_SIZE = Setting(10, int, minimum=1)  # Concurrent fetches
+
+    # Telemetry
+    TELEMETRY_EXPORT_DELAY_MS = Setting(5000, int, minimum=0)  # Linger before a span batch is exported
+    TELEMETRY_EXPORT_BATCH_SIZE = Setting(512, int, minimum=1)
+    TELEMETRY_QUEUE_SIZE = Setting(2048, int, minimum=1)  # Spans buffered before new ones are dropped
+    TELEMETRY_SAMPLE_RATE = Setting(1.0, float, minimum=0, maximum=1)
+    TELEMETRY_SLOW_SPAN_MS = Setting(1000.0, float, minimum=0)
+    TELEMETRY_SAMPLE_RATES = Setting("")  # name-pattern=rate pairs, e.g. "GET *=1,process_*=0.05"
+
+    def validate(self):
+        # The span processor rejects batches larger than its queue
+        if self.TELEMETRY_EXPORT_BATCH_SIZE > self.TELEMETRY_QUEUE_SIZE:
+            return ["TELEMETRY_EXPORT_BATCH_SIZE: must not exceed TELEMETRY_QUEUE_SIZE"]
+        return []
+
+
+settings = ServiceSettings()
@@ -1,18 +1,46 @@
 from http.client import HTTPException
 from xmlrpc.client import ResponseError
-from fastapi import FastAPI, BackgroundTasks, Response
+from fastapi import FastAPI, Response
 from minio import Minio
 import time
 import requests
 import json
 import base64
-from prometheus_client import Counter, start_http_server, generate_latest, CONTENT_TYPE_LATEST, Histogram, Gauge
+import asyncio
+import os
+import re
+import socket
+from prometheus_client import Counter, start_http_server, generate_latest, CONTENT_TYPE_LATEST, Histogram, Gauge, CollectorRegistry, REGISTRY, multiprocess
 import psutil
+from utilities.kafka_consumer_manager import KafkaConsumerManager
+from utilities.consumer_lag import ConsumerLagMonitor, ThroughputMeter
+from utilities.kafka_consumer_worker import KafkaConsumerWorker
+from utilities.trace_assembler import TraceAssembler
+from utilities.settings import settings
 
 
 # Global variables
 SERVICE_NAME = "TELEMETRY_PROCESSOR_SERVICE"
-SERVICE_ADDRESS = "http://localhost:8008"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8008"
+KAFKA_REST_PROXY_URL = settings.KAFKA_REST_PROXY_URL
+TELEMETRY_CONSUMER_GROUP = "telemetry-data-consumer"
+
+# Each replica joins the group under its own instance name, taken from the pod name
+# (downward API) or the hostname, which Kubernetes sets to the pod name
+POD_NAME = os.environ.get("POD_NAME") or socket.gethostname()
+TELEMETRY_CONSUMER_INSTANCE = "telemetry-data-consumer-" + re.sub(r"[^A-Za-z0-9_-]", "-", POD_NAME)
+
+# Standalone Prometheus exporter; 0 disables it and leaves only GET /metrics
+METRICS_PORT = settings.METRICS_PORT
+
+# Worker processes per pod (uvicorn --workers defaults to WEB_CONCURRENCY). Each worker is
+# its own group member, and with PROMETHEUS_MULTIPROC_DIR set their metrics are merged
+WORKERS = settings.WEB_CONCURRENCY
+MULTIPROCESS_METRICS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+if WORKERS > 1:
+    TELEMETRY_CONSUMER_INSTANCE += f"-{os.getpid()}"
+    if not MULTIPROCESS_METRICS:
+        print("WEB_CONCURRENCY > 1 without PROMETHEUS_MULTIPROC_DIR: /metrics only shows one worker")
 
 labels = ['service', 'version', 'address']
 
@@ -21,164 +49,223 @@ kafka_records_consumed = Counter('kafka_records_consumed_total', 'Total Kafka re
 kafka_data_ingested_records = Counter('kafka_data_ingested_records_total', 'Number of Kafka records ingested', labels)
 kafka_data_ingested_bytes = Counter('kafka_data_ingested_bytes_total', 'Number of bytes ingested from Kafka records', labels)
 kafka_ingestion_errors = Counter('kafka_ingestion_errors_total', 'Number of errors while ingesting data', labels)
-cpu_utilization_gauge = Gauge('service_cpu_utilization_percentage', 'CPU Utilization of the Service', labels)
-memory_utilization_gauge = Gauge('service_memory_utilization_bytes', 'Memory (RAM) Utilization of the Service', labels)
+cpu_utilization_gauge = Gauge('service_cpu_utilization_percentage', 'CPU Utilization of the Service', labels, multiprocess_mode='livemax')
+memory_utilization_gauge = Gauge('service_memory_utilization_bytes', 'Memory (RAM) Utilization of the Service', labels, multiprocess_mode='livemax')
 KAFKA_PROCESSING_TIME = Histogram('kafka_processing_duration_seconds', 'Time taken for processing kafka messages', labels)
 ingestion_latency = Histogram('kafka_ingestion_latency_seconds', 'Time taken from data creation to ingestion in seconds', labels)
 secret_retrieval_latency = Histogram('secret_retrieval_duration_seconds', 'Time taken for retrieving secrets', labels)
 query_processing_time = Histogram('query_processing_duration_seconds', 'Time taken for processing query', labels)
 
+# Consumer lag and throughput of this processor, sampled from the REST Proxy. Every
+# worker samples the same group lag (livemax, so exited workers drop out), while each
+# consumes its own share (livesum)
+lag_labels = ['group', 'topic', 'partition']
+kafka_consumer_lag = Gauge('kafka_consumer_lag_records', 'Log-end offset minus committed offset per partition', lag_labels, multiprocess_mode='livemax')
+kafka_consumer_committed_offset = Gauge('kafka_consumer_committed_offset', 'Committed offset of the consumer group per partition', lag_labels, multiprocess_mode='livemax')
+kafka_log_end_offset = Gauge('kafka_log_end_offset', 'Log-end offset per partition', lag_labels, multiprocess_mode='livemax')
+kafka_consumer_group_lag = Gauge('kafka_consumer_group_lag_records', 'Total lag of the consumer group across all partitions of a topic', ['group', 'topic'], multiprocess_mode='livemax')
+kafka_lag_sample_errors = Counter('kafka_lag_sample_errors_total', 'Failed consumer lag samples', ['group'])
+kafka_consumed_records_rate = Gauge('kafka_consumed_records_per_second', 'Records consumed per second over the last sample interval', ['group'], multiprocess_mode='livesum')
+kafka_consumed_bytes_rate = Gauge('kafka_consumed_bytes_per_second', 'Record bytes consumed per second over the last sample interval', ['group'], multiprocess_mode='livesum')
+
+# Trace-level metrics, computed once spans have been grouped by trace_id
+TRACE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+trace_duration = Histogram('trace_duration_seconds', 'End-to-end latency of assembled traces', ['root_service'], buckets=TRACE_BUCKETS)
+trace_spans = Histogram('trace_span_count', 'Spans per assembled trace', ['root_service'], buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000))
+service_edge_latency = Histogram('service_edge_latency_seconds', 'Duration of calls from a caller service into a callee service', ['caller', 'callee'], buckets=TRACE_BUCKETS)
+service_edge_errors = Counter('service_edge_errors_total', 'Failed calls from a caller service into a callee service', ['caller', 'callee'])
+critical_path_time = Histogram('trace_critical_path_seconds', 'Exclusive time a service contributes to the critical path of a trace', ['service'], buckets=TRACE_BUCKETS)
+active_traces_gauge = Gauge('trace_assembler_active_traces', 'Traces still waiting for spans', multiprocess_mode='livesum')
+
+
+def metrics_registry():
+    """The registry to expose: the merged samples of all workers in multiprocess mode."""
+    if MULTIPROCESS_METRICS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
 app = FastAPI()
 
-consumer_base_url = None 
+# REST Proxy consumer for the telemetry topic, created and health-checked by the manager
+consumer_manager = KafkaConsumerManager(KAFKA_REST_PROXY_URL)
+consumer_manager.register("telemetry-data", TELEMETRY_CONSUMER_GROUP, TELEMETRY_CONSUMER_INSTANCE, ["telemetry-data"])
 
-@app.on_event("startup")
-async def startup_event():
-    url = "http://localhost/kafka-rest-proxy/consumers/telemetry-data-consumer/"
-    headers = { 
-        'Content-Type': 'application/vnd.kafka.v2+json',
-    }
-    data = {
-        "name": "telemetry-data-consumer",
-        "format": "binary",
-        "auto.offset.reset": "earliest",
-        "auto.commit.enable": "true"
-    } 
-    try:
-        # attemping to create a consumer 
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        # will raise an HTTPError if the status code is 4xx or 5xx 
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        if response.status_code == 409:
-            print("Kafka consumer already exists. Proceeding...")
-        else:
-            raise Exception("Failed to create Kafka consumer: " + str(e))
-    else:
-        print("Kafka consumer created successfully")
-        print(response.json())
-        consumer_info = response.json()
-        print("Consumer instance URI: " + consumer_info['base_uri'])
-        global consumer_base_url
-        consumer_base_url = consumer_info['base_uri'].replace(
-            'http://', 'http://localhost/')
-
-        # Subscribe the consumer to the topic
-        url = consumer_base_url + "/subscription"
-        headers = {'Content-Type': 'application/vnd.kafka.v2+json'}
-        data = {"topics": ["telemetry-data"]} 
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        if response.status_code != 204:
-            raise Exception(
-                "Failed to subscribe consumer to topic: " + response.text)
-        
-    start_http_server(8001)
+throughput_meter = ThroughputMeter()
 
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    url = consumer_base_url
-    response = requests.delete(url)
-    print(f"Consumer deleted with status code {response.status_code}")
+def update_lag_metrics(lags):
+    records_per_second, bytes_per_second = throughput_meter.rates()
+    kafka_consumed_records_rate.labels(TELEMETRY_CONSUMER_GROUP).set(records_per_second)
+    kafka_consumed_bytes_rate.labels(TELEMETRY_CONSUMER_GROUP).set(bytes_per_second)
 
+    if lags is None:
+        kafka_lag_sample_errors.labels(TELEMETRY_CONSUMER_GROUP).inc()
+        return
 
-@app.get("/")
-async def main_function(): 
-    return "welcome to the telemetry processing service"
+    topic_lags = {}
+    for lag in lags:
+        partition_labels = (TELEMETRY_CONSUMER_GROUP, lag['topic'], str(lag['partition']))
+        kafka_consumer_lag.labels(*partition_labels).set(lag['lag'])
+        kafka_consumer_committed_offset.labels(*partition_labels).set(lag['current_offset'])
+        kafka_log_end_offset.labels(*partition_labels).set(lag['log_end_offset'])
+        topic_lags[lag['topic']] = topic_lags.get(lag['topic'], 0) + lag['lag']
 
+    for topic, total_lag in topic_lags.items():
+        kafka_consumer_group_lag.labels(TELEMETRY_CONSUMER_GROUP, topic).set(total_lag)
 
-@app.get("/subscribe-to-telemetry-data")
-async def consume_kafka_message(background_tasks: BackgroundTasks):
-    if consumer_base_url is None:
-        return {"status": "Consumer has not been initialized. Please try again later."}
 
-    url = consumer_base_url + "/records"
-    headers = {"Accept": "application/vnd.kafka.binary.v2+json"}
+lag_monitor = ConsumerLagMonitor(KAFKA_REST_PROXY_URL, TELEMETRY_CONSUMER_GROUP, update_lag_metrics)
+
 
-    def consume_records():
-        labels_data = {
-                'service': "unknown",
-                'version': "unknown",
-                'address': "unknown"
-        }
+def observe_trace(summary):
+    trace_duration.labels(summary['root_service']).observe(summary['duration'])
+    trace_spans.labels(summary['root_service']).observe(summary['span_count'])
 
-        while True:
-            try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                records = response.json()
+    for caller, callee, seconds, error in summary['edges']:
+        service_edge_latency.labels(caller, callee).observe(seconds)
+        if error:
+            service_edge_errors.labels(caller, callee).inc()
 
-                if not records:  # No more records left
-                    break
+    # One observation per service, summing its exclusive time along the path
+    path_time = {}
+    for step in summary['critical_path']:
+        path_time[step['service']] = path_time.get(step['service'], 0.0) + step['seconds']
+    for service, seconds in path_time.items():
+        critical_path_time.labels(service).observe(seconds)
 
-                for record in records:
-                    
-                    start_time = time.time()  # Start the timer
+    active_traces_gauge.set(trace_assembler.active_traces())
 
-                    publish_time = record.get("timestamp", time.time())  # defaulting to current time if no timestamp
-                    current_time = time.time()
 
-                    # Calculating ingestion latency
-                    latency = current_time - publish_time
+trace_assembler = TraceAssembler(observe_trace)
 
-                    decoded_key = base64.b64decode(record['key']).decode('utf-8') if record['key'] else None
-                    decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
-                    value_obj = json.loads(decoded_value_json)
+@app.on_event("startup")
+async def startup_event():
+    await asyncio.get_running_loop().run_in_executor(None, consumer_manager.start)
+    lag_monitor.start()
+    trace_assembler.start()
+    telemetry_worker.start()
 
-                    service_name_from_kafka = value_obj.get("service_name", "unknown")
-                    service_version_from_kafka = value_obj.get("service_version", "unknown")
-                    service_address_from_kafka = value_obj.get("service_address", "unknown")
+    if METRICS_PORT:
+        try:
+            start_http_server(METRICS_PORT, registry=metrics_registry())
+        except OSError as e:
+            # Another worker in the pod already serves the port; /metrics still works
+            print(f"Prometheus exporter not started on port {METRICS_PORT}: {e}")
 
-                    labels_data = {
-                        'service': service_name_from_kafka,
-                        'version': service_version_from_kafka,
-                        'address': service_address_from_kafka
-                    }
 
-                    # Data ingestion metrics with labels
-                    kafka_records_consumed.labels(**labels_data).inc()
-                    kafka_data_ingested_records.labels(**labels_data).inc()
-                    kafka_data_ingested_bytes.labels(**labels_data).inc(len(json.dumps(record)))
-                    ingestion_latency.labels(**labels_data).observe(latency)
+@app.on_event("shutdown")
+async def shutdown_event():
+    telemetry_worker.stop()
+    lag_monitor.stop()
+    trace_assembler.stop()
+    await asyncio.get_running_loop().run_in_executor(None, consumer_manager.stop)
 
-                    # Update the service CPU and Memory utilization from the Kafka message
-                    kafka_cpu_utilization = value_obj.get("cpu_utilization", None)
-                    kafka_memory_utilization = value_obj.get("memory_utilization", None)
+    if MULTIPROCESS_METRICS:
+        # Drop this worker's live gauges from the merged view
+        multiprocess.mark_process_dead(os.getpid())
 
-                    if kafka_cpu_utilization is not None:
-                        cpu_utilization_gauge.labels(**labels_data).set(kafka_cpu_utilization)
 
-                    if kafka_memory_utilization is not None:
-                        memory_utilization_gauge.labels(**labels_data).set(kafka_memory_utilization)
+@app.get("/")
+async def main_function(): 
+    return "welcome to the telemetry processing service"
 
-                    # Calculate duration from the event for specific event metrics
-                    duration = (value_obj['end_time'] - value_obj['start_time']) / 1e9
-                    if value_obj['name'] == "retrieve_secrets":
-                        secret_retrieval_latency.labels(**labels_data).observe(duration)
-                    elif value_obj['name'].startswith("GET "):
-                        query_processing_time.labels(**labels_data).observe(duration)
 
-                    print(f"Consumed record with key {decoded_key} and value {value_obj}")
+def process_telemetry_batch(records):
+    labels_data = {
+            'service': "unknown",
+            'version': "unknown",
+            'address': "unknown"
+    }
+
+    for record in records:
+        
+        start_time = time.time()  # Start the timer
+
+        try:
+            decoded_key = base64.b64decode(record['key']).decode('utf-8') if record['key'] else None
+            decoded_value = base64.b64decode(record['value'])
+            value_obj = json.loads(decoded_value)
+            throughput_meter.add(1, len(decoded_value))
+            trace_assembler.add(value_obj)
+
+            # Ingestion latency runs from the end of the span (epoch nanoseconds) to now;
+            # binary-format REST Proxy records carry no timestamp of their own
+            latency = time.time() - value_obj['end_time'] / 1e9 if value_obj.get('end_time') else None
+
+            service_name_from_kafka = value_obj.get("service_name", "unknown")
+            service_version_from_kafka = value_obj.get("service_version", "unknown")
+            service_address_from_kafka = value_obj.get("service_address", "unknown")
+
+            labels_data = {
+                'service': service_name_from_kafka,
+                'version': service_version_from_kafka,
+                'address': service_address_from_kafka
+            }
+
+            # Data ingestion metrics with labels
+            kafka_records_consumed.labels(**labels_data).inc()
+            kafka_data_ingested_records.labels(**labels_data).inc()
+            kafka_data_ingested_bytes.labels(**labels_data).inc(len(decoded_value))
+            if latency is not None:
+                ingestion_latency.labels(**labels_data).observe(latency)
+
+            # Update the service CPU and Memory utilization from the Kafka message
+            kafka_cpu_utilization = value_obj.get("cpu_utilization", None)
+            kafka_memory_utilization = value_obj.get("memory_utilization", None)
+
+            if kafka_cpu_utilization is not None:
+                cpu_utilization_gauge.labels(**labels_data).set(kafka_cpu_utilization)
+
+            if kafka_memory_utilization is not None:
+                memory_utilization_gauge.labels(**labels_data).set(kafka_memory_utilization)
+
+            # Calculate duration from the event for specific event metrics
+            duration = (value_obj['end_time'] - value_obj['start_time']) / 1e9
+            if value_obj['name'] == "retrieve_secrets":
+                secret_retrieval_latency.labels(**labels_data).observe(duration)
+            elif value_obj['name'].startswith("GET "):
+                query_processing_time.labels(**labels_data).observe(duration)
+
+            print(f"Consumed record with key {decoded_key} and value {value_obj}")
+
+        except Exception as e:
+            # A malformed span is counted and skipped so it cannot stall the partition
+            kafka_ingestion_errors.labels(**labels_data).inc()
+            print(f"Error while consuming telemetry record at offset {record.get('offset')}: {e}")
+            continue
+
+        end_time = time.time()  # End the timer
+        duration = end_time - start_time
+        KAFKA_PROCESSING_TIME.labels(**labels_data).observe(duration)  # Observe the duration
+
+    # CPU & Memory Utilization with labels
+    cpu_utilization_gauge.labels(service="TELEMETRY_PROCESSOR_SERVICE", version="1.0.0", address=SERVICE_ADDRESS).set(psutil.cpu_percent())
+    memory_utilization_gauge.labels(service="TELEMETRY_PROCESSOR_SERVICE", version="1.0.0", address=SERVICE_ADDRESS).set(psutil.virtual_memory().used)
+    active_traces_gauge.set(trace_assembler.active_traces())
+
+# Every replica polls continuously; the consumer group splits the partitions between them
+telemetry_worker = KafkaConsumerWorker(consumer_manager, "telemetry-data", process_telemetry_batch)
 
-                    end_time = time.time()  # End the timer
-                    duration = end_time - start_time
-                    KAFKA_PROCESSING_TIME.labels(**labels_data).observe(duration)  # Observe the duration
 
-            except Exception as e:
-                # Error metrics with labels (assuming service details can be derived from the latest processed record in case of errors)
-                kafka_ingestion_errors.labels(**labels_data).inc()
-                raise Exception(f"Error while consuming data: {str(e)}")
+@app.get("/subscribe-to-telemetry-data")
+async def consume_kafka_message():
+    if consumer_manager.base_url("telemetry-data") is None:
+        return {"status": "Consumer has not been initialized. Please try again later."}
+
+    telemetry_worker.start()
+    return {"status": "Consuming records in the background", "worker": telemetry_worker.status()}
 
-            # CPU & Memory Utilization with labels
-            cpu_utilization_gauge.labels(service="TELEMETRY_PROCESSOR_SERVICE", version="1.0.0", address=SERVICE_ADDRESS).set(psutil.cpu_percent())
-            memory_utilization_gauge.labels(service="TELEMETRY_PROCESSOR_SERVICE", version="1.0.0", address=SERVICE_ADDRESS).set(psutil.virtual_memory().used)
 
-    background_tasks.add_task(consume_records)
-    return {"status": "Consuming records in the background"}
+@app.get("/service-graph")
+async def get_service_graph():
+    # Built from the traces assembled by this worker process
+    return trace_assembler.service_graph()
 
 
 @app.get("/metrics")
 async def get_metrics():
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
 
 
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+import requests
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+LAG_POLL_INTERVAL = settings.KAFKA_LAG_POLL_INTERVAL  # seconds between lag samples, matching the Prometheus scrape interval
+V3_HEADERS = {'Accept': 'application/json'}
+
+
+class ThroughputMeter:
+    """Counts records and bytes as they are consumed and turns them into per-second rates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = 0
+        self._bytes = 0
+        self._since = time.monotonic()
+
+    def add(self, records, size):
+        with self._lock:
+            self._records += records
+            self._bytes += size
+
+    def rates(self):
+        """Records/s and bytes/s since the previous call."""
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._since
+            records, size = self._records, self._bytes
+            self._records, self._bytes, self._since = 0, 0, now
+
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return records / elapsed, size / elapsed
+
+
+class ConsumerLagMonitor:
+    """
+    Samples the committed offset, log-end offset and lag of every partition of a
+    consumer group from the REST Proxy v3 API in a background thread, and hands each
+    sample to on_update (None when the sample failed).
+    """
+
+    def __init__(self, rest_proxy_url, group, on_update, interval=LAG_POLL_INTERVAL):
+        self.rest_proxy_url = rest_proxy_url.rstrip('/')
+        self.group = group
+        self.on_update = on_update
+        self.interval = interval
+        self.session = requests.Session()
+        self._cluster_id = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def cluster_id(self):
+        if self._cluster_id is None:
+            response = self.session.get(f"{self.rest_proxy_url}/v3/clusters", headers=V3_HEADERS)
+            response.raise_for_status()
+            self._cluster_id = response.json()['data'][0]['cluster_id']
+        return self._cluster_id
+
+    def fetch_lags(self):
+        url = f"{self.rest_proxy_url}/v3/clusters/{self.cluster_id()}/consumer-groups/{self.group}/lags"
+        response = self.session.get(url, headers=V3_HEADERS)
+        if response.status_code == 404:
+            # The group has not committed anything yet, or the cluster id changed
+            self._cluster_id = None
+            return []
+        response.raise_for_status()
+
+        return [
+            {
+                "topic": lag['topic_name'],
+                "partition": lag['partition_id'],
+                "current_offset": lag['current_offset'],
+                "log_end_offset": lag['log_end_offset'],
+                "lag": lag['lag']
+            }
+            for lag in response.json()['data']
+        ]
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="kafka-consumer-lag", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.session.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                lags = self.fetch_lags()
+            except Exception as e:
+                logger.warning(f"Failed to read the lag of consumer group '{self.group}': {e}")
+                lags = None
+
+            self.on_update(lags)
+            self._stop_event.wait(self.interval)
@@ -0,0 +1,28 @@
+from utilities.settings_loader import Setting, Settings
+
+
+class ServiceSettings(Settings):
+    """Knobs read by the telemetry processor, loaded as described in utilities/settings_loader.py."""
+
+    # Endpoints and credentials
+    SERVICE_ADDRESS = Setting("")  # Address the service advertises; empty keeps the service's own default
+    KAFKA_REST_PROXY_URL = Setting("http://localhost/kafka-rest-proxy")
+
+    # Kafka REST Proxy consumers and producers
+    KAFKA_POLL_IDLE_SLEEP = Setting(5.0, float, minimum=0)  # Seconds a worker waits after an empty poll or a failed batch
+    KAFKA_MAX_BATCH_ATTEMPTS = Setting(3, int, minimum=1)  # Failed batches a record may be part of before it is dead-lettered
+    KAFKA_POLL_TIMEOUT_MS = Setting(0, int, minimum=0)  # timeout of GET /records; 0 leaves the proxy default
+    KAFKA_POLL_MAX_BYTES = Setting(0, int, minimum=0)  # max_bytes of GET /records; 0 leaves the proxy default
+    KAFKA_HTTP_POOL_SIZE = Setting(4, int, minimum=1)  # Keep-alive connections per consumer session
+    KAFKA_HEALTH_CHECK_INTERVAL = Setting(30.0, float, minimum=1)
+    KAFKA_LAG_POLL_INTERVAL = Setting(15.0, float, minimum=1)
+
+    # Telemetry
+    TRACE_IDLE_WINDOW = Setting(30.0, float, minimum=1)
+    TRACE_MAX_ACTIVE = Setting(10000, int, minimum=1)
+    TRACE_MAX_SPANS = Setting(1000, int, minimum=1)
+    METRICS_PORT = Setting(8001, int, minimum=0, maximum=65535)  # 0 disables the standalone exporter
+    WEB_CONCURRENCY = Setting(1, int, minimum=1)
+
+
+settings = ServiceSettings()
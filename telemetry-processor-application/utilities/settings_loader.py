@@ -0,0 +1,118 @@
+import json
+import os
+
+SETTINGS_FILE_VARIABLE = "SETTINGS_FILE"
+TRUE_VALUES = {"1", "true", "yes", "on"}
+FALSE_VALUES = {"0", "false", "no", "off", ""}
+
+
+class SettingsError(ValueError):
+    pass
+
+
+class Setting:
+    """One typed knob; its environment variable is the attribute name on Settings."""
+
+    def __init__(self, default, type=str, minimum=None, maximum=None, choices=None, secret=False):
+        self.default = default
+        self.type = type
+        self.minimum = minimum
+        self.maximum = maximum
+        self.choices = choices
+        self.secret = secret
+
+    def parse(self, raw):
+        """Convert a string from the environment, or a JSON value from the file, and validate it."""
+        if self.type is bool:
+            if isinstance(raw, bool):
+                value = raw
+            elif isinstance(raw, str) and raw.strip().lower() in TRUE_VALUES | FALSE_VALUES:
+                value = raw.strip().lower() in TRUE_VALUES
+            else:
+                raise ValueError(f"expected a boolean, got {raw!r}")
+        elif self.type in (int, float):
+            if isinstance(raw, bool) or not isinstance(raw, (str, int, float)):
+                raise ValueError(f"expected a number, got {raw!r}")
+            try:
+                value = self.type(raw.strip() if isinstance(raw, str) else raw)
+            except ValueError:
+                raise ValueError(f"expected {'an integer' if self.type is int else 'a number'}, got {raw!r}") from None
+            if self.type is int and isinstance(raw, float) and value != raw:
+                raise ValueError(f"expected an integer, got {raw!r}")
+        else:
+            if not isinstance(raw, str):
+                raise ValueError(f"expected a string, got {raw!r}")
+            value = raw
+
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{value!r} is below the minimum of {self.minimum!r}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"{value!r} is above the maximum of {self.maximum!r}")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"{value!r} is not one of {', '.join(map(repr, self.choices))}")
+        return value
+
+
+class Settings:
+    """
+    Loader shared by the services. Each service subclasses it in utilities/settings.py and
+    declares only the knobs it reads. A value comes from, in increasing precedence, its
+    default, the JSON object in the file named by SETTINGS_FILE, and the environment
+    variable of the same name. Invalid or unknown settings are reported together when the
+    settings are loaded.
+    """
+
+    def __init__(self, environ=None):
+        environ = os.environ if environ is None else environ
+        declared = self.declared()
+        errors = []
+
+        file_values = {}
+        path = environ.get(SETTINGS_FILE_VARIABLE)
+        if path:
+            try:
+                with open(path) as f:
+                    file_values = json.load(f)
+                if not isinstance(file_values, dict):
+                    raise ValueError("expected a JSON object")
+            except (OSError, ValueError) as e:
+                errors.append(f"{SETTINGS_FILE_VARIABLE} {path}: {e}")
+                file_values = {}
+            for name in file_values:
+                if name not in declared:
+                    errors.append(f"{name}: unknown setting in {path}")
+
+        for name, setting in declared.items():
+            try:
+                if name in environ:
+                    value = setting.parse(environ[name])
+                elif name in file_values:
+                    value = setting.parse(file_values[name])
+                else:
+                    value = setting.default
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+                value = setting.default
+            setattr(self, name, value)
+
+        errors.extend(self.validate())
+        if errors:
+            raise SettingsError("Invalid settings: " + "; ".join(errors))
+
+    def validate(self):
+        """Checks across knobs, run after every knob is parsed; returns the error messages."""
+        return []
+
+    @classmethod
+    def declared(cls):
+        declared = {}
+        for klass in reversed(cls.__mro__):
+            declared.update((name, value) for name, value in vars(klass).items() if isinstance(value, Setting))
+        return declared
+
+    def as_dict(self, include_secrets=False):
+        return {
+            name: getattr(self, name) if include_secrets or not setting.secret else "********"
+            for name, setting in self.declared().items()
+        }
+
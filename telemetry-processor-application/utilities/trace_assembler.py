@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from utilities.settings import settings
+
+TRACE_IDLE_WINDOW = settings.TRACE_IDLE_WINDOW  # seconds without a new span after which a trace is considered complete
+MAX_ACTIVE_TRACES = settings.TRACE_MAX_ACTIVE  # oldest traces are finalised early beyond this
+MAX_SPANS_PER_TRACE = settings.TRACE_MAX_SPANS  # later spans of a runaway trace are dropped
+EVICTION_INTERVAL = 5  # seconds between background eviction passes
+
+
+class AssembledSpan:
+    __slots__ = ("span_id", "parent_span_id", "service", "name", "start_time", "end_time", "error")
+
+    def __init__(self, span):
+        context = span.get("context", {})
+        self.span_id = context.get("span_id")
+        self.parent_span_id = context.get("parent_span_id")
+        self.service = span.get("service_name", "unknown")
+        self.name = span.get("name", "")
+        self.start_time = span["start_time"]
+        self.end_time = span["end_time"]
+        self.error = span.get("status") == "ERROR"
+
+    @property
+    def duration(self):
+        return (self.end_time - self.start_time) / 1e9
+
+
+def summarise_trace(spans):
+    """
+    End-to-end latency, caller->callee edges and critical path of one trace. Span
+    times are epoch nanoseconds as sent by KafkaRESTProxyExporter.
+    """
+    by_id = {span.span_id: span for span in spans}
+    children = {}
+    roots = []
+    for span in spans:
+        if span.parent_span_id in by_id:
+            children.setdefault(span.parent_span_id, []).append(span)
+        else:
+            roots.append(span)
+
+    # A trace whose root was not received still gets a summary from its earliest span
+    root = min(roots or spans, key=lambda span: span.start_time)
+
+    edges = []
+    for span in spans:
+        parent = by_id.get(span.parent_span_id)
+        if parent is not None and parent.service != span.service:
+            edges.append((parent.service, span.service, span.duration, span.error))
+
+    # Walk down from the root, always following the child that finished last; each
+    # span's exclusive share is its duration minus the critical child's
+    critical_path = []
+    span = root
+    while span is not None:
+        critical_child = max(children.get(span.span_id, []), key=lambda child: child.end_time, default=None)
+        exclusive = span.duration - (critical_child.duration if critical_child else 0)
+        critical_path.append({"service": span.service, "name": span.name, "seconds": max(exclusive, 0.0)})
+        span = critical_child
+
+    return {
+        "root_service": root.service,
+        "root_name": root.name,
+        "duration": (max(span.end_time for span in spans) - min(span.start_time for span in spans)) / 1e9,
+        "span_count": len(spans),
+        "error": any(span.error for span in spans),
+        "edges": edges,
+        "critical_path": critical_path,
+    }
+
+
+class TraceAssembler:
+    """
+    Groups spans by trace_id in memory. A trace is finalised once no span has arrived
+    for idle_window seconds, or early when more than max_traces are open; on_trace
+    receives the summary of every finalised trace. The service graph accumulates the
+    caller->callee edges of all traces seen by this process.
+    """
+
+    def __init__(self, on_trace=None, idle_window=TRACE_IDLE_WINDOW, max_traces=MAX_ACTIVE_TRACES, max_spans=MAX_SPANS_PER_TRACE):
+        self.on_trace = on_trace
+        self.idle_window = idle_window
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self.traces_completed = 0
+        self.spans_dropped = 0
+        self._traces = OrderedDict()  # trace_id -> (last_seen, [AssembledSpan]), least recently updated first
+        self._nodes = {}
+        self._edges = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add(self, span):
+        trace_id = span.get("context", {}).get("trace_id")
+        if trace_id is None or span.get("start_time") is None or span.get("end_time") is None:
+            return
+
+        evicted = []
+        with self._lock:
+            entry = self._traces.pop(trace_id, None)
+            spans = entry[1] if entry else []
+            if len(spans) < self.max_spans:
+                spans.append(AssembledSpan(span))
+            else:
+                self.spans_dropped += 1
+            self._traces[trace_id] = (time.monotonic(), spans)
+
+            while len(self._traces) > self.max_traces:
+                evicted.append(self._traces.popitem(last=False)[1][1])
+
+        for spans in evicted:
+            self._finalise(spans)
+
+    def evict_expired(self):
+        cutoff = time.monotonic() - self.idle_window
+        evicted = []
+        with self._lock:
+            # Entries are ordered by last update, so expired traces are at the front
+            while self._traces:
+                trace_id, (last_seen, spans) = next(iter(self._traces.items()))
+                if last_seen > cutoff:
+                    break
+                del self._traces[trace_id]
+                evicted.append(spans)
+
+        for spans in evicted:
+            self._finalise(spans)
+
+    def active_traces(self):
+        return len(self._traces)
+
+    def _finalise(self, spans):
+        summary = summarise_trace(spans)
+
+        with self._lock:
+            self.traces_completed += 1
+            for span in spans:
+                node = self._nodes.setdefault(span.service, {"spans": 0, "errors": 0})
+                node["spans"] += 1
+                node["errors"] += span.error
+            for caller, callee, seconds, error in summary["edges"]:
+                edge = self._edges.setdefault((caller, callee), {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+                edge["calls"] += 1
+                edge["errors"] += error
+                edge["total_seconds"] += seconds
+                edge["max_seconds"] = max(edge["max_seconds"], seconds)
+
+        if self.on_trace is not None:
+            self.on_trace(summary)
+
+    def service_graph(self):
+        with self._lock:
+            nodes = [dict(service=service, **stats) for service, stats in self._nodes.items()]
+            edges = [
+                dict(caller=caller, callee=callee, average_seconds=stats["total_seconds"] / stats["calls"], **stats)
+                for (caller, callee), stats in self._edges.items()
+            ]
+            return {
+                "nodes": nodes,
+                "edges": edges,
+                "traces_completed": self.traces_completed,
+                "active_traces": len(self._traces),
+                "spans_dropped": self.spans_dropped,
+            }
+
+    def start(self, interval=EVICTION_INTERVAL):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="trace-assembler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop_event.wait(interval):
+            self.evict_expired()
@@ -1,14 +1,21 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Response
 from minio import Minio
-from xmlrpc.client import ResponseError
-import requests
 import logging
 import json
-import time 
 import io
 import base64
-from utilities import ensure_table_exists, insert_into_db, fetch_data_from_minio, save_data_to_sqlite, subscribe_to_kafka_consumer, create_kafka_consumer, register_metadata_to_data_lichen, fetch_all_weather_data_from_sqlite
+import asyncio
+import sqlite3
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from utilities import ensure_table_exists, insert_into_db, register_metadata_to_data_lichen, fetch_all_weather_data_from_sqlite, fetch_and_store_pipeline, ingest_router, kafka_utils, metrics, query_weather_data, rollups
+from utilities.fetch_data_from_minio_and_create_metadata import WEATHER_DATA_DB
+from utilities.settings import settings
 from utilities.kafka_rest_proxy_exporter import KafkaRESTProxyExporter
+from utilities.kafka_consumer_manager import KafkaConsumerManager
+from utilities.kafka_consumer_worker import KafkaConsumerWorker
+from utilities.data_lichen_client import registrar
+from utilities.jobs import job_manager
+from utilities.retry_queue import RetryQueue
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
@@ -23,23 +30,31 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global variables
-SERVICE_ADDRESS = "http://localhost:8005"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8005"
 SERVICE_NAME = "WEATHER_DOMAIN_ANALYTICAL_SERVICE"
 SERVICE_VERSION = "1.0.0"
 ENVIRONMENT = "production"
-KAFKA_REST_PROXY_URL = "http://localhost/kafka-rest-proxy"
-buffered_data = ""
+KAFKA_REST_PROXY_URL = settings.KAFKA_REST_PROXY_URL
+stream_buffers = {}  # Chunks of streamed customer objects, keyed by object id
 
-# Create two global variables to store the base URLs of each consumer
-operational_data_consumer_base_url = None
-customer_domain_data_consumer_base_url = None
-data_discovery_consumer_base_url = None
+# REST Proxy consumers used by this service, created and health-checked by the manager
+consumer_manager = KafkaConsumerManager(KAFKA_REST_PROXY_URL)
+consumer_manager.register("operational-data", "weather-domain-operational-data-consumers", "weather-domain-operational-data-consumer-instance", ["domain-weather-operational-data"])
+consumer_manager.register("customer-domain-data", "customer-domain-data-consumer", "customer-domain-data-consumer-instance", ["customer-domain-data"])
+consumer_manager.register("data-discovery", "data-discovery-consumer", "data-discovery-consumer-instance", ["data-discovery"])
+consumer_manager.register("customer-domain-stream", "customer-domain-stream-consumer", "customer-domain-stream-consumer-instance", ["customer-domain-stream-data"])
+consumer_manager.register("error-replay", "weather-domain-error-replay-consumer", "weather-domain-error-replay-consumer-instance", ["weather-domain-data-error"])
 
 # Setting up the trace provider base
 trace.set_tracer_provider(TracerProvider())
 
 kafka_exporter = KafkaRESTProxyExporter(topic_name="telemetry-data", rest_proxy_url=KAFKA_REST_PROXY_URL, service_name=SERVICE_NAME, service_address=SERVICE_ADDRESS)
-span_processor = BatchSpanProcessor(kafka_exporter)
+span_processor = BatchSpanProcessor(
+    kafka_exporter,
+    max_queue_size=settings.TELEMETRY_QUEUE_SIZE,
+    schedule_delay_millis=settings.TELEMETRY_EXPORT_DELAY_MS,
+    max_export_batch_size=settings.TELEMETRY_EXPORT_BATCH_SIZE
+)
 trace.get_tracer_provider().add_span_processor(span_processor)
 
 # Setting up OpenTelemetry
@@ -47,160 +62,212 @@ tracer = trace.get_tracer(__name__)
 
 # Storage info dictionary
 storage_info = {}
-MINIO_URL = "localhost:9001"
-MINIO_ACCESS_KEY = "minioadmin"
-MINIO_SECRET_KEY = "minioadmin"
+MINIO_URL = settings.MINIO_ENDPOINT
+MINIO_ACCESS_KEY = settings.MINIO_ACCESS_KEY
+MINIO_SECRET_KEY = settings.MINIO_SECRET_KEY
 
 # Initialize the Minio client
 minio_client = Minio(
     MINIO_URL,
     access_key=MINIO_ACCESS_KEY,
     secret_key=MINIO_SECRET_KEY,
-    secure=False
+    secure=settings.MINIO_SECURE
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    # Shared configurations
-    headers = {
-        'Content-Type': 'application/vnd.kafka.v2+json',
-    }
-    
-    data = {
-        "format": "binary",
-        "auto.offset.reset": "earliest",
-        "auto.commit.enable": "false"
-    }
+# Batch handlers run by the per-topic consumer workers. Each one returns only after
+# its SQLite writes have been committed, so the worker can then commit the offsets.
+def store_operational_data_batch(records):
+    global storage_info
 
-    # Consumer group for domain-weather-operational-data
-    url = f"{KAFKA_REST_PROXY_URL}/consumers/weather-domain-operational-data-consumers/" 
+    with tracer.start_as_current_span("consume_records") as span:
+        storage_info_batch = []
+        for record in records:
+            decoded_key = base64.b64decode(record['key']).decode('utf-8') if record['key'] else None
+            decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
+            value_obj = json.loads(decoded_value_json)
+
+            storage_info_batch.append({
+                "distributedStorageAddress": value_obj.get('distributedStorageAddress', ''),
+                "minio_access_key": value_obj.get('minio_access_key', ''),
+                "minio_secret_key": value_obj.get('minio_secret_key', ''),
+                "bucket_name": value_obj.get('bucket_name', ''),
+                "object_name": value_obj.get('object_name', '')
+            })
+
+            print(f"Consumed record with key {decoded_key} and value {value_obj['message']} from topic {record['topic']}")
+            if 'distributedStorageAddress' in value_obj:
+                print(f"Distributed storage address: {value_obj['distributedStorageAddress']}")
+                print(f"Minio access key: {value_obj['minio_access_key']}")
+                print(f"Minio secret key: {value_obj['minio_secret_key']}")
+                print(f"Bucket name: {value_obj['bucket_name']}")
+                print(f"Object name: {value_obj['object_name']}")
+
+        # Insert the storage info of the whole batch into the SQLite database
+        insert_into_db.insert_batch_into_db(storage_info_batch, 'object_storage_address.db')
+        storage_info = storage_info_batch[-1]
+        span.set_attribute("records_processed", len(records))
+
+def process_customer_domain_batch(records):
+    with tracer.start_as_current_span("process-records-from-customer-domain") as span:
+        storage_info_list = []
+        for record in records:
+            decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
+            value_obj = json.loads(decoded_value_json)
+
+            # Extract Minio storage information
+            storage_info_list.append({
+                "distributed_storage_address": value_obj.get('data_location'),
+                "minio_access_key": MINIO_ACCESS_KEY,
+                "minio_secret_key": MINIO_SECRET_KEY,
+                "bucket_name": value_obj.get('bucket_name', 'custom-domain-analytical-data'),
+                "object_name": value_obj.get('object_name', f"data_object_{value_obj.get('object_id')}.json")
+            })
+
+        # Fetch the objects concurrently while a single writer saves them to SQLite
+        stats = fetch_and_store_pipeline.run_fetch_and_store_pipeline(storage_info_list, 'weather_domain.db')
+
+        span.set_attribute("records_processed", len(records))
+        span.set_attribute("bytes_processed", stats["bytes"])
+        print(f"Processed {len(records)} records from Kafka topic and stored in SQLite.")
+
+def process_data_discovery_batch(records):
+    with tracer.start_as_current_span("process-records-from-data-discovery") as span:
+        for record in records:
+            decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
+            value_obj = json.loads(decoded_value_json)
+
+            span.add_event(f"Consumed record with value {value_obj} from topic data-discovery")
+
+            # Additional processing can be done here if necessary...
+
+        span.set_attribute("records_processed", len(records))
+        print(f"Processed {len(records)} records from data-discovery Kafka topic.")
+
+def process_customer_domain_stream_batch(records):
+    print(f"Processing {len(records)} records from the stream...")
+
+    with tracer.start_as_current_span("process-customer-domain-stream") as span:
+        # Offsets are only committed up to the last record after which no object was
+        # left half reassembled; buffered chunks are redelivered after a restart
+        durable_count = 0
+        completed_objects = []
+        for index, record in enumerate(records):
+            decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
+            value_obj = json.loads(decoded_value_json)
+
+            # Check for the presence of 'data' key in the record
+            if 'data' not in value_obj:
+                print(f"Skipped a record without a 'data' key: {value_obj}")
+            else:
+                inner_data = json.loads(value_obj['data'])
+                chunks = stream_buffers.setdefault(inner_data['id'], {})
+                chunks[inner_data['chunk_index']] = inner_data['chunk']
 
-    # The individual consumer created for the group
-    data["name"] = "weather-domain-operational-data-consumer-instance"
-    
-    response = create_kafka_consumer.create_kafka_consumer(url, headers, data)
-    
-    global operational_data_consumer_base_url
-    operational_data_consumer_base_url = response['base_uri']
-    
-    subscribe_to_kafka_consumer.subscribe_to_kafka_consumer(operational_data_consumer_base_url, ["domain-weather-operational-data"])
+                # The object is complete once every chunk index has arrived
+                if len(chunks) == inner_data['total_chunks']:
+                    completed_objects.append(''.join(chunks[i] for i in range(len(chunks))))
+                    del stream_buffers[inner_data['id']]
 
-    # Consumer for customer-domain-data
-    url = "http://localhost/kafka-rest-proxy/consumers/customer-domain-data-consumer/"
-    data["name"] = "customer-domain-data-consumer-instance"
-    response = create_kafka_consumer.create_kafka_consumer(url, headers, data)
+            if not stream_buffers:
+                durable_count = index + 1
 
+        # Completed objects are routed by format and written in one transaction
+        if completed_objects:
+            conn = sqlite3.connect('weather_domain_stream_data.db')
+            try:
+                for data in completed_objects:
+                    ingest_router.ingest_object(conn.cursor(), data)
+                conn.commit()
+            finally:
+                conn.close()
 
-    global customer_domain_data_consumer_base_url
-    customer_domain_data_consumer_base_url = response['base_uri']
+        metrics.reassembly_buffered_objects.set(len(stream_buffers))
+        metrics.reassembly_buffered_bytes.set(sum(len(chunk) for chunks in stream_buffers.values() for chunk in chunks.values()))
 
-    subscribe_to_kafka_consumer.subscribe_to_kafka_consumer(customer_domain_data_consumer_base_url, ["customer-domain-data"])
-    
-    #  Consumer for data-discovery
-    url = "http://localhost/kafka-rest-proxy/consumers/data-discovery-consumer/"
-    data["name"] = "data-discovery-consumer-instance"
-    response = create_kafka_consumer.create_kafka_consumer(url, headers, data)
+        span.set_attribute("records_processed", len(records))
+        span.set_attribute("objects_stored", len(completed_objects))
 
-    global data_discovery_consumer_base_url
-    data_discovery_consumer_base_url = response['base_uri']
+    return records[:durable_count]
 
-    subscribe_to_kafka_consumer.subscribe_to_kafka_consumer(data_discovery_consumer_base_url, ["data-discovery"])
+# One long-running worker per topic; offsets are committed after each processed batch
+consumer_workers = {
+    "operational-data": KafkaConsumerWorker(consumer_manager, "operational-data", store_operational_data_batch),
+    "customer-domain-data": KafkaConsumerWorker(consumer_manager, "customer-domain-data", process_customer_domain_batch),
+    "data-discovery": KafkaConsumerWorker(consumer_manager, "data-discovery", process_data_discovery_batch),
+    "customer-domain-stream": KafkaConsumerWorker(consumer_manager, "customer-domain-stream", process_customer_domain_stream_batch),
+}
 
-    # Consumer for customer-domain-stream
-    url = "http://localhost/kafka-rest-proxy/consumers/customer-domain-stream-consumer/"
-    data["name"] = "customer-domain-stream-consumer-instance"
-    response = create_kafka_consumer.create_kafka_consumer(url, headers, data)
+# Uploads and publishes that fail are retried from a local queue instead of being lost
+def upload_object(payload):
+    data_bytes = payload["data"].encode('utf-8')
+    minio_client.put_object(payload["bucket_name"], payload["object_name"], io.BytesIO(data_bytes), len(data_bytes), content_type="application/json")
 
-    global customer_domain_stream_consumer_base_url
-    customer_domain_stream_consumer_base_url = response['base_uri']
+def publish_weather_domain_data(payload):
+    kafka_utils.post_to_kafka_topic(KAFKA_REST_PROXY_URL, "weather-domain-data", payload)
 
-    subscribe_to_kafka_consumer.subscribe_to_kafka_consumer(customer_domain_stream_consumer_base_url, ["customer-domain-stream-data"])
+retry_queue = RetryQueue(KAFKA_REST_PROXY_URL)
+retry_queue.register("upload-object", upload_object, "weather-domain-data-error")
+retry_queue.register("publish-domains-data", publish_weather_domain_data, "weather-domain-data-error")
+
+# Started on demand by /replay-error-topics: queues the dead letters of the error topic again
+error_replay_worker = KafkaConsumerWorker(consumer_manager, "error-replay", retry_queue.replay_batch, dead_letter=False)
+
+
+@app.on_event("startup")
+async def startup_event():
+    ensure_table_exists.ensure_table_exists()
+
+    # Rollups are filled from the stored rows once, then kept current by each ingest
+    await asyncio.get_running_loop().run_in_executor(None, rollups.ensure_rollups, WEATHER_DATA_DB)
+    await asyncio.get_running_loop().run_in_executor(None, query_weather_data.ensure_index_exists, WEATHER_DATA_DB)
+
+    # Consumers are created concurrently off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, consumer_manager.start)
+
+    for worker in consumer_workers.values():
+        worker.start()
+    registrar.start()
+    retry_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global operational_data_consumer_base_url
-    operational_data_consumer_url = operational_data_consumer_base_url
-    response = requests.delete(operational_data_consumer_url)
-    print(f"Operational data consumer deleted with status code {response.status_code}")
-
-    global customer_domain_data_consumer_base_url
-    customer_domain_data_url = customer_domain_data_consumer_base_url
-    response = requests.delete(customer_domain_data_url)
-    print(f"Domain data consumer deleted with status code {response.status_code}")
-
-    global data_discovery_consumer_base_url
-    data_discovery_consumer_url = data_discovery_consumer_base_url
-    response = requests.delete(data_discovery_consumer_url)
-    print(f"Data discovery consumer deleted with status code {response.status_code}")
-
-    global customer_domain_stream_consumer_base_url
-    customer_domain_stream_consumer_url = customer_domain_stream_consumer_base_url
-    response = requests.delete(customer_domain_stream_consumer_url)
-    print(f"Customer domain stream consumer deleted with status code {response.status_code}")
+    for worker in consumer_workers.values():
+        worker.stop()
+    error_replay_worker.stop()
+    retry_queue.stop()
+
+    await asyncio.get_running_loop().run_in_executor(None, consumer_manager.stop)
+
+    # Running jobs finish first, so the metadata they register is flushed below
+    await asyncio.get_running_loop().run_in_executor(None, job_manager.shutdown)
+
+    # Metadata still waiting for a batch is sent before exiting
+    await asyncio.get_running_loop().run_in_executor(None, registrar.stop)
 
 @app.get("/")
 async def main_function(): 
     return "welcome to the weather domain analytical service"
 
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/subscribe-to-operational-data")
-async def consume_kafka_message(background_tasks: BackgroundTasks):
+async def consume_kafka_message():
     tracer = trace.get_tracer(__name__)
 
     # Start a new span for this endpoint
     with tracer.start_as_current_span("consume-kafka-message"):
         
-        # Verify Consumer existence and status before proceeding
-        if operational_data_consumer_base_url:  # Check if operational_data_consumer_base_url is initialized
-            response_consumer = requests.get(f"{operational_data_consumer_base_url}/status")
-            if response_consumer.status_code != 200:
-                await startup_event()
-        
-        # If after checking the operational_data_consumer_base_url is still None, return an error message
-        if operational_data_consumer_base_url is None:
+        # The consumer manager health-checks and recreates consumers in the background
+        if consumer_manager.base_url("operational-data") is None:
             return {"status": "Consumer has not been initialized. Please try again later."}
 
-        url = operational_data_consumer_base_url + "/records"
-        headers = {"Accept": "application/vnd.kafka.binary.v2+json"}
-
-        ensure_table_exists.ensure_table_exists()
-
-        # You can use the tracer within the consume_records function to instrument finer details.
-        def consume_records():
-            with tracer.start_as_current_span("consume_records"):
-                global storage_info
-
-                response = requests.get(url, headers=headers)
-                if response.status_code != 200:
-                    raise Exception(f"GET /records/ did not succeed: {response.text}")
-                else:
-                    records = response.json()
-                    for record in records:
-                        decoded_key = base64.b64decode(record['key']).decode('utf-8') if record['key'] else None
-                        decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
-                        value_obj = json.loads(decoded_value_json)
-
-                        storage_info = {
-                            "distributedStorageAddress": value_obj.get('distributedStorageAddress', ''),
-                            "minio_access_key": value_obj.get('minio_access_key', ''),
-                            "minio_secret_key": value_obj.get('minio_secret_key', ''),
-                            "bucket_name": value_obj.get('bucket_name', ''),
-                            "object_name": value_obj.get('object_name', '')
-                        }
-
-                        # Insert the storage info into the SQLite database
-                        insert_into_db.insert_into_db(storage_info, 'object_storage_address.db')
-
-                        print(f"Consumed record with key {decoded_key} and value {value_obj['message']} from topic {record['topic']}")
-                        if 'distributedStorageAddress' in value_obj:
-                            print(f"Distributed storage address: {value_obj['distributedStorageAddress']}")
-                            print(f"Minio access key: {value_obj['minio_access_key']}")
-                            print(f"Minio secret key: {value_obj['minio_secret_key']}")
-                            print(f"Bucket name: {value_obj['bucket_name']}")
-                            print(f"Object name: {value_obj['object_name']}")
-
-        background_tasks.add_task(consume_records)
-        return {"status": "Consuming records in the background"}
+        # The worker normally runs from startup; this restarts it if it has stopped
+        worker = consumer_workers["operational-data"]
+        worker.start()
+        return {"status": "Consuming records in the background", "worker": worker.status()}
 
 @app.get("/register-data-to-data-lichen")
 async def retrieve_and_save_data():
@@ -210,11 +277,69 @@ async def retrieve_and_save_data():
     if not storage_info:
         raise HTTPException(404, "Storage info not found")
 
-    try:
-        register_metadata_to_data_lichen.register_metadata_to_data_lichen()
-        return {"status": "Data successfully retrieved and saved to 'customer_data.db'"}
-    except ResponseError as err:
-        raise HTTPException(status_code=500, detail=f"An error occurred while fetching the data: {err}")
+    # Fetching, saving and profiling every object runs as a background job; a request
+    # made while a registration is queued or running joins that job
+    job, coalesced = job_manager.submit("register-data-to-data-lichen", register_metadata_to_data_lichen.register_metadata_to_data_lichen)
+    return {"status": "Registration in progress" if coalesced else "Registration started", "job_id": job.id, "coalesced": coalesced}
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.as_dict() for job in job_manager.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job.as_dict()
+
+@app.get("/retry-queue")
+async def get_retry_queue():
+    pending = await asyncio.get_running_loop().run_in_executor(None, retry_queue.pending)
+    return {"pending": pending, "replay_worker": error_replay_worker.status()}
+
+@app.get("/replay-error-topics")
+async def replay_error_topics():
+    if consumer_manager.base_url("error-replay") is None:
+        return {"status": "Consumer has not been initialized. Please try again later."}
+
+    # Dead letters are queued for retry again; the worker keeps following the error topic
+    error_replay_worker.start()
+    return {"status": "Replaying error topics in the background", "worker": error_replay_worker.status()}
+
+@app.get("/weather-aggregates/{granularity}")
+async def get_weather_aggregates(granularity: str, metric_names: str = Query(None, alias="metrics"), start: str = None, end: str = None):
+    # Answered from the hourly, daily or monthly rollup table instead of scanning weather_data;
+    # metrics is a comma-separated list of weather_data columns and defaults to all of them
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(400, f"granularity must be one of {', '.join(rollups.GRANULARITIES)}")
+    for name, value in (("start", start), ("end", end)):
+        if value is not None and rollups.parse_time(value) is None:
+            raise HTTPException(400, f"{name} must be a YYYYMMDD or ISO 8601 date")
+
+    with tracer.start_as_current_span("weather-aggregates") as span:
+        span.set_attribute("granularity", granularity)
+        selected = [metric.strip() for metric in metric_names.split(",") if metric.strip()] if metric_names else None
+        try:
+            buckets = await asyncio.get_running_loop().run_in_executor(None, rollups.query_rollups, WEATHER_DATA_DB, granularity, selected, start, end)
+        except ValueError as error:
+            raise HTTPException(400, str(error))
+        span.set_attribute("buckets", len(buckets))
+    return {"granularity": granularity, "buckets": buckets}
+
+@app.get("/query/weather-data")
+async def query_weather_data_endpoint(start: str = None, end: str = None, columns: str = None, limit: int = query_weather_data.PAGE_SIZE, cursor: str = None):
+    # Rows in time order, a page at a time; pass next_cursor back as cursor for the next page
+    selected = [column.strip() for column in columns.split(",") if column.strip()] if columns else None
+    with tracer.start_as_current_span("query-weather-data") as span:
+        try:
+            page = await asyncio.get_running_loop().run_in_executor(None, query_weather_data.query_weather_data, WEATHER_DATA_DB, start, end, selected, limit, cursor)
+        except ValueError as error:
+            raise HTTPException(400, str(error))
+        if page is None:
+            raise HTTPException(404, "No weather data has been stored yet")
+        span.set_attribute("rows", len(page["rows"]))
+    return page
 
 @app.get("/publish-domains-data")
 async def publish_domains_data(background_tasks: BackgroundTasks):
@@ -233,7 +358,7 @@ async def publish_domains_data(background_tasks: BackgroundTasks):
             MINIO_URL,
             access_key=MINIO_ACCESS_KEY,
             secret_key=MINIO_SECRET_KEY,
-            secure=False
+            secure=settings.MINIO_SECURE
         )
 
         # Create the bucket if it doesn't exist
@@ -243,183 +368,85 @@ async def publish_domains_data(background_tasks: BackgroundTasks):
                 minio_client.make_bucket("weather-domain-analytical-data")
             else:
                 logger.info("Bucket 'weather-domain-analytical-data' exists.")
-        except ResponseError as error:
+        except Exception as error:
             logger.error(f"Unable to create bucket. Reason: {error}")
             return {"error": f"Unable to create bucket. Reason: {error}"}
 
         # Upload each data item to MinIO
+        queued = 0
         for record in data_to_publish:
+            payload = {
+                "bucket_name": "weather-domain-analytical-data",
+                "object_name": str(record[0]) + ".json",  # Assuming record[0] is a unique identifier for each record
+                "data": json.dumps(record)
+            }
             try:
-                data_str = json.dumps(record)
-                data_bytes = data_str.encode('utf-8')
-
                 logger.info(f"Uploading record {record[0]} to MinIO...")  # Assuming record[0] is a unique identifier
+                upload_object(payload)
 
-                minio_client.put_object(
-                    "weather-domain-analytical-data",
-                    str(record[0]) + ".json",  # Assuming record[0] is a unique identifier for each record
-                    io.BytesIO(data_bytes),
-                    len(data_bytes),
-                    content_type="application/json"
-                )
-
-            except ResponseError as error:
-                logger.error(f"Error uploading record {record[0]} to MinIO. Sending to Kafka error topic. Reason: {error}")
-                # If there's an issue with uploading, send the data to a Kafka error topic
-                kafka_exporter.send(
-                    topic_name="weather-domain-data-error",
-                    key="weather-data-error",
-                    value=data_str
-                )
+            except Exception as error:
+                # Retried in the background; it reaches weather-domain-data-error only if every retry fails
+                logger.error(f"Error uploading record {record[0]} to MinIO, queued for retry. Reason: {error}")
+                retry_queue.enqueue("upload-object", payload, error)
+                queued += 1
 
         # Dispatch the data to weather-domain-data Kafka topic
         logger.info("Dispatching data to 'weather-domain-data' Kafka topic...")
-        
-        kafka_exporter.send(
-            topic_name="weather-domain-data",
-            key="weather-domain-data",
-            value=json.dumps(data_to_publish)
-        )
+
+        try:
+            publish_weather_domain_data(data_to_publish)
+        except Exception as error:
+            logger.error(f"Error publishing to 'weather-domain-data', queued for retry. Reason: {error}")
+            retry_queue.enqueue("publish-domains-data", data_to_publish, error)
+            return {"status": "Publishing queued for retry", "queued_for_retry": queued + 1}
 
         logger.info("Data published successfully!")
-        return {"status": "Data published successfully!"}
+        return {"status": "Data published successfully!", "queued_for_retry": queued}
 
 
 @app.get("/retrieve-data-from-customer-domain")
-async def retrieve_data_from_customer_domain(background_tasks: BackgroundTasks):
-    print(customer_domain_data_consumer_base_url)
+async def retrieve_data_from_customer_domain():
 
     with tracer.start_as_current_span("retrieve-data-from-customer-domain", kind=SpanKind.SERVER) as span:
-        def process_records_from_kafka_topic():
-            # 1. Listen to the Kafka topic for a new message
-            headers = {"Accept": "application/vnd.kafka.binary.v2+json"}
-
-            response = requests.get(customer_domain_data_consumer_base_url + "/records", headers=headers)
-            
-            if response.status_code != 200:
-                print(f"Failed to retrieve records from Kafka topic: {response.text}")
-                span.set_attribute("error", True)
-                span.set_attribute("error_details", response.text)
-                return
-
-            records = response.json()
-            for record in records:
-                decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
-                value_obj = json.loads(decoded_value_json)
-
-                # 2. Extract Minio storage information
-                distributed_storage_address = value_obj.get('data_location')
-                minio_access_key = MINIO_ACCESS_KEY
-                minio_secret_key = MINIO_SECRET_KEY
-                bucket_name = value_obj.get('bucket_name', 'custom-domain-analytical-data')
-                object_name = value_obj.get('object_name', f"data_object_{value_obj.get('object_id')}.json")
-
-                # 3. Retrieve data from Minio using the storage info
-                data_str = fetch_data_from_minio.fetch_data_from_minio(
-                    distributed_storage_address,
-                    minio_access_key,
-                    minio_secret_key,
-                    bucket_name,
-                    object_name
-                )
-
-                # 4. Save this data to SQLite
-                save_data_to_sqlite.save_data_to_sqlite(data_str, 'weather_domain.db')
-            
-            span.set_attribute("records_processed", len(records))
-            print(f"Processed {len(records)} records from Kafka topic and stored in SQLite.")
-        
-        # Use background tasks to process records
-        background_tasks.add_task(process_records_from_kafka_topic)
-        span.add_event("Started processing records from Kafka topic in the background")
-        return {"status": "Started processing records from Kafka topic in the background."}
+
+        if consumer_manager.base_url("customer-domain-data") is None:
+            span.set_attribute("error", True)
+            span.set_attribute("error_details", "Consumer has not been initialized")
+            return {"status": "Consumer has not been initialized. Please try again later."}
+
+        worker = consumer_workers["customer-domain-data"]
+        worker.start()
+        span.add_event("Processing records from Kafka topic in the background")
+        return {"status": "Started processing records from Kafka topic in the background.", "worker": worker.status()}
 
 @app.get("/retrieve-metadata-from-data-discovery")
-async def retrieve_metadata_from_data_discovery(background_tasks: BackgroundTasks):
+async def retrieve_metadata_from_data_discovery():
     
     with tracer.start_as_current_span("retrieve-metadata-from-data-discovery", kind=SpanKind.SERVER) as span:
+
+        if consumer_manager.base_url("data-discovery") is None:
+            span.set_attribute("error", True)
+            span.set_attribute("error_details", "Consumer has not been initialized")
+            return {"status": "Consumer has not been initialized. Please try again later."}
+
+        worker = consumer_workers["data-discovery"]
+        worker.start()
+        span.add_event("Processing records from data-discovery Kafka topic in the background")
         
-        def process_records_from_data_discovery_topic():
-            # 1. Listen to the Kafka topic for new messages
-            headers = {"Accept": "application/vnd.kafka.binary.v2+json"}
-
-            response = requests.get(data_discovery_consumer_base_url + "/records", headers=headers)
-            
-            if response.status_code != 200:
-                print(f"Failed to retrieve records from data-discovery Kafka topic: {response.text}")
-                span.set_attribute("error", True)
-                span.set_attribute("error_details", response.text)
-                return
-
-            records = response.json()
-            for record in records:
-                decoded_value_json = base64.b64decode(record['value']).decode('utf-8')
-                value_obj = json.loads(decoded_value_json)
-                
-                span.add_event(f"Consumed record with value {value_obj} from topic data-discovery")
-                
-                # Additional processing can be done here if necessary...
-
-            span.set_attribute("records_processed", len(records))
-            print(f"Processed {len(records)} records from data-discovery Kafka topic.")
-        
-        # Use background tasks to process records
-        background_tasks.add_task(process_records_from_data_discovery_topic)
-        span.add_event("Started processing records from data-discovery Kafka topic in the background")
-        
-    return {"status": "Started processing records from data-discovery Kafka topic in the background."}
+    return {"status": "Started processing records from data-discovery Kafka topic in the background.", "worker": worker.status()}
 
 @app.get("/consume-customer-domain-stream")
-async def consume_customer_domain_stream(background_tasks: BackgroundTasks):
+async def consume_customer_domain_stream():
     
     with tracer.start_as_current_span("consume-customer-domain-stream", kind=SpanKind.SERVER) as span:
 
-        if customer_domain_stream_consumer_base_url is None:
+        if consumer_manager.base_url("customer-domain-stream") is None:
             span.set_attribute("error", True)
             span.set_attribute("error_details", "Consumer has not been initialized")
             return {"status": "Consumer has not been initialized. Please try again later."}
 
-        url = customer_domain_stream_consumer_base_url + "/records"
-        headers = {"Accept": "application/vnd.kafka.binary.v2+json"}
-
-        ensure_table_exists.ensure_table_exists()
-
-        def consume_customer_domain_records():
-            global buffered_data
-            while True:  # Continuously consume messages
-                response = requests.get(url, headers=headers)
-                
-                if response.status_code != 200:
-                    span.set_attribute("error", True)
-                    span.set_attribute("error_details", f"GET /records/ did not succeed: {response.text}")
-                    raise Exception(f"GET /records/ did not succeed: {response.text}")
-
-                records = response.json()
-                if not records:  # No new records to process
-                    time.sleep(5)  # Sleep for a short duration before checking again
-                    continue
-
-                print(f"Processing {len(records)} records from the stream...")
-                
-                for record in records:
-                    # Check for the presence of 'data' key in the record
-                    if 'data' not in record:
-                        print(f"Skipped a record without a 'data' key: {record}")
-                        continue
-                    
-                    outer_data = record['data']
-                    inner_data = json.loads(outer_data)
-                    chunk = inner_data['chunk']
-                    buffered_data += base64.b64decode(chunk).decode('utf-8')  # Add chunk to buffer
-
-                    try:
-                        data = json.loads(buffered_data)  # Try parsing the buffered data
-                        save_data_to_sqlite.save_data_to_sqlite(buffered_data, 'weather_domain_stream_data.db')
-                        buffered_data = ""  # Clear the buffer since data was successfully parsed and saved
-                    except json.JSONDecodeError:
-                        continue  # If parsing fails, continue buffering until a valid JSON object/array is received
-
-        background_tasks.add_task(consume_customer_domain_records)
-        span.add_event("Started consuming records from customer domain stream in the background")
+        worker = consumer_workers["customer-domain-stream"]
+        worker.start()
+        span.add_event("Consuming records from customer domain stream in the background")
         
-    return {"status": "Consuming records from customer domain stream in the background"}
\ No newline at end of file
+    return {"status": "Consuming records from customer domain stream in the background", "worker": worker.status()}
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+The ingest router keeps SQLite's case-insensitive column names in mind. Run from the
+application directory:
+
+    python -m pytest tests
+"""
+import logging
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.ingest_router import ingest_object
+
+
+def table_contents(cursor, table_name):
+    rows = cursor.execute(f"SELECT * FROM {table_name}").fetchall()
+    return [column[0] for column in cursor.description], rows
+
+
+def test_keys_that_differ_only_in_case_share_a_column():
+    cursor = sqlite3.connect(":memory:").cursor()
+    ingest_object(cursor, b'{"Name": 1, "name": 2}\n{"NAME": 3}\n', object_name="people.ndjson")
+
+    assert table_contents(cursor, "customer_domain_ndjson_data") == (["Name"], [(2,), (3,)])
+
+
+def test_csv_headers_that_differ_only_in_case_are_renamed():
+    cursor = sqlite3.connect(":memory:").cursor()
+    ingest_object(cursor, b"a,A,b\n1,2,3\n", object_name="table.csv")
+    ingest_object(cursor, b"B\n4\n", object_name="table.csv")
+
+    assert table_contents(cursor, "customer_domain_csv_data") == (
+        ["a", "A_2", "b"],
+        [("1", "2", "3"), (None, None, "4")],
+    )
+
+
+def test_ragged_csv_rows_are_fitted_and_reported(caplog):
+    cursor = sqlite3.connect(":memory:").cursor()
+    with caplog.at_level(logging.WARNING, logger="utilities.ingest_router"):
+        ingest_object(cursor, b"a,b\n1\n2,3\n4,5,6\n", object_name="table.csv")
+
+    assert table_contents(cursor, "customer_domain_csv_data")[1] == [("1", None), ("2", "3"), ("4", "5")]
+    assert "trimmed 2 CSV rows" in caplog.text
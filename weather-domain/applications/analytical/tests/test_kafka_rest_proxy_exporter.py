@@ -0,0 +1,66 @@
+"""
+TailSampler keeps error spans and their traces whatever the sample rate. Run from the
+application directory:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+from utilities.kafka_rest_proxy_exporter import TailSampler, is_error
+
+
+def finished_spans(build):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    build(provider.get_tracer(__name__))
+    return exporter.get_finished_spans()
+
+
+def never_sampled():
+    # Only the error and slow-span rules can keep a span
+    return TailSampler(default_rate=0.0, slow_threshold_ms=float("inf"))
+
+
+def test_error_attribute_keeps_the_whole_trace():
+    def build(tracer):
+        with tracer.start_as_current_span("store-operational-data"):
+            with tracer.start_as_current_span("upload") as span:
+                span.set_attribute("error", True)
+        with tracer.start_as_current_span("healthy"):
+            pass
+
+    spans = finished_spans(build)
+    kept, dropped = never_sampled().sample(spans)
+
+    assert sorted(span.name for span in kept) == ["store-operational-data", "upload"]
+    assert [span.name for span in dropped] == ["healthy"]
+
+
+def test_error_status_keeps_the_span():
+    def build(tracer):
+        with tracer.start_as_current_span("query") as span:
+            span.set_status(Status(StatusCode.ERROR))
+
+    kept, dropped = never_sampled().sample(finished_spans(build))
+
+    assert [span.name for span in kept] == ["query"]
+    assert dropped == []
+
+
+def test_false_error_attribute_is_not_an_error():
+    def build(tracer):
+        with tracer.start_as_current_span("publish") as span:
+            span.set_attribute("error", False)
+
+    spans = finished_spans(build)
+
+    assert not is_error(spans[0])
+    assert never_sampled().sample(spans) == ([], list(spans))
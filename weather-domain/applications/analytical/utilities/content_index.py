@@ -0,0 +1,130 @@
+import hashlib
+import sqlite3
+from utilities import metrics
+from utilities.settings import settings
+
+CONTENT_DEDUP = settings.CONTENT_DEDUP  # False ingests every announced object again
+FETCH_SIZE = settings.MINIO_FETCH_SIZE
+
+
+class DuplicateContent(Exception):
+    pass
+
+
+def ensure_table_exists(cursor):
+    # Kept in the database the objects are written to, so an object is recorded in the
+    # same transaction as its rows and each destination has its own index
+    cursor.execute('''CREATE TABLE IF NOT EXISTS known_content (
+                        data_hash TEXT PRIMARY KEY,
+                        etag TEXT,
+                        bucket_name TEXT,
+                        object_name TEXT,
+                        size INTEGER
+                    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS known_content_etag ON known_content (etag)")
+
+
+def is_known(cursor, data_hash=None, etag=None):
+    """True when an object with this SHA-256 digest, or with this ETag, has been written."""
+    ensure_table_exists(cursor)
+    if data_hash is not None and cursor.execute("SELECT 1 FROM known_content WHERE data_hash = ?", (data_hash,)).fetchone():
+        return True
+    if etag and cursor.execute("SELECT 1 FROM known_content WHERE etag = ? LIMIT 1", (etag,)).fetchone():
+        return True
+    return False
+
+
+def remember(cursor, data_hash, etag=None, bucket_name=None, object_name=None, size=None):
+    """Record a written object; call it with the cursor that wrote the object's rows."""
+    ensure_table_exists(cursor)
+    cursor.execute(
+        "INSERT OR REPLACE INTO known_content (data_hash, etag, bucket_name, object_name, size) VALUES (?, ?, ?, ?, ?)",
+        (data_hash, etag, bucket_name, object_name, size)
+    )
+
+
+def remember_new(cursor, data_hash, etag=None, bucket_name=None, object_name=None, size=None):
+    """
+    Like remember, but raises DuplicateContent when the digest is already recorded, so a
+    caller that could only hash the object while writing it can roll the write back.
+    """
+    if CONTENT_DEDUP and is_known(cursor, data_hash):
+        raise DuplicateContent(data_hash)
+    remember(cursor, data_hash, etag, bucket_name, object_name, size)
+
+
+def is_known_in(db_path, data_hash=None, etag=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        return is_known(conn.cursor(), data_hash, etag)
+    finally:
+        conn.close()
+
+
+def response_etag(response):
+    etag = response.headers.get("ETag")
+    return etag.strip('"') if etag else None
+
+
+class HashingReader:
+    """File-like wrapper that hashes what a streaming consumer, such as read_csv, reads."""
+
+    def __init__(self, response):
+        self.response = response
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.response.read(None if size is None or size < 0 else size)
+        self.hasher.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
+def read_object(response, chunk_size=FETCH_SIZE):
+    """
+    Read a whole object into one buffer, hashing each chunk as it arrives, and return
+    (buffer, SHA-256 hex digest). With a Content-Length the buffer is allocated once and
+    filled in place, so the object is never held twice.
+    """
+    hasher = hashlib.sha256()
+    length = response.headers.get("Content-Length")
+    if length is None:
+        buffer = bytearray()
+        for chunk in response.stream(chunk_size):
+            hasher.update(chunk)
+            buffer += chunk
+        return buffer, hasher.hexdigest()
+
+    buffer = bytearray(int(length))
+    view = memoryview(buffer)
+    position = 0
+    while position < len(buffer):
+        read = response.readinto(view[position:position + chunk_size])
+        if not read:
+            raise IOError(f"Object ended after {position} of {len(buffer)} bytes")
+        hasher.update(view[position:position + read])
+        position += read
+    return buffer, hasher.hexdigest()
+
+
+def read_new_object(response, db_path, chunk_size=FETCH_SIZE):
+    """
+    Read an open object response unless db_path already holds its content. The ETag
+    is checked before the body is read and the digest once it has been hashed, so a
+    duplicate costs at most the download and never a parse or write. Returns
+    (data, data_hash, etag), or None for a duplicate. The response is not closed.
+    """
+    etag = response_etag(response)
+    if CONTENT_DEDUP and etag and is_known_in(db_path, etag=etag):
+        metrics.objects_deduplicated.labels("etag").inc()
+        return None
+
+    data, data_hash = read_object(response, chunk_size)
+    if CONTENT_DEDUP and is_known_in(db_path, data_hash=data_hash):
+        metrics.objects_deduplicated.labels("digest").inc()
+        return None
+    return data, data_hash, etag
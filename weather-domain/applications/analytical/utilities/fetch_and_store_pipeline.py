@@ -0,0 +1,114 @@
+import queue
+import sqlite3
+import threading
+from utilities import content_index, fetch_data_from_minio, ingest_router, metrics
+from utilities.settings import settings
+
+FETCH_POOL_SIZE = settings.PIPELINE_FETCH_POOL_SIZE  # Concurrent Minio downloads
+QUEUE_SIZE = settings.PIPELINE_QUEUE_SIZE  # Bound on objects waiting between stages
+WRITE_BATCH_SIZE = settings.PIPELINE_WRITE_BATCH_SIZE  # Objects written per SQLite transaction
+
+_DONE = object()
+
+
+def run_fetch_and_store_pipeline(storage_info_list, db_path, write_data=ingest_router.ingest_object):
+    """
+    Fetch every object in storage_info_list from Minio and write it to db_path.
+
+    Stage 1 (the caller) feeds a bounded queue, stage 2 is a pool of fetch threads,
+    stage 3 is a single writer that owns the SQLite connection and commits every
+    WRITE_BATCH_SIZE objects, so downloads overlap with database writes.
+    storage_info_list items carry the keyword arguments of fetch_data_from_minio;
+    write_data receives each object's bytes, Content-Type and name so it can pick a parser.
+    Objects whose ETag or SHA-256 db_path already holds are skipped by the fetchers, and
+    ones repeated within the batch by the writer, so duplicates are never parsed.
+    Raises the first fetch or write error once the pipeline has drained.
+    """
+    fetch_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    write_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    errors = []
+    stats = {"objects": 0, "written": 0, "bytes": 0, "duplicates": 0}
+
+    def fetch_worker():
+        while True:
+            storage_info = fetch_queue.get()
+            if storage_info is _DONE:
+                return
+            if errors:
+                continue  # Drain the queue without fetching once the batch has failed
+
+            try:
+                # None marks a duplicate, counted by the writer
+                fetched = fetch_data_from_minio.fetch_new_object_from_minio(db_path, **storage_info)
+                write_queue.put((fetched, storage_info))
+            except Exception as e:
+                errors.append(e)
+
+    def writer():
+        conn = None
+        pending = 0
+        try:
+            conn = sqlite3.connect(db_path)
+        except Exception as e:
+            errors.append(e)
+
+        try:
+            while True:
+                item = write_queue.get()
+                if item is _DONE:
+                    break
+                if errors:
+                    continue  # Keep draining so the fetchers never block on a full queue
+
+                try:
+                    fetched, storage_info = item
+                    if fetched is None:
+                        stats["duplicates"] += 1
+                        continue
+
+                    data, content_type, data_hash, etag = fetched
+                    cursor = conn.cursor()
+                    # Announced more than once in this batch, or written since it was fetched
+                    if content_index.CONTENT_DEDUP and content_index.is_known(cursor, data_hash, etag):
+                        metrics.objects_deduplicated.labels("digest").inc()
+                        stats["duplicates"] += 1
+                        continue
+
+                    write_data(cursor, data, content_type, storage_info["object_name"])
+                    content_index.remember(cursor, data_hash, etag, storage_info["bucket_name"], storage_info["object_name"], len(data))
+                    stats["written"] += 1
+                    stats["bytes"] += len(data)
+                    pending += 1
+                    if pending >= WRITE_BATCH_SIZE:
+                        conn.commit()
+                        pending = 0
+                except Exception as e:
+                    conn.rollback()
+                    errors.append(e)
+
+            if pending and not errors:
+                conn.commit()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    fetchers = [threading.Thread(target=fetch_worker, daemon=True) for _ in range(FETCH_POOL_SIZE)]
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    for thread in fetchers:
+        thread.start()
+    writer_thread.start()
+
+    for storage_info in storage_info_list:
+        fetch_queue.put(storage_info)
+        stats["objects"] += 1
+    for _ in fetchers:
+        fetch_queue.put(_DONE)
+
+    for thread in fetchers:
+        thread.join()
+    write_queue.put(_DONE)
+    writer_thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
@@ -1,19 +1,78 @@
+import threading
 from minio import Minio
+from utilities import content_index, metrics
+from utilities.settings import settings
 
+# Minio clients are thread-safe and pool their connections, so one is kept per endpoint/credentials
+_minio_clients = {}
+_minio_clients_lock = threading.Lock()
+
+def get_minio_client(distributed_storage_address, minio_access_key, minio_secret_key):
+    key = (distributed_storage_address, minio_access_key, minio_secret_key)
+    with _minio_clients_lock:
+        minio_client = _minio_clients.get(key)
+        if minio_client is None:
+            minio_client = Minio(
+                distributed_storage_address,
+                access_key=minio_access_key,
+                secret_key=minio_secret_key,
+                secure=settings.MINIO_SECURE
+            )
+            _minio_clients[key] = minio_client
+        return minio_client
+
+def open_minio_object(distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name):
+    # Returns the raw streaming response; callers must close() and release_conn() it
+    minio_client = get_minio_client(distributed_storage_address, minio_access_key, minio_secret_key)
+    return minio_client.get_object(bucket_name, object_name)
+
+@metrics.timed("minio_fetch")
 def fetch_data_from_minio(distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name):
 
+    data = open_minio_object(distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name)
+    try:
+        chunks = [d for d in data.stream(settings.MINIO_FETCH_SIZE)]
+    finally:
+        data.close()
+        data.release_conn()
+
+    data_bytes = b''.join(chunks)
+    metrics.minio_bytes_fetched.inc(len(data_bytes))
+    return data_bytes.decode('utf-8')
 
-    minio_client = Minio(
-        distributed_storage_address,
-        access_key=minio_access_key,
-        secret_key=minio_secret_key,
-        secure=False    
-    )
+@metrics.timed("minio_fetch")
+def fetch_object_from_minio(distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name):
+    # Raw bytes plus the stored Content-Type, for callers that pick a parser per object
+    data = open_minio_object(distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name)
+    try:
+        content_type = data.headers.get('Content-Type')
+        chunks = [d for d in data.stream(settings.MINIO_FETCH_SIZE)]
+    finally:
+        data.close()
+        data.release_conn()
 
-    data = minio_client.get_object(bucket_name, object_name)
-    data_str = ''
+    data_bytes = b''.join(chunks)
+    metrics.minio_bytes_fetched.inc(len(data_bytes))
+    return data_bytes, content_type
 
-    for d in data.stream(32*1024):
-        data_str += d.decode()
+@metrics.timed("minio_fetch")
+def fetch_new_object_from_minio(db_path, distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name):
+    """
+    Like fetch_object_from_minio, but skips objects db_path already holds: the ETag is
+    checked before the body is read and the SHA-256, computed chunk by chunk while it
+    is read, before it is returned. Returns (data, content_type, data_hash, etag), or
+    None for a duplicate.
+    """
+    data = open_minio_object(distributed_storage_address, minio_access_key, minio_secret_key, bucket_name, object_name)
+    try:
+        content_type = data.headers.get('Content-Type')
+        fetched = content_index.read_new_object(data, db_path, settings.MINIO_FETCH_SIZE)
+    finally:
+        data.close()
+        data.release_conn()
 
-    return data_str
\ No newline at end of file
+    if fetched is None:
+        return None
+    data_bytes, data_hash, etag = fetched
+    metrics.minio_bytes_fetched.inc(len(data_bytes))
+    return data_bytes, content_type, data_hash, etag
@@ -1,9 +1,16 @@
 from datetime import datetime
 import time 
 from utilities import fetch_data_from_minio, save_data_to_sqlite, create_metadata, get_all_storage_from_db
-from utilities import save_data_to_sqlite
+from utilities import save_data_to_sqlite, ingest_csv_with_pandas, content_index, metrics
+from utilities.settings import settings
 
-def fetch_data_from_minio_and_create_metadata():
+# "csv" parses each object row by row with csv.reader; "pandas" streams it
+# through chunked read_csv frames and collects column statistics on the way
+INGEST_ENGINE = settings.INGEST_ENGINE
+WEATHER_DATA_DB = 'weather-domain-data.db'
+
+def fetch_data_from_minio_and_create_metadata(job=None):
+    """Ingest every stored object and profile it; progress is reported to job when given."""
     print("Starting data fetching and metadata creation process...")
 
     actual_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -14,6 +21,11 @@ def fetch_data_from_minio_and_create_metadata():
 
     print(f"Storage Info: {all_storage_info}")
     print(f'Total number of objects to receive: {len(all_storage_info)}')
+    if job is not None:
+        job.set_total(len(all_storage_info))
+
+    ingest_stats = {"rows": 0, "columns": {}}
+    ingested_objects = 0
 
     for storage_info in all_storage_info:
         print(f"Fetching data from Minio for storage: {storage_info}...")
@@ -26,15 +38,76 @@ def fetch_data_from_minio_and_create_metadata():
             'bucket_name': storage_info['bucket_name'],
             'object_name': storage_info['object_name']
         }
-        
-        data_str = fetch_data_from_minio.fetch_data_from_minio(**storage_info_updated)
+
+        # Objects already ingested, by ETag or by content, are skipped before they are parsed
+        if INGEST_ENGINE == "pandas":
+            response = fetch_data_from_minio.open_minio_object(**storage_info_updated)
+            try:
+                # The body is parsed while it streams, so only the ETag can be checked up
+                # front; the digest is computed on the way and the rows of a known one are
+                # rolled back before they are committed
+                etag = content_index.response_etag(response)
+                if content_index.CONTENT_DEDUP and etag and content_index.is_known_in(WEATHER_DATA_DB, etag=etag):
+                    metrics.objects_deduplicated.labels("etag").inc()
+                    print(f"Data from storage {storage_info} is already stored. Skipping.")
+                    if job is not None:
+                        job.advance()
+                    continue
+
+                print(f"Streaming data from storage {storage_info} to SQLite...")
+                reader = content_index.HashingReader(response)
+                object_stats = ingest_csv_with_pandas.ingest_csv_with_pandas(
+                    reader, WEATHER_DATA_DB,
+                    before_commit=lambda cursor: content_index.remember_new(cursor, reader.hexdigest(), etag, storage_info['bucket_name'], storage_info['object_name'], reader.size)
+                )
+            except content_index.DuplicateContent:
+                metrics.objects_deduplicated.labels("digest").inc()
+                print(f"Data from storage {storage_info} is already stored. Skipping.")
+                if job is not None:
+                    job.advance()
+                continue
+            finally:
+                response.close()
+                response.release_conn()
+
+            ingested_objects += 1
+            ingest_stats["rows"] += object_stats["rows"]
+            ingest_csv_with_pandas.merge_column_stats(ingest_stats["columns"], object_stats["columns"])
+            if job is not None:
+                job.advance(bytes=int(response.headers.get("Content-Length", 0)))
+            continue
+
+        fetched = fetch_data_from_minio.fetch_new_object_from_minio(WEATHER_DATA_DB, **storage_info_updated)
+        if fetched is None:
+            print(f"Data from storage {storage_info} is already stored. Skipping.")
+            if job is not None:
+                job.advance()
+            continue
+
+        data, _, data_hash, etag = fetched
+        data_str = data.decode('utf-8')
+        ingested_objects += 1
         print(f"Saving data from storage {storage_info} to SQLite...")
-        save_data_to_sqlite.save_data_to_sqlite(data_str, 'weather-domain-data.db')
+        save_data_to_sqlite.save_data_to_sqlite(data_str, WEATHER_DATA_DB, {
+            "data_hash": data_hash,
+            "etag": etag,
+            "bucket_name": storage_info['bucket_name'],
+            "object_name": storage_info['object_name'],
+            "size": len(data)
+        })
+        if job is not None:
+            job.advance(bytes=len(data))
 
+    if not ingested_objects:
+        print("No new data was fetched; no metadata to create.")
+        return None
 
     processing_duration = time.time() - start_time
     print(f"Creating metadata... (Processing duration: {processing_duration} seconds)")
-    metadata = create_metadata.create_metadata(actual_time, processing_duration, data_str)
+    if INGEST_ENGINE == "pandas":
+        metadata = create_metadata.create_metadata_from_stats(actual_time, processing_duration, ingest_stats)
+    else:
+        metadata = create_metadata.create_metadata(actual_time, processing_duration, data_str)
 
     print("Data fetching and metadata creation process completed.")
     return metadata
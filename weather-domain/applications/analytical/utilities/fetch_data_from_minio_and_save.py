@@ -1,5 +1,5 @@
 from utilities import fetch_data_from_minio, create_metadata, save_data_to_sqlite
-import requests
+from utilities.data_lichen_client import registrar
 import time 
 
 
@@ -19,9 +19,5 @@ def fetch_data_from_minio_and_save(actual_time):
     metadata = create_metadata.create_metadata(actual_time, processing_duration, data_str)
     print(metadata)
 
-    # Send metadata to Data Lichen
-    response = requests.post('http://localhost:3000/register', json=metadata)
-    if response.status_code == 200:
-        print(response.json()['message'])
-    else:
-        print("Failed to register metadata with Data Lichen.")
+    # Queued and sent to Data Lichen with other entries as one /register-batch request
+    registrar.register(metadata)
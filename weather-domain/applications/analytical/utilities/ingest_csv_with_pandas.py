@@ -0,0 +1,184 @@
+import sqlite3
+import pandas as pd
+from utilities import metrics, query_weather_data, rollups, sqlite_query
+from utilities.settings import settings
+
+CHUNK_SIZE = settings.PANDAS_CHUNK_ROWS  # Rows per read_csv frame; each frame is written in a single executemany
+TABLE_NAME = rollups.SOURCE_TABLE
+
+# Columns of the merged weather series that get min, max and sum statistics. Frames are
+# read as text, so the stored values are the source's text exactly as the csv engine
+# stores them; numbers are only derived for the statistics and rollups.
+# 'precipitation' is left out because the source marks trace amounts with 'T'.
+NUMERIC_COLUMNS = ("min", "max", "normal_min", "normal_max", "precipitation_normal")
+
+# Time formats pandas converts in one call per frame, with the length of their values.
+# The length check keeps out values with one-digit fields, which strptime accepts but
+# rollups.parse_time does not; any value not converted here goes through parse_time.
+TIME_FORMATS = (
+    ("%Y%m%d", 8),  # The source's dates
+    ("%Y-%m-%d", 10),
+    ("%Y-%m-%dT%H:%M", 16),
+    ("%Y-%m-%d %H:%M", 16),
+    ("%Y-%m-%dT%H:%M:%S", 19),
+    ("%Y-%m-%d %H:%M:%S", 19),
+)
+
+
+def to_numbers(column):
+    """Vectorised rollups.to_number: the column's values as floats, NaN where not a number."""
+    numbers = pd.to_numeric(column, errors="coerce")
+    missing = numbers.isna()
+    if missing.any():
+        for value, number in rollups.TRACE_VALUES.items():
+            numbers[missing & (column == value)] = number
+    return numbers
+
+
+def summarise_chunk(chunk, numbers, numeric_columns=NUMERIC_COLUMNS):
+    """
+    Compute per-column statistics for a single text frame using vectorised operations.
+    numbers holds the numeric view of the frame's columns, as from to_numbers.
+    """
+    stats = {}
+    for column in chunk.columns:
+        if column in numeric_columns and column in numbers:
+            values = numbers[column]
+            count = int(values.count())
+            stats[column] = {"count": count, "missing": len(chunk) - count}
+            if count:
+                stats[column].update(min=float(values.min()), max=float(values.max()), sum=float(values.sum()))
+        else:
+            count = int((chunk[column] != "").sum())
+            stats[column] = {"count": count, "missing": len(chunk) - count}
+    return stats
+
+
+def to_hours(times):
+    """
+    Vectorised rollups.hour_of, as datetime64 values truncated to the hour (NaT where the
+    time does not parse). Values in TIME_FORMATS are converted a format at a time; any
+    other value goes through rollups.parse_time, so both engines bucket every row alike.
+    """
+    text = pd.Series(times, dtype=object)
+    lengths = text.str.len()
+    hours = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for time_format, length in TIME_FORMATS:
+        candidates = hours.isna() & lengths.eq(length)
+        if candidates.any():
+            hours[candidates] = pd.to_datetime(text[candidates], format=time_format, errors="coerce")
+    for index in text.index[hours.isna()]:
+        parsed = rollups.parse_time(text[index])
+        if parsed is not None:
+            hours[index] = parsed.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    return hours.dt.floor("h")
+
+
+def hourly_aggregates(chunk, numbers):
+    """
+    The frame's rollup aggregates per hour: count, sum, min and max of every numeric view
+    in numbers, indexed by the hour. Rows whose time does not parse are left out (groupby
+    drops NaT), as rollups.update_rollups does.
+    """
+    # Each distinct time is converted once
+    codes, times = pd.factorize(chunk[rollups.TIME_COLUMN])
+    hours = to_hours(times).to_numpy()[codes]
+    return numbers.groupby(hours, sort=False).agg(list(rollups.AGGREGATES))
+
+
+def combine_aggregates(aggregates, by):
+    """Aggregate partial aggregates again: counts and sums add up, minima and maxima fold."""
+    functions = {(column, aggregate): "sum" if aggregate in ("count", "sum") else aggregate for column, aggregate in aggregates.columns}
+    return aggregates.groupby(by, sort=False).agg(functions)
+
+
+@metrics.timed("rollup_update")
+def merge_rollups(cursor, hourly):
+    """
+    Fold aggregates indexed by hour into every rollup table; the daily and monthly
+    aggregates are grouped from the hourly ones.
+    """
+    columns = list(dict.fromkeys(column for column, _ in hourly.columns))
+    periods = {"daily": hourly.index.floor("D"), "monthly": hourly.index.to_period("M").to_timestamp()}
+    for granularity, key_length in rollups.GRANULARITIES.items():
+        aggregates = hourly if granularity == "hourly" else combine_aggregates(hourly, periods[granularity])
+        buckets = [hour.strftime(rollups.HOUR_FORMAT)[:key_length] for hour in aggregates.index.to_pydatetime()]
+        # tolist() gives plain Python values; sqlite3 binds NaN (a bucket without numbers) as NULL
+        values = [aggregates[column].tolist() for column in aggregates.columns]
+        rollups.merge_buckets(cursor, granularity, columns, zip(buckets, *values))
+
+
+def merge_column_stats(total, chunk_stats):
+    """Fold the statistics of one frame (or one object) into a running total."""
+    for column, stats in chunk_stats.items():
+        merged = total.setdefault(column, {"count": 0, "missing": 0})
+        merged["count"] += stats["count"]
+        merged["missing"] += stats["missing"]
+
+        if "sum" in stats:
+            merged["sum"] = merged.get("sum", 0.0) + stats["sum"]
+            merged["min"] = min(merged.get("min", stats["min"]), stats["min"])
+            merged["max"] = max(merged.get("max", stats["max"]), stats["max"])
+
+        if "sum" in merged and merged["count"]:
+            merged["mean"] = merged["sum"] / merged["count"]
+
+    return total
+
+
+@metrics.timed("sqlite_write")
+def ingest_csv_with_pandas(source, db_path, chunk_size=CHUNK_SIZE, before_commit=None, numeric_columns=NUMERIC_COLUMNS):
+    """
+    Stream a CSV source (a MinIO response, an open file or a StringIO) into SQLite
+    in chunked read_csv frames, returning the row count and per-column statistics
+    gathered in the same pass. The rollups are aggregated from the frames too, instead
+    of per row in SQL. before_commit, when given, is called with the cursor once every
+    frame is written, inside the same transaction.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    total_rows = 0
+    column_stats = {}
+    sql_insert_command = None
+    hourly = []
+
+    try:
+        # Every value is read as text and empty fields stay empty strings, so the rows
+        # are stored exactly as the csv engine stores them
+        for chunk in pd.read_csv(source, dtype=str, na_filter=False, chunksize=chunk_size):
+            if sql_insert_command is None:
+                # Same schema as the row-by-row loader so both engines share the table
+                columns = ', '.join([f'"{col}" TEXT' for col in chunk.columns])
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} ({columns})")
+                query_weather_data.ensure_index(cursor)
+
+                placeholders = ', '.join(['?'] * len(chunk.columns))
+                sql_insert_command = f"INSERT INTO {TABLE_NAME} VALUES ({placeholders})"
+
+            value_columns = [column for column in chunk.columns if column != rollups.TIME_COLUMN]
+            numbers = pd.DataFrame({column: to_numbers(chunk[column]) for column in value_columns}, index=chunk.index)
+            merge_column_stats(column_stats, summarise_chunk(chunk, numbers, numeric_columns))
+            if rollups.TIME_COLUMN in chunk.columns:
+                hourly.append(hourly_aggregates(chunk, numbers))
+
+            # Column-wise tolist() yields plain Python strings
+            rows = zip(*(chunk[column].tolist() for column in chunk.columns))
+            cursor.executemany(sql_insert_command, rows)
+            total_rows += len(chunk)
+
+        # The hourly, daily and monthly rollups take in the new rows in the same transaction
+        if hourly:
+            # A bucket can span frames, so the frames' hourly aggregates are combined first
+            hourly = pd.concat(hourly)
+            merge_rollups(cursor, combine_aggregates(hourly, hourly.index))
+        if before_commit is not None:
+            before_commit(cursor)
+        conn.commit()
+        sqlite_query.invalidate(TABLE_NAME)
+    finally:
+        conn.close()
+
+    metrics.rows_ingested.labels(TABLE_NAME).inc(total_rows)
+
+    return {"rows": total_rows, "columns": column_stats}
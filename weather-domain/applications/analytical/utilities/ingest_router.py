@@ -0,0 +1,401 @@
+import abc
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+from utilities import metrics
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+FORMAT_COLUMNAR = "columnar"
+
+# Every format lands in its own table so differently shaped objects never share a schema
+TABLE_NAMES = {
+    FORMAT_CSV: "customer_domain_csv_data",
+    FORMAT_JSON: "customer_domain_json_data",
+    FORMAT_NDJSON: "customer_domain_ndjson_data",
+    FORMAT_COLUMNAR: "customer_domain_columnar_data",
+}
+
+CONTENT_TYPES = {
+    "text/csv": FORMAT_CSV,
+    "application/csv": FORMAT_CSV,
+    "application/json": FORMAT_JSON,
+    "text/json": FORMAT_JSON,
+    "application/x-ndjson": FORMAT_NDJSON,
+    "application/ndjson": FORMAT_NDJSON,
+    "application/jsonl": FORMAT_NDJSON,
+    "application/json-seq": FORMAT_NDJSON,
+    "application/vnd.apache.parquet": FORMAT_COLUMNAR,
+    "application/x-parquet": FORMAT_COLUMNAR,
+    "application/vnd.apache.arrow.file": FORMAT_COLUMNAR,
+    "application/vnd.apache.arrow.stream": FORMAT_COLUMNAR,
+}
+
+EXTENSIONS = {
+    ".csv": FORMAT_CSV,
+    ".json": FORMAT_JSON,
+    ".ndjson": FORMAT_NDJSON,
+    ".jsonl": FORMAT_NDJSON,
+    ".parquet": FORMAT_COLUMNAR,
+    ".arrow": FORMAT_COLUMNAR,
+    ".feather": FORMAT_COLUMNAR,
+}
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+SNIFF_SIZE = 64 * 1024  # Bytes inspected when neither the content type nor the name decide
+INSERT_BATCH_SIZE = settings.SQLITE_BATCH_SIZE  # Rows per executemany
+READ_SIZE = 1024 * 1024  # Text read size when scanning a JSON array
+
+
+def detect_format(head, content_type=None, object_name=None):
+    """
+    Pick the format of an object from its Content-Type, then its extension, then its
+    leading bytes. Generic types such as application/octet-stream fall through to sniffing.
+    """
+    if content_type:
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type in CONTENT_TYPES:
+            detected = CONTENT_TYPES[media_type]
+            # Producers often label NDJSON as plain JSON; the content settles it
+            if detected != FORMAT_JSON or sniff_format(head) != FORMAT_NDJSON:
+                return detected
+
+    if object_name:
+        extension = os.path.splitext(object_name)[1].lower()
+        if extension in EXTENSIONS:
+            detected = EXTENSIONS[extension]
+            if detected != FORMAT_JSON or sniff_format(head) != FORMAT_NDJSON:
+                return detected
+
+    return sniff_format(head)
+
+
+def sniff_format(head):
+    if head.startswith(PARQUET_MAGIC) or head.startswith(ARROW_MAGIC):
+        return FORMAT_COLUMNAR
+
+    text = head[:SNIFF_SIZE].decode("utf-8", errors="ignore").lstrip("﻿ \t\r\n")
+    if text.startswith("["):
+        return FORMAT_JSON
+    if text.startswith("{"):
+        # More than one complete object on separate lines means NDJSON
+        first_line, newline, rest = text.partition("\n")
+        if newline and rest.strip():
+            try:
+                json.loads(first_line)
+                return FORMAT_NDJSON
+            except json.JSONDecodeError:
+                pass
+        return FORMAT_JSON
+    return FORMAT_CSV
+
+
+def to_sqlite_value(value):
+    if value is None or isinstance(value, (str, int, float, bytes)):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def unique_columns(columns):
+    """
+    SQLite column names are case-insensitive, so headers that repeat one another up to
+    case get a numeric suffix ("name", "Name" -> "name", "Name_2").
+    """
+    seen, unique = set(), []
+    for column in columns:
+        candidate, suffix = column, 2
+        while candidate.lower() in seen:
+            candidate, suffix = f"{column}_{suffix}", suffix + 1
+        seen.add(candidate.lower())
+        unique.append(candidate)
+    return unique
+
+
+def merge_case_duplicates(record):
+    """Keys that differ only in case share one column: the first spelling and the last value win."""
+    if len({key.lower() for key in record}) == len(record):
+        return record
+    merged, spellings = {}, {}
+    for key, value in record.items():
+        merged[spellings.setdefault(key.lower(), key)] = value
+    return merged
+
+
+class SchemaCache:
+    """
+    Known columns of each (database, table), so an object with a familiar shape costs
+    no PRAGMA or CREATE round trip. New columns are added with ALTER TABLE. Names are
+    compared lower-cased, as SQLite does.
+    """
+
+    def __init__(self):
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def ensure_columns(self, cursor, db_key, table_name, columns, column_type):
+        key = (db_key, table_name)
+        with self._lock:
+            known = self._columns.get(key)
+            if known is not None and all(column.lower() in known for column in columns):
+                return
+
+            cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+            known = {row[1].lower() for row in cursor.fetchall()}
+            if not known:
+                definitions = ", ".join(f"{quote_identifier(column)} {column_type}".rstrip() for column in columns)
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {quote_identifier(table_name)} ({definitions})")
+                known = {column.lower() for column in columns}
+            else:
+                for column in columns:
+                    if column.lower() not in known:
+                        cursor.execute(f"ALTER TABLE {quote_identifier(table_name)} ADD COLUMN {quote_identifier(column)} {column_type}".rstrip())
+                        known.add(column.lower())
+            self._columns[key] = known
+
+    def invalidate(self, db_key, table_name):
+        with self._lock:
+            self._columns.pop((db_key, table_name), None)
+
+
+class FormatLoader(abc.ABC):
+    """Streams one format into its own table; subclasses yield (columns, rows) batches."""
+
+    format_name = None
+    column_type = ""  # No declared type keeps the native JSON/columnar value types
+
+    def __init__(self):
+        self.table_name = TABLE_NAMES[self.format_name]
+        self.schema_cache = SchemaCache()
+
+    @abc.abstractmethod
+    def iter_batches(self, stream):
+        """Yield (columns, rows) batches of at most INSERT_BATCH_SIZE rows."""
+
+    def load(self, cursor, stream):
+        db_key = database_key(cursor)
+        rows_written = 0
+
+        for columns, rows in self.iter_batches(stream):
+            if not columns or not rows:
+                continue
+            self.schema_cache.ensure_columns(cursor, db_key, self.table_name, columns, self.column_type)
+
+            column_list = ", ".join(quote_identifier(column) for column in columns)
+            placeholders = ", ".join(["?"] * len(columns))
+            sql_insert_command = f"INSERT INTO {quote_identifier(self.table_name)} ({column_list}) VALUES ({placeholders})"
+            try:
+                cursor.executemany(sql_insert_command, rows)
+            except sqlite3.OperationalError:
+                # The table changed underneath the cache (dropped or recreated); rebuild once
+                self.schema_cache.invalidate(db_key, self.table_name)
+                self.schema_cache.ensure_columns(cursor, db_key, self.table_name, columns, self.column_type)
+                cursor.executemany(sql_insert_command, rows)
+            rows_written += len(rows)
+
+        metrics.rows_ingested.labels(self.table_name).inc(rows_written)
+        return rows_written
+
+
+class CsvLoader(FormatLoader):
+    format_name = FORMAT_CSV
+    column_type = "TEXT"
+
+    def iter_batches(self, stream):
+        reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+        headers = next(reader, None)
+        if not headers:
+            return
+        headers = unique_columns(headers)
+
+        batch, ragged_rows = [], 0
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(headers):
+                # Pad or trim ragged rows to the header width, and report them below
+                ragged_rows += 1
+                row = (row + [None] * len(headers))[:len(headers)]
+            batch.append(row)
+            if len(batch) == INSERT_BATCH_SIZE:
+                yield headers, batch
+                batch = []
+        if batch:
+            yield headers, batch
+
+        if ragged_rows:
+            logger.warning(f"Padded or trimmed {ragged_rows} CSV rows that did not have {len(headers)} columns")
+
+
+class RecordLoader(FormatLoader):
+    """Shared batching for formats that produce one JSON value per record."""
+
+    @abc.abstractmethod
+    def iter_records(self, stream):
+        """Yield one decoded JSON value per record."""
+
+    def iter_batches(self, stream):
+        # Consecutive records with the same keys share one executemany
+        columns, batch = None, []
+        for record in self.iter_records(stream):
+            if not isinstance(record, dict):
+                record = {"value": record}
+            record = merge_case_duplicates(record)
+            record_columns = tuple(record)
+
+            if record_columns != columns or len(batch) == INSERT_BATCH_SIZE:
+                if batch:
+                    yield list(columns), batch
+                columns, batch = record_columns, []
+            batch.append([to_sqlite_value(record[column]) for column in columns])
+
+        if batch:
+            yield list(columns), batch
+
+
+class NdjsonLoader(RecordLoader):
+    format_name = FORMAT_NDJSON
+
+    def iter_records(self, stream):
+        for line in io.TextIOWrapper(stream, encoding="utf-8-sig"):
+            if line.strip():
+                yield json.loads(line)
+
+
+class JsonLoader(RecordLoader):
+    """
+    Each object in a top-level array becomes one row, decoded element by element so the
+    whole document is never materialised; the array's other elements are kept together
+    as one row. Any other document is stored as one row.
+    """
+
+    format_name = FORMAT_JSON
+
+    def iter_records(self, stream):
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+        decoder = json.JSONDecoder()
+        buffer = text.read(READ_SIZE).lstrip()
+
+        if not buffer.startswith("["):
+            document = json.loads(buffer + text.read())
+            yield document if isinstance(document, dict) else {"value": document}
+            return
+
+        pos, eof = 1, False
+        # Elements that are not objects, stored together after the array has been read
+        scalar_elements = []
+        while True:
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = text.read(READ_SIZE), 0
+                eof = not buffer
+
+            if pos >= len(buffer):
+                raise ValueError("Unterminated JSON array")
+            if buffer[pos] == "]":
+                break
+
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A value that ends exactly at the buffer edge may be a truncated number
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+
+            if not complete:
+                more = text.read(READ_SIZE)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            pos = end
+            if isinstance(value, dict):
+                yield value
+            else:
+                scalar_elements.append(value)
+
+        if scalar_elements:
+            yield {"value": scalar_elements}
+
+
+class ColumnarLoader(FormatLoader):
+    """Parquet and Arrow IPC objects, read one record batch at a time with pyarrow."""
+
+    format_name = FORMAT_COLUMNAR
+
+    def iter_batches(self, stream):
+        try:
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ValueError("pyarrow is required to ingest Parquet or Arrow objects") from e
+
+        source = io.BytesIO(stream.read())
+        magic = source.getvalue()[:len(ARROW_MAGIC)]
+        if magic.startswith(PARQUET_MAGIC):
+            record_batches = pyarrow.parquet.ParquetFile(source).iter_batches(batch_size=INSERT_BATCH_SIZE)
+        elif magic == ARROW_MAGIC:
+            reader = pyarrow.ipc.open_file(source)
+            record_batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            record_batches = pyarrow.ipc.open_stream(source)
+
+        for record_batch in record_batches:
+            columns = unique_columns(record_batch.schema.names)
+            values = [
+                [to_sqlite_value(value) for value in column.to_pylist()]
+                for column in record_batch.columns
+            ]
+            yield columns, [list(row) for row in zip(*values)]
+
+
+LOADERS = {
+    FORMAT_CSV: CsvLoader(),
+    FORMAT_JSON: JsonLoader(),
+    FORMAT_NDJSON: NdjsonLoader(),
+    FORMAT_COLUMNAR: ColumnarLoader(),
+}
+
+
+def database_key(cursor):
+    # File path of the main database, so the schema cache stays per database
+    for _, name, path in cursor.execute("PRAGMA database_list").fetchall():
+        if name == "main":
+            return path
+    return None
+
+
+@metrics.timed("sqlite_write")
+def ingest_object(cursor, data, content_type=None, object_name=None):
+    """
+    Route one object (bytes, str or a binary file object) to the loader for its format.
+    The caller owns the transaction. Returns the format and the number of rows written.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    stream = io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else io.BufferedReader(data)
+
+    head = stream.peek(SNIFF_SIZE)[:SNIFF_SIZE] if hasattr(stream, "peek") else stream.getvalue()[:SNIFF_SIZE]
+    format_name = detect_format(head, content_type, object_name)
+    rows = LOADERS[format_name].load(cursor, stream)
+    return {"format": format_name, "rows": rows}
@@ -1,5 +1,7 @@
 import sqlite3
+from utilities import metrics
 
+@metrics.timed("storage_info_insert")
 def insert_into_db(storage_info, db_name, table_name="storage_info"):
     conn = sqlite3.connect(db_name)
     cursor = conn.cursor()
@@ -28,4 +30,39 @@ def insert_into_db(storage_info, db_name, table_name="storage_info"):
     ))
     
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
+    metrics.rows_ingested.labels(table_name).inc()
+
+@metrics.timed("storage_info_insert")
+def insert_batch_into_db(storage_info_list, db_name, table_name="storage_info"):
+    # Same as insert_into_db, but the whole batch is written in one transaction
+    conn = sqlite3.connect(db_name)
+    try:
+        with conn:
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                distributedStorageAddress TEXT,
+                minio_access_key TEXT,
+                minio_secret_key TEXT,
+                bucket_name TEXT,
+                object_name TEXT
+            )
+            """)
+
+            conn.executemany(f"""
+            INSERT INTO {table_name} (distributedStorageAddress, minio_access_key, minio_secret_key, bucket_name, object_name)
+            VALUES (?, ?, ?, ?, ?)
+            """, [
+                (
+                    storage_info["distributedStorageAddress"],
+                    storage_info["minio_access_key"],
+                    storage_info["minio_secret_key"],
+                    storage_info["bucket_name"],
+                    storage_info["object_name"]
+                )
+                for storage_info in storage_info_list
+            ])
+    finally:
+        conn.close()
+
+    metrics.rows_ingested.labels(table_name).inc(len(storage_info_list))
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from opentelemetry import context, trace
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = settings.JOB_WORKERS  # jobs run at the same time; later ones wait in the queue
+JOB_HISTORY = settings.JOB_HISTORY  # finished jobs kept for /jobs/{id}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """State and progress of one background job, updated by the function it runs."""
+
+    def __init__(self, kind, key):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.objects_total = None
+        self.objects_done = 0
+        self.bytes_done = 0
+        self.error = None
+        self.result = None
+        self.lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def set_total(self, objects):
+        self.objects_total = objects
+
+    def advance(self, objects=1, bytes=0):
+        with self.lock:
+            self.objects_done += objects
+            self.bytes_done += bytes
+
+    def as_dict(self):
+        with self.lock:
+            objects_done, bytes_done = self.objects_done, self.bytes_done
+        elapsed = None
+        if self.started is not None:
+            elapsed = (self.finished or time.time()) - self.started
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed_seconds": elapsed,
+            "objects_done": objects_done,
+            "objects_total": self.objects_total,
+            "bytes_done": bytes_done,
+            "objects_per_second": objects_done / elapsed if elapsed else None,
+            "bytes_per_second": bytes_done / elapsed if elapsed else None,
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+class JobManager:
+    """
+    Runs long operations off the event loop on a bounded thread pool. Submitting a job
+    whose key matches a queued or running one returns that job instead of starting a
+    duplicate, so concurrent identical requests share one run. The caller's trace
+    context is carried into the job, so its spans join the request's trace.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, history=JOB_HISTORY):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.history = history
+        self.jobs = OrderedDict()
+        self.active_by_key = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind, function, key=None):
+        """
+        Queue function(job) and return (job, coalesced). coalesced is True when an
+        active job with the same key was returned instead.
+        """
+        key = kind if key is None else key
+        with self.lock:
+            job = self.active_by_key.get(key)
+            if job is not None:
+                return job, True
+
+            job = Job(kind, key)
+            self.jobs[job.id] = job
+            self.active_by_key[key] = job
+            self._trim()
+
+        self.executor.submit(self._run, job, function, context.get_current())
+        return job, False
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def shutdown(self):
+        """Drop queued jobs and wait for the running ones to finish."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, job, function, parent_context):
+        token = context.attach(parent_context)
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            with trace.get_tracer(__name__).start_as_current_span(f"job-{job.kind}") as span:
+                span.set_attribute("job.id", job.id)
+                job.result = function(job)
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            context.detach(token)
+            with self.lock:
+                if self.active_by_key.get(job.key) is job:
+                    del self.active_by_key[job.key]
+
+    def _trim(self):
+        # Caller holds self.lock; only finished jobs are forgotten
+        excess = len(self.jobs) - self.history
+        for job_id in [job_id for job_id, job in self.jobs.items() if not job.active][:max(excess, 0)]:
+            del self.jobs[job_id]
+
+
+job_manager = JobManager()
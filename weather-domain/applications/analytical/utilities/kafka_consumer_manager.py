@@ -0,0 +1,191 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_HEADERS = {'Content-Type': 'application/vnd.kafka.v2+json'}
+RECORDS_HEADERS = {'Accept': 'application/vnd.kafka.binary.v2+json'}
+HEALTH_CHECK_INTERVAL = settings.KAFKA_HEALTH_CHECK_INTERVAL  # seconds between background health checks
+HTTP_POOL_SIZE = settings.KAFKA_HTTP_POOL_SIZE  # keep-alive connections per consumer session
+
+# Long-poll parameters of GET /records; unset ones keep the REST Proxy defaults
+POLL_PARAMS = {
+    name: value
+    for name, value in (("timeout", settings.KAFKA_POLL_TIMEOUT_MS), ("max_bytes", settings.KAFKA_POLL_MAX_BYTES))
+    if value
+}
+
+
+def adjust_base_uri(base_uri):
+    # If 'localhost' isn't in the string, replace 'http://' with 'http://localhost/'
+    if 'localhost' not in base_uri:
+        return base_uri.replace('http://', 'http://localhost/')
+    return base_uri
+
+
+def partition_offsets(records, pick):
+    """Reduce a batch of records to one offset per (topic, partition) using pick (min or max)."""
+    offsets = {}
+    for record in records:
+        topic_partition = (record['topic'], record['partition'])
+        offsets[topic_partition] = pick(offsets.get(topic_partition, record['offset']), record['offset'])
+    return [{"topic": topic, "partition": partition, "offset": offset} for (topic, partition), offset in offsets.items()]
+
+
+class ManagedConsumer:
+    def __init__(self, group, name, topics, config):
+        self.group = group
+        self.name = name
+        self.topics = topics
+        self.config = config
+        self.base_uri = None
+        self.healthy = False
+        self.lock = threading.Lock()
+
+        # One pooled session per consumer so polls reuse their connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+class KafkaConsumerManager:
+    """
+    Owns the Kafka REST Proxy consumers of a service. Consumers are created and
+    subscribed concurrently, health-checked by a background thread, and only the
+    consumer that fails is recreated.
+    """
+
+    def __init__(self, rest_proxy_url, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.rest_proxy_url = rest_proxy_url.rstrip('/')
+        self.health_check_interval = health_check_interval
+        self.consumers = {}
+        self._stop_event = threading.Event()
+        self._health_thread = None
+
+    def register(self, key, group, name, topics, config=None):
+        consumer_config = {
+            "format": "binary",
+            "auto.offset.reset": "earliest",
+            "auto.commit.enable": "false"
+        }
+        consumer_config.update(config or {})
+        self.consumers[key] = ManagedConsumer(group, name, topics, consumer_config)
+
+    def start(self):
+        """Create and subscribe every registered consumer in parallel, then start health checks."""
+        with ThreadPoolExecutor(max_workers=max(len(self.consumers), 1)) as executor:
+            futures = {executor.submit(self.recreate, key): key for key in self.consumers}
+            for future, key in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    # The health checker keeps retrying consumers that failed at startup
+                    logger.error(f"Failed to start Kafka consumer '{key}': {e}")
+
+        if self._health_thread is None:
+            self._stop_event.clear()
+            self._health_thread = threading.Thread(target=self._health_loop, name="kafka-consumer-health", daemon=True)
+            self._health_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=5)
+            self._health_thread = None
+
+        for key, consumer in self.consumers.items():
+            if consumer.base_uri:
+                try:
+                    response = consumer.session.delete(consumer.base_uri, headers=CONSUMER_HEADERS)
+                    logger.info(f"Kafka consumer '{key}' deleted with status code {response.status_code}")
+                except requests.RequestException as e:
+                    logger.error(f"Failed to delete Kafka consumer '{key}': {e}")
+            consumer.healthy = False
+            consumer.session.close()
+
+    def recreate(self, key):
+        consumer = self.consumers[key]
+        with consumer.lock:
+            consumer.healthy = False
+            url = f"{self.rest_proxy_url}/consumers/{consumer.group}"
+            data = dict(consumer.config, name=consumer.name)
+
+            response = consumer.session.post(url, headers=CONSUMER_HEADERS, data=json.dumps(data))
+            if response.status_code == 200:
+                base_uri = response.json()['base_uri']
+            elif response.status_code == 409:  # Already exists
+                base_uri = f"{url}/instances/{consumer.name}"
+            else:
+                raise Exception(f"Failed to create Kafka consumer {consumer.name}. Status Code: {response.status_code}. Error: {response.text}")
+
+            consumer.base_uri = adjust_base_uri(base_uri)
+
+            response = consumer.session.post(f"{consumer.base_uri}/subscription", headers=CONSUMER_HEADERS, data=json.dumps({"topics": consumer.topics}))
+            if response.status_code != 204:
+                raise Exception(f"Failed to subscribe consumer {consumer.name} to topics {', '.join(consumer.topics)}: {response.text}")
+
+            consumer.healthy = True
+            logger.info(f"Kafka consumer '{key}' subscribed to {', '.join(consumer.topics)}")
+
+    def base_url(self, key):
+        """Base URI of a healthy consumer, or None while it is (re)initialising."""
+        consumer = self.consumers.get(key)
+        if consumer is None or not consumer.healthy:
+            return None
+        return consumer.base_uri
+
+    def session(self, key):
+        return self.consumers[key].session
+
+    def get_records(self, key, headers=None, params=None):
+        consumer = self.consumers[key]
+        response = consumer.session.get(f"{consumer.base_uri}/records", headers=headers or RECORDS_HEADERS, params=POLL_PARAMS if params is None else params)
+        if response.status_code == 404:
+            # The instance expired on the proxy; let the health checker recreate it
+            self.mark_failed(key)
+        return response
+
+    def commit_offsets(self, key, records):
+        """Commit the last consumed offset of every partition in a processed batch."""
+        consumer = self.consumers[key]
+        offsets = partition_offsets(records, max)
+        response = consumer.session.post(f"{consumer.base_uri}/offsets", headers=CONSUMER_HEADERS, data=json.dumps({"offsets": offsets}))
+        if response.status_code not in (200, 204):
+            raise Exception(f"Failed to commit offsets for consumer {consumer.name}: {response.text}")
+
+    def seek_to_records(self, key, records):
+        """Rewind each partition to the first record of a batch so it is delivered again."""
+        consumer = self.consumers[key]
+        offsets = partition_offsets(records, min)
+        response = consumer.session.post(f"{consumer.base_uri}/positions", headers=CONSUMER_HEADERS, data=json.dumps({"offsets": offsets}))
+        if response.status_code not in (200, 204):
+            raise Exception(f"Failed to seek consumer {consumer.name}: {response.text}")
+
+    def mark_failed(self, key):
+        self.consumers[key].healthy = False
+
+    def check_health(self):
+        for key, consumer in self.consumers.items():
+            if consumer.healthy:
+                try:
+                    response = consumer.session.get(f"{consumer.base_uri}/subscription", headers=CONSUMER_HEADERS)
+                    if response.status_code == 200:
+                        continue
+                    logger.warning(f"Kafka consumer '{key}' failed its health check: {response.status_code}")
+                except requests.RequestException as e:
+                    logger.warning(f"Kafka consumer '{key}' failed its health check: {e}")
+
+            try:
+                self.recreate(key)
+            except Exception as e:
+                logger.error(f"Failed to recreate Kafka consumer '{key}': {e}")
+
+    def _health_loop(self):
+        while not self._stop_event.wait(self.health_check_interval):
+            self.check_health()
@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+import time
+import requests
+from utilities import metrics
+from utilities.settings import settings
+
+logger = logging.getLogger(__name__)
+
+POLL_IDLE_SLEEP = settings.KAFKA_POLL_IDLE_SLEEP  # seconds to wait after an empty poll or a failed batch
+MAX_BATCH_ATTEMPTS = settings.KAFKA_MAX_BATCH_ATTEMPTS  # failed deliveries of a record before it is processed on its own
+DEAD_LETTER_SUFFIX = "-error"
+DEAD_LETTER_HEADERS = {"Content-Type": "application/vnd.kafka.json.v2+json"}
+
+
+class KafkaConsumerWorker:
+    """
+    Polls one managed consumer continuously in a background thread and hands every
+    batch to process_batch. Offsets are committed to the REST Proxy only after
+    process_batch returns, i.e. after its SQLite transaction has committed; a batch
+    that raises is rewound and delivered again (at-least-once).
+
+    process_batch may return the subset of records whose effects are durable (for
+    example when part of the batch is still buffered); returning None commits all.
+
+    Once a record has been delivered in max_attempts failed batches, its batch is
+    processed one record at a time, so a record that cannot be processed does not
+    block its partition. Such a record is logged, posted to its topic's -error topic
+    unless dead_letter is False, and committed past.
+    """
+
+    def __init__(self, consumer_manager, key, process_batch, idle_sleep=POLL_IDLE_SLEEP, max_attempts=MAX_BATCH_ATTEMPTS, dead_letter=True):
+        self.consumer_manager = consumer_manager
+        self.key = key
+        self.process_batch = process_batch
+        self.idle_sleep = idle_sleep
+        self.max_attempts = max_attempts
+        self.dead_letter = dead_letter
+        self.batches_processed = 0
+        self.records_processed = 0
+        self.records_dead_lettered = 0
+        self.last_error = None
+        # (topic, partition, offset) -> failed batches the record was part of
+        self._failed_attempts = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"kafka-worker-{self.key}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=10):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def status(self):
+        return {
+            "consumer": self.key,
+            "running": self.is_running(),
+            "batches_processed": self.batches_processed,
+            "records_processed": self.records_processed,
+            "records_dead_lettered": self.records_dead_lettered,
+            "last_error": self.last_error
+        }
+
+    def _run(self):
+        poll_sizes = metrics.kafka_poll_records.labels(self.key)
+
+        while not self._stop_event.is_set():
+            # The consumer manager recreates failed consumers in the background
+            if self.consumer_manager.base_url(self.key) is None:
+                self._stop_event.wait(self.idle_sleep)
+                continue
+
+            try:
+                response = self.consumer_manager.get_records(self.key)
+                if response.status_code != 200:
+                    raise Exception(f"GET /records/ did not succeed: {response.text}")
+                records = response.json()
+                poll_sizes.observe(len(records))
+            except Exception as e:
+                logger.error(f"Polling consumer '{self.key}' failed: {e}")
+                self.last_error = str(e)
+                self._stop_event.wait(self.idle_sleep)
+                continue
+
+            if not records:  # No new records to process
+                self._stop_event.wait(self.idle_sleep)
+                continue
+
+            try:
+                if self._attempts(records) >= self.max_attempts:
+                    durable_records = self._process_records_one_by_one(records)
+                else:
+                    durable_records = self.process_batch(records)
+            except Exception as e:
+                logger.error(f"Processing a batch of {len(records)} records from '{self.key}' failed: {e}")
+                self.last_error = str(e)
+                for record in records:
+                    record_id = self._record_id(record)
+                    self._failed_attempts[record_id] = self._failed_attempts.get(record_id, 0) + 1
+                try:
+                    self.consumer_manager.seek_to_records(self.key, records)
+                except Exception as seek_error:
+                    logger.error(f"Rewinding consumer '{self.key}' failed: {seek_error}")
+                self._stop_event.wait(self.idle_sleep)
+                continue
+
+            self._failed_attempts.clear()
+            if durable_records is None:
+                durable_records = records
+
+            try:
+                if durable_records:
+                    self.consumer_manager.commit_offsets(self.key, durable_records)
+            except Exception as e:
+                logger.error(f"Committing offsets for '{self.key}' failed: {e}")
+                self.last_error = str(e)
+
+            self.batches_processed += 1
+            self.records_processed += len(records)
+
+    @staticmethod
+    def _record_id(record):
+        return record['topic'], record['partition'], record['offset']
+
+    def _attempts(self, records):
+        return max((self._failed_attempts.get(self._record_id(record), 0) for record in records), default=0)
+
+    def _process_records_one_by_one(self, records):
+        """
+        Process a batch that keeps failing record by record, dead-lettering the records
+        that fail on their own. Returns the records up to the first one that is not yet
+        durable, so no offset is committed past unfinished work.
+        """
+        settled = []
+        for index, record in enumerate(records):
+            try:
+                durable = self.process_batch([record])
+                done = durable is None or len(durable) > 0
+            except Exception as e:
+                self.last_error = str(e)
+                self._dead_letter_record(record, e)
+                done = True
+            if done and len(settled) == index:
+                settled.append(record)
+        return settled
+
+    def _dead_letter_record(self, record, error):
+        """Give up on a record. Raises when it cannot be posted, so the batch is delivered again."""
+        topic, partition, offset = self._record_id(record)
+        attempts = self._failed_attempts.get((topic, partition, offset), 0) + 1
+        logger.error(f"Record {topic}/{partition}/{offset} failed {attempts} times in '{self.key}', skipping it: {error}")
+        if self.dead_letter:
+            message = {
+                "status": "processing_failed",
+                "error": str(error),
+                "consumer": self.key,
+                "topic": topic,
+                "partition": partition,
+                "offset": offset,
+                "key": record.get('key'),
+                "value": record.get('value'),  # base64, as delivered by the REST Proxy
+                "attempts": attempts,
+                "timestamp": time.time()
+            }
+            try:
+                response = requests.post(
+                    f"{self.consumer_manager.rest_proxy_url}/topics/{topic}{DEAD_LETTER_SUFFIX}",
+                    headers=DEAD_LETTER_HEADERS,
+                    data=json.dumps({"records": [{"value": message}]}),
+                    timeout=30
+                )
+            except requests.RequestException as e:
+                raise Exception(f"Posting record {topic}/{partition}/{offset} to {topic}{DEAD_LETTER_SUFFIX} failed: {e}") from e
+            if response.status_code != 200:
+                raise Exception(f"Posting record {topic}/{partition}/{offset} to {topic}{DEAD_LETTER_SUFFIX} failed: {response.text}")
+        metrics.kafka_records_dead_lettered.labels(self.key).inc()
+        self.records_dead_lettered += 1
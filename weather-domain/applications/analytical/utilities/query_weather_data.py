@@ -0,0 +1,85 @@
+import os
+import sqlite3
+from utilities import rollups, sqlite_query
+from utilities.settings import settings
+
+TABLE_NAME = rollups.SOURCE_TABLE
+TIME_COLUMN = rollups.TIME_COLUMN
+PAGE_SIZE = settings.QUERY_PAGE_SIZE
+MAX_PAGE_SIZE = settings.QUERY_MAX_PAGE_SIZE
+STORED_TIME_FORMAT = "%Y%m%d"  # The source's dates, which sort lexically in time order
+
+
+def ensure_index(cursor):
+    """
+    Index weather_data by time. Range filters, the (time, rowid) order and the page
+    cursor are all answered from the index, so a page reads only the rows it returns.
+    """
+    columns = [column[1] for column in cursor.execute(f"PRAGMA table_info({TABLE_NAME})")]
+    if TIME_COLUMN in columns:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE_NAME}_time ON {TABLE_NAME} ("{TIME_COLUMN}")')
+
+
+def ensure_index_exists(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_index(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def stored_time(value, name):
+    """A date or timestamp in any format rollups accept, as the stored YYYYMMDD text."""
+    parsed = rollups.parse_time(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be a date such as 20200201 or 2020-02-01, not '{value}'")
+    return parsed.strftime(STORED_TIME_FORMAT)
+
+
+def query_weather_data(db_path, start=None, end=None, columns=None, limit=PAGE_SIZE, cursor=None):
+    """
+    One page of weather_data rows in time order, from the day of start through the day of
+    end (both inclusive, as YYYYMMDD or ISO 8601) and with columns naming the columns to
+    return (all by default). Returns None before any weather data has been stored; raises
+    ValueError for an invalid request.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if start is not None:
+        start = stored_time(start, "start")
+    if end is not None:
+        end = stored_time(end, "end")
+    if not os.path.exists(db_path):
+        return None
+    stored = sqlite_query.table_columns(db_path, TABLE_NAME)
+    if not stored:
+        return None
+    if TIME_COLUMN not in stored:
+        raise ValueError(f"{TABLE_NAME} has no {TIME_COLUMN} column to order by")
+
+    selected = columns or stored
+    unknown = set(selected) - set(stored)
+    if unknown:
+        raise ValueError(f"Unknown columns {', '.join(sorted(unknown))}; {TABLE_NAME} has {', '.join(stored)}")
+
+    # Conditions are added in a fixed order, so each combination of filters has one
+    # statement text and is prepared only once per connection
+    conditions, parameters = [], []
+    if start is not None:
+        conditions.append(f'"{TIME_COLUMN}" >= ?')
+        parameters.append(start)
+    if end is not None:
+        conditions.append(f'"{TIME_COLUMN}" <= ?')
+        parameters.append(end)
+    if cursor is not None:
+        conditions.append(f'("{TIME_COLUMN}", rowid) > (?, ?)')
+        parameters.extend(sqlite_query.decode_cursor(cursor, 2))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    projection = ", ".join(f'"{column}"' for column in selected)
+    sql = f'SELECT "{TIME_COLUMN}", rowid, {projection} FROM {TABLE_NAME} {where} ORDER BY "{TIME_COLUMN}", rowid LIMIT ?'
+    rows = sqlite_query.cached_query(db_path, TABLE_NAME, sql, parameters + [limit])
+
+    next_cursor = sqlite_query.encode_cursor(list(rows[-1][:2])) if len(rows) == limit else None
+    return {"columns": selected, "rows": [row[2:] for row in rows], "next_cursor": next_cursor}
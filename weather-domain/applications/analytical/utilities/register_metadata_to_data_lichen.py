@@ -1,12 +1,10 @@
-import requests
 from utilities import fetch_data_from_minio_and_create_metadata
+from utilities.data_lichen_client import registrar
 
-def register_metadata_to_data_lichen():
-    metadata = fetch_data_from_minio_and_create_metadata.fetch_data_from_minio_and_create_metadata()
-    
-    # Send metadata to Data Lichen
-    response = requests.post('http://localhost:3001/register', json=metadata)
-    if response.status_code == 200:
-        print(response.json()['message'])
-    else:
-        print("Failed to register metadata with Data Lichen.")
\ No newline at end of file
+def register_metadata_to_data_lichen(job=None):
+    metadata = fetch_data_from_minio_and_create_metadata.fetch_data_from_minio_and_create_metadata(job)
+    if metadata is None:
+        return
+
+    # Queued and sent to Data Lichen with other entries as one /register-batch request
+    registrar.register(metadata)
@@ -0,0 +1,211 @@
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from utilities import metrics
+from utilities.settings import settings
+
+SOURCE_TABLE = "weather_data"
+TIME_COLUMN = settings.ROLLUP_TIME_COLUMN
+
+# Bucket keys are prefixes of the hourly key "YYYY-MM-DD HH:00", given here by length.
+# They sort lexically in time order, so ranges are plain string comparisons
+HOUR_FORMAT = "%Y-%m-%d %H:00"
+GRANULARITIES = {
+    "hourly": 16,
+    "daily": 10,
+    "monthly": 7,
+}
+
+# The source marks trace amounts of precipitation with 'T'
+TRACE_VALUES = {"T": 0.0}
+
+
+def rollup_table(granularity):
+    return f"{SOURCE_TABLE}_rollup_{granularity}"
+
+
+@lru_cache(maxsize=65536)
+def parse_time(value):
+    """Parse the source's YYYYMMDD dates as well as ISO 8601 dates and timestamps."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if len(text) == 8 and text.isdigit():
+        text = f"{text[:4]}-{text[4:6]}-{text[6:]}"
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def hour_of(value):
+    parsed = parse_time(value)
+    return parsed.strftime(HOUR_FORMAT) if parsed else None
+
+
+def bucket_of(value, granularity):
+    hour = hour_of(value)
+    return hour[:GRANULARITIES[granularity]] if hour else None
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return TRACE_VALUES.get(value)
+
+
+def register_functions(connection):
+    connection.create_function("rollup_hour", 1, hour_of, deterministic=True)
+    connection.create_function("rollup_number", 1, to_number, deterministic=True)
+
+
+AGGREGATES = ("count", "sum", "min", "max")
+
+
+def ensure_tables_exist(cursor, columns=()):
+    """
+    Create the rollup tables, with count, sum, min and max columns for each of columns;
+    returns True when the tables did not exist yet.
+    """
+    created = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (rollup_table("daily"),)).fetchone() is None
+    for granularity in GRANULARITIES:
+        # One row per bucket; a measurement's mean is its sum / count
+        table = rollup_table(granularity)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (bucket TEXT PRIMARY KEY) WITHOUT ROWID")
+        existing = {column[1] for column in cursor.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            for aggregate in AGGREGATES:
+                if f"{column}_{aggregate}" not in existing:
+                    default = " NOT NULL DEFAULT 0" if aggregate in ("count", "sum") else ""
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN "{column}_{aggregate}" {"INTEGER" if aggregate == "count" else "REAL"}{default}')
+    return created
+
+
+def rollup_metrics(cursor):
+    """The measurements the rollup tables hold, in column order."""
+    return [column[1][:-len("_count")] for column in cursor.execute(f"PRAGMA table_info({rollup_table('daily')})") if column[1].endswith("_count")]
+
+
+def merge_updates(columns):
+    """SET clause of an upsert that folds excluded's aggregates into a bucket's row."""
+    # MIN and MAX of several arguments are NULL if any is, hence the COALESCE
+    return ", ".join(
+        f'"{column}_count" = "{column}_count" + excluded."{column}_count", '
+        f'"{column}_sum" = "{column}_sum" + excluded."{column}_sum", '
+        f'"{column}_min" = COALESCE(MIN("{column}_min", excluded."{column}_min"), "{column}_min", excluded."{column}_min"), '
+        f'"{column}_max" = COALESCE(MAX("{column}_max", excluded."{column}_max"), "{column}_max", excluded."{column}_max")'
+        for column in columns
+    )
+
+
+def merge_buckets(cursor, granularity, columns, rows):
+    """
+    Fold aggregates computed outside SQLite into one rollup table. Each row is a bucket
+    key followed by count, sum, min and max for each of columns, in that order.
+    """
+    ensure_tables_exist(cursor, columns)
+    targets = ", ".join(f'"{column}_{aggregate}"' for column in columns for aggregate in AGGREGATES)
+    placeholders = ", ".join(["?"] * (1 + len(columns) * len(AGGREGATES)))
+    cursor.executemany(
+        f"INSERT INTO {rollup_table(granularity)} (bucket, {targets}) VALUES ({placeholders}) "
+        f"ON CONFLICT (bucket) DO UPDATE SET {merge_updates(columns)}",
+        rows
+    )
+
+
+def last_rowid(cursor):
+    """The rowid after which the next batch's rows start; pass it to update_rollups."""
+    return cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {SOURCE_TABLE}").fetchone()[0]
+
+
+@metrics.timed("rollup_update")
+def update_rollups(cursor, after_rowid):
+    """
+    Fold the rows of SOURCE_TABLE with a rowid above after_rowid into every rollup table.
+    Run it in the transaction that inserted those rows, so rollups and rows commit together.
+    """
+    columns = [column[1] for column in cursor.execute(f"PRAGMA table_info({SOURCE_TABLE})")]
+    if TIME_COLUMN not in columns:
+        return
+    columns.remove(TIME_COLUMN)
+    register_functions(cursor.connection)
+    ensure_tables_exist(cursor, columns)
+
+    # The batch is parsed once into a temporary table of hour keys and numbers; every
+    # rollup is then aggregated from it in SQL
+    values = "".join(f', rollup_number("{column}") AS "{column}"' for column in columns)
+    cursor.execute("DROP TABLE IF EXISTS temp.rollup_batch")
+    cursor.execute(
+        f'CREATE TEMP TABLE rollup_batch AS SELECT rollup_hour("{TIME_COLUMN}") AS hour{values} FROM {SOURCE_TABLE} WHERE rowid > ?',
+        (after_rowid,)
+    )
+
+    targets = ", ".join(f'"{column}_{aggregate}"' for column in columns for aggregate in AGGREGATES)
+    aggregates = ", ".join(f'COUNT("{column}"), TOTAL("{column}"), MIN("{column}"), MAX("{column}")' for column in columns)
+    updates = merge_updates(columns)
+    try:
+        for granularity, key_length in GRANULARITIES.items():
+            # Rows whose time does not parse are left out, as are values that are not numbers
+            cursor.execute(f'''
+                INSERT INTO {rollup_table(granularity)} (bucket, {targets})
+                SELECT substr(hour, 1, {key_length}), {aggregates} FROM rollup_batch WHERE hour IS NOT NULL GROUP BY 1
+                ON CONFLICT (bucket) DO UPDATE SET {updates}
+            ''')
+    finally:
+        cursor.execute("DROP TABLE temp.rollup_batch")
+
+
+def ensure_rollups(db_path):
+    """Create the rollup tables, filling them from every stored row the first time."""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        created = ensure_tables_exist(cursor)
+        has_source = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SOURCE_TABLE,)).fetchone()
+        if created and has_source:
+            update_rollups(cursor, 0)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def query_rollups(db_path, granularity, metrics=None, start=None, end=None):
+    """
+    Aggregates per bucket from one rollup table, for the buckets containing start through
+    end (dates or timestamps in any accepted format) and the named metrics, or all of them.
+    Raises ValueError for a metric the rollups do not hold.
+    """
+    conditions, parameters = [], []
+    if start is not None:
+        conditions.append("bucket >= ?")
+        parameters.append(bucket_of(start, granularity))
+    if end is not None:
+        conditions.append("bucket <= ?")
+        parameters.append(bucket_of(end, granularity))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = sqlite3.connect(db_path)
+    try:
+        known = rollup_metrics(conn.cursor())
+        unknown = set(metrics or ()) - set(known)
+        if unknown:
+            raise ValueError(f"Unknown metrics {', '.join(sorted(unknown))}; the rollups hold {', '.join(known)}")
+        selected = list(metrics) if metrics else known
+        if not selected:
+            return []
+
+        columns = ", ".join(f'"{metric}_{aggregate}"' for metric in selected for aggregate in AGGREGATES)
+        rows = conn.execute(f"SELECT bucket, {columns} FROM {rollup_table(granularity)} {where} ORDER BY bucket", parameters).fetchall()
+    finally:
+        conn.close()
+
+    buckets = []
+    for row in rows:
+        values = {}
+        for index, metric in enumerate(selected):
+            count, total, minimum, maximum = row[1 + 4 * index:5 + 4 * index]
+            if count:
+                values[metric] = {"count": count, "sum": total, "min": minimum, "max": maximum, "mean": total / count}
+        buckets.append({"bucket": row[0], "metrics": values})
+    return buckets
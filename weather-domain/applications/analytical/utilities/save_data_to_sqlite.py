@@ -1,10 +1,12 @@
 import sqlite3
 import csv
 from io import StringIO
+from utilities import content_index, metrics, query_weather_data, rollups, sqlite_query
+from utilities.settings import settings
 
-CHUNK_SIZE = 500  # For example, save 1000 rows at a time
+CHUNK_SIZE = settings.SQLITE_BATCH_SIZE  # Rows per executemany
 
-def save_data_to_sqlite(data_str, db_path):
+def insert_csv_data(cursor, data_str):
     # Convert string data into a file-like object for csv reader
     csv_file = StringIO(data_str)
     reader = csv.reader(csv_file)
@@ -12,35 +14,53 @@ def save_data_to_sqlite(data_str, db_path):
     # Extract headers (column names) from the first row
     headers = next(reader)
 
-    # Connect to SQLite database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
     # Create table if it doesn't exist
     columns = ', '.join([f'"{col}" TEXT' for col in headers])
     table_name = "weather_data"
     sql_create_table_command = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns})"
     cursor.execute(sql_create_table_command)
+    query_weather_data.ensure_index(cursor)
+    rollup_after = rollups.last_rowid(cursor)
+
+    placeholders = ', '.join(['?'] * len(headers))
+    sql_insert_command = f"INSERT INTO {table_name} VALUES ({placeholders})"
 
     # Create a list to store rows in a chunk
     chunk_data = []
+    row_count = 0
 
     for row in reader:
         chunk_data.append(row)
         
         # If the chunk size is reached, save the chunk to the database
         if len(chunk_data) == CHUNK_SIZE:
-            placeholders = ', '.join(['?'] * len(headers))
-            sql_insert_command = f"INSERT INTO {table_name} VALUES ({placeholders})"
             cursor.executemany(sql_insert_command, chunk_data)
+            row_count += len(chunk_data)
             chunk_data = []
 
     # Save any remaining rows that didn't form a complete chunk
     if chunk_data:
-        placeholders = ', '.join(['?'] * len(headers))
-        sql_insert_command = f"INSERT INTO {table_name} VALUES ({placeholders})"
         cursor.executemany(sql_insert_command, chunk_data)
+        row_count += len(chunk_data)
+
+    # The hourly, daily and monthly rollups take in the new rows in the same transaction
+    rollups.update_rollups(cursor, rollup_after)
+
+    metrics.rows_ingested.labels(table_name).inc(row_count)
+
+@metrics.timed("sqlite_write")
+def save_data_to_sqlite(data_str, db_path, source=None):
+    # source (data_hash, etag, bucket_name, object_name, size) records the object in the
+    # content index in the same transaction as its rows
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        insert_csv_data(cursor, data_str)
+        if source is not None:
+            content_index.remember(cursor, **source)
 
-    # Commit the changes and close the connection
-    conn.commit()
-    conn.close()
+        # Commit the changes and close the connection
+        conn.commit()
+        sqlite_query.invalidate("weather_data")
+    finally:
+        conn.close()
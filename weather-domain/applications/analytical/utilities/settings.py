@@ -0,0 +1,73 @@
+from utilities.settings_loader import Setting, Settings
+
+
+class ServiceSettings(Settings):
+    """Knobs read by the weather analytical service, loaded as described in utilities/settings_loader.py."""
+
+    # Endpoints and credentials
+    SERVICE_ADDRESS = Setting("")  # Address the service advertises; empty keeps the service's own default
+    KAFKA_REST_PROXY_URL = Setting("http://localhost/kafka-rest-proxy")
+    MINIO_ENDPOINT = Setting("localhost:9001")
+    MINIO_ACCESS_KEY = Setting("minioadmin", secret=True)
+    MINIO_SECRET_KEY = Setting("minioadmin", secret=True)
+    MINIO_SECURE = Setting(False, bool)
+    DATA_LICHEN_URL = Setting("http://localhost:3001")
+
+    # Data Lichen metadata registration
+    DATA_LICHEN_BATCH_SIZE = Setting(100, int, minimum=1)  # Entries per /register-batch request
+    DATA_LICHEN_FLUSH_INTERVAL = Setting(1.0, float, minimum=0.01)  # Seconds an entry may wait for a fuller batch
+    DATA_LICHEN_MAX_BUFFERED = Setting(10000, int, minimum=1)  # Entries kept while Data Lichen is unreachable
+    DATA_LICHEN_RETRIES = Setting(4, int, minimum=0)
+    DATA_LICHEN_RETRY_BACKOFF = Setting(0.5, float, minimum=0)  # Seconds before the first retry, doubled for each next one
+
+    # Kafka REST Proxy consumers and producers
+    KAFKA_POLL_IDLE_SLEEP = Setting(5.0, float, minimum=0)  # Seconds a worker waits after an empty poll or a failed batch
+    KAFKA_MAX_BATCH_ATTEMPTS = Setting(3, int, minimum=1)  # Failed batches a record may be part of before it is dead-lettered
+    KAFKA_POLL_TIMEOUT_MS = Setting(0, int, minimum=0)  # timeout of GET /records; 0 leaves the proxy default
+    KAFKA_POLL_MAX_BYTES = Setting(0, int, minimum=0)  # max_bytes of GET /records; 0 leaves the proxy default
+    KAFKA_HTTP_POOL_SIZE = Setting(4, int, minimum=1)  # Keep-alive connections per consumer session
+    KAFKA_HEALTH_CHECK_INTERVAL = Setting(30.0, float, minimum=1)
+
+    # MinIO transfers
+    MINIO_FETCH_SIZE = Setting(32 * 1024, int, minimum=1024)  # Read size when streaming an object
+
+    # Ingest
+    SQLITE_BATCH_SIZE = Setting(500, int, minimum=1)  # Rows per executemany
+    PANDAS_CHUNK_ROWS = Setting(50000, int, minimum=1)
+    INGEST_ENGINE = Setting("csv", choices=("csv", "pandas"))
+    PIPELINE_FETCH_POOL_SIZE = Setting(8, int, minimum=1)
+    PIPELINE_QUEUE_SIZE = Setting(32, int, minimum=1)  # Objects waiting between fetch and write
+    PIPELINE_WRITE_BATCH_SIZE = Setting(50, int, minimum=1)  # Objects per SQLite transaction
+    QUERY_PAGE_SIZE = Setting(100, int, minimum=1)  # Rows per page of the query endpoints by default
+    QUERY_MAX_PAGE_SIZE = Setting(1000, int, minimum=1)
+    QUERY_CACHE_BYTES = Setting(64 * 1024 * 1024, int, minimum=0)  # Query results kept in memory; 0 disables the cache
+    ROLLUP_TIME_COLUMN = Setting("date")  # weather_data column the rollups bucket by
+    CONTENT_DEDUP = Setting(True, bool)  # Skip objects whose ETag or SHA-256 is already ingested
+    JOB_WORKERS = Setting(2, int, minimum=1)  # Background jobs, such as registrations, run at the same time
+    JOB_HISTORY = Setting(100, int, minimum=1)  # Finished jobs kept for /jobs/{id}
+
+    # Retry queue of failed uploads and publishes
+    RETRY_QUEUE_DB = Setting("retry-queue.db")
+    RETRY_BASE_DELAY = Setting(1.0, float, minimum=0)  # Seconds before the first retry, doubled for each next one
+    RETRY_MAX_DELAY = Setting(300.0, float, minimum=0)
+    RETRY_MAX_ATTEMPTS = Setting(8, int, minimum=1)  # Attempts before an operation goes to its error topic
+    RETRY_MAX_REPLAYS = Setting(3, int, minimum=0)  # Times an operation may be replayed from its error topic
+    RETRY_POLL_INTERVAL = Setting(1.0, float, minimum=0.01)
+    RETRY_BATCH_SIZE = Setting(50, int, minimum=1)  # Due operations retried per drain pass
+
+    # Telemetry
+    TELEMETRY_EXPORT_DELAY_MS = Setting(5000, int, minimum=0)  # Linger before a span batch is exported
+    TELEMETRY_EXPORT_BATCH_SIZE = Setting(512, int, minimum=1)
+    TELEMETRY_QUEUE_SIZE = Setting(2048, int, minimum=1)  # Spans buffered before new ones are dropped
+    TELEMETRY_SAMPLE_RATE = Setting(1.0, float, minimum=0, maximum=1)
+    TELEMETRY_SLOW_SPAN_MS = Setting(1000.0, float, minimum=0)
+    TELEMETRY_SAMPLE_RATES = Setting("")  # name-pattern=rate pairs, e.g. "GET *=1,process_*=0.05"
+
+    def validate(self):
+        # The span processor rejects batches larger than its queue
+        if self.TELEMETRY_EXPORT_BATCH_SIZE > self.TELEMETRY_QUEUE_SIZE:
+            return ["TELEMETRY_EXPORT_BATCH_SIZE: must not exceed TELEMETRY_QUEUE_SIZE"]
+        return []
+
+
+settings = ServiceSettings()
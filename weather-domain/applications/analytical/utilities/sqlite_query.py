@@ -0,0 +1,128 @@
+import base64
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from utilities import metrics
+from utilities.settings import settings
+
+CACHE_BYTES = settings.QUERY_CACHE_BYTES  # Result bytes kept across all tables; 0 disables the cache
+STATEMENT_CACHE_SIZE = 128  # Prepared statements kept per connection
+
+_local = threading.local()
+
+
+class QueryCache:
+    """
+    LRU cache of query results, bounded by their approximate size in bytes. Entries are
+    grouped by table, and invalidate(table) drops that table's entries after an ingest.
+    A result read while its table was being invalidated is not stored, so a query that
+    raced an ingest cannot cache rows from before it.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (table, key) -> (rows, size)
+        self.generations = {}
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def generation(self, table):
+        with self.lock:
+            return self.generations.get(table, 0)
+
+    def get(self, table, key):
+        with self.lock:
+            entry = self.entries.get((table, key))
+            if entry is None:
+                return None
+            self.entries.move_to_end((table, key))
+            return entry[0]
+
+    def put(self, table, key, rows, generation):
+        size = result_size(rows)
+        with self.lock:
+            if size > self.max_bytes or self.generations.get(table, 0) != generation:
+                return
+            previous = self.entries.pop((table, key), None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[(table, key)] = (rows, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def invalidate(self, table):
+        with self.lock:
+            self.generations[table] = self.generations.get(table, 0) + 1
+            for entry_key in [entry_key for entry_key in self.entries if entry_key[0] == table]:
+                self.size -= self.entries.pop(entry_key)[1]
+
+
+def result_size(rows):
+    # Values plus a rough per-value overhead; close enough to bound the cache
+    return sum(len(value) if isinstance(value, (str, bytes)) else 16 for row in rows for value in row) + 64
+
+
+query_cache = QueryCache()
+
+
+def invalidate(table):
+    """Call after a commit that changed table, so cached results of it are not served again."""
+    query_cache.invalidate(table)
+
+
+def read_connection(db_path):
+    """
+    A read-only connection per thread and database, kept open so sqlite3's statement
+    cache reuses the prepared statements of repeated query shapes.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+        connections[db_path] = conn
+    return conn
+
+
+def table_columns(db_path, table):
+    return [column[1] for column in read_connection(db_path).execute(f"PRAGMA table_info({table})")]
+
+
+@metrics.timed("sqlite_query")
+def cached_query(db_path, table, sql, parameters=()):
+    """
+    Run a parameterised read of table, or serve it from the cache. The SQL text depends
+    only on the shape of a query, never on its values, so it is prepared once per shape.
+    """
+    key = (db_path, sql, tuple(parameters))
+    if CACHE_BYTES:
+        rows = query_cache.get(table, key)
+        if rows is not None:
+            metrics.query_cache_requests.labels(table, "hit").inc()
+            return rows
+        metrics.query_cache_requests.labels(table, "miss").inc()
+
+    generation = query_cache.generation(table)
+    rows = read_connection(db_path).execute(sql, parameters).fetchall()
+    if CACHE_BYTES:
+        query_cache.put(table, key, rows, generation)
+    return rows
+
+
+def encode_cursor(values):
+    """Opaque page token for keyset pagination: the sort key of the last row returned."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    return values
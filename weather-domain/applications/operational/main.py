@@ -1,10 +1,10 @@
 from fastapi import FastAPI
-import pandas as pd
 import requests
 from minio import Minio
-from io import BytesIO
 import json
 from utilities.kafka_rest_proxy_exporter import KafkaRESTProxyExporter
+from utilities import merged_weather_data
+from utilities.settings import settings
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
@@ -14,40 +14,43 @@ from opentelemetry.trace import SpanKind
 app = FastAPI()
 FastAPIInstrumentor.instrument_app(app)
 
-SERVICE_ADDRESS = "http://localhost:8006"
+SERVICE_ADDRESS = settings.SERVICE_ADDRESS or "http://localhost:8006"
 SERVICE_NAME = "WEATHER_DOMAIN_OPERATIONAL_SERVICE"
 SERVICE_VERSION = "1.0.0"
 ENVIRONMENT = "production"
-KAFKA_REST_PROXY_URL = "http://localhost/kafka-rest-proxy"
+KAFKA_REST_PROXY_URL = settings.KAFKA_REST_PROXY_URL
 
 # Setting up the trace provider
 trace.set_tracer_provider(TracerProvider())
 
 kafka_exporter = KafkaRESTProxyExporter(topic_name="telemetry-data", rest_proxy_url=KAFKA_REST_PROXY_URL, service_name=SERVICE_NAME, service_address=SERVICE_ADDRESS)
-span_processor = BatchSpanProcessor(kafka_exporter)
+span_processor = BatchSpanProcessor(
+    kafka_exporter,
+    max_queue_size=settings.TELEMETRY_QUEUE_SIZE,
+    schedule_delay_millis=settings.TELEMETRY_EXPORT_DELAY_MS,
+    max_export_batch_size=settings.TELEMETRY_EXPORT_BATCH_SIZE
+)
 trace.get_tracer_provider().add_span_processor(span_processor)
 
 # Setting up OpenTelemetry
 tracer = trace.get_tracer(__name__)
 
-# Load your CSV data
-df1 = pd.read_csv('temperature.csv')
-df2 = pd.read_csv('precipitation.csv')
-
-# Merge the dataframes on the 'date' column
-merged_df = pd.merge(df1, df2, on='date')
+# temperature.csv and precipitation.csv are merged lazily on the first store call,
+# see utilities/merged_weather_data.py
 cluster_id = None 
-kafka_rest_proxy_base_url = "http://localhost/kafka-rest-proxy"
-minio_url = "localhost:9001"
-minio_acces_key = "minioadmin"
-minio_secret_key = "minioadmin"
+kafka_rest_proxy_base_url = settings.KAFKA_REST_PROXY_URL
+minio_url = settings.MINIO_ENDPOINT
+minio_acces_key = settings.MINIO_ACCESS_KEY
+minio_secret_key = settings.MINIO_SECRET_KEY
+UPLOAD_PART_SIZE = settings.MINIO_PART_SIZE  # At least MinIO's minimum multipart part size of 5 MiB
+UPLOAD_PARALLEL_PARTS = settings.MINIO_PARALLEL_PARTS
 
 # Initialize the Minio client
 minio_client = Minio(
     minio_url,
     access_key=minio_acces_key,
     secret_key=minio_secret_key,
-    secure=False
+    secure=settings.MINIO_SECURE
 )
 
 # Running this on startup 
@@ -116,9 +119,9 @@ async def produce_to_kafka(topic: str = 'domain-weather-operational-data'):
 
         span.add_event("Storing merged data in Minio")
 
-        # Store the merged data in Minio
-        csv_data = merged_df.to_csv(index=False).encode('utf-8')
-        csv_bytes = BytesIO(csv_data)
+        # Stream the merged data to Minio part by part; the rendered chunks are reused
+        # while the input files are unchanged
+        csv_stream = merged_weather_data.MergedCsvStream(merged_weather_data.iter_merged_csv_bytes())
         min_io_bucket_name = "weather-domain-operational-data"
         min_io_object_name = "merged_data-v2.5.csv"
 
@@ -132,8 +135,10 @@ async def produce_to_kafka(topic: str = 'domain-weather-operational-data'):
         minio_client.put_object(
             bucket_name=min_io_bucket_name,
             object_name=min_io_object_name,
-            data=csv_bytes,
-            length=len(csv_data),
+            data=csv_stream,
+            length=-1,
+            part_size=UPLOAD_PART_SIZE,
+            num_parallel_uploads=UPLOAD_PARALLEL_PARTS,
             content_type='text/csv',
         )
 
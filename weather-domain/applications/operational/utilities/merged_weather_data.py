@@ -0,0 +1,96 @@
+import io
+import os
+import threading
+import pandas as pd
+from utilities.settings import settings
+
+TEMPERATURE_CSV = 'temperature.csv'
+PRECIPITATION_CSV = 'precipitation.csv'
+MERGE_CHUNK_ROWS = settings.MERGE_CHUNK_ROWS  # Rows rendered to CSV per chunk
+CACHE_RENDERED_CSV = settings.CACHE_RENDERED_CSV  # Keep one encoded copy of the dataset between store calls
+
+# Encoded CSV chunks, keyed by the (path, mtime, size) of both inputs
+_rendered_csv = {"signature": None, "chunks": None}
+_rendered_csv_lock = threading.Lock()
+
+
+def input_signature():
+    signature = []
+    for path in (TEMPERATURE_CSV, PRECIPITATION_CSV):
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def load_merged_df():
+    """Read both inputs and merge them on 'date'. Nothing is kept resident."""
+    temperature_df = pd.read_csv(TEMPERATURE_CSV)
+    precipitation_df = pd.read_csv(PRECIPITATION_CSV)
+
+    merged_df = pd.merge(temperature_df, precipitation_df, on='date')
+    return merged_df.sort_values('date', kind='stable', ignore_index=True)
+
+
+def iter_merged_csv_chunks(chunk_rows=MERGE_CHUNK_ROWS):
+    """Yield the merged dataset as date-sorted CSV text chunks, header first."""
+    merged_df = load_merged_df()
+
+    for start in range(0, len(merged_df), chunk_rows):
+        yield merged_df.iloc[start:start + chunk_rows].to_csv(index=False, header=(start == 0))
+
+    if merged_df.empty:
+        yield merged_df.to_csv(index=False)
+
+
+def iter_merged_csv_bytes():
+    """
+    Yield the merged dataset as UTF-8 CSV chunks. The merge runs on first use and the
+    encoded chunks are reused until either input file's mtime or size changes.
+    """
+    signature = input_signature()
+    with _rendered_csv_lock:
+        cached_chunks = _rendered_csv["chunks"] if _rendered_csv["signature"] == signature else None
+
+    if cached_chunks is not None:
+        yield from cached_chunks
+        return
+
+    rendered_chunks = []
+    for chunk in iter_merged_csv_chunks():
+        data = chunk.encode('utf-8')
+        if CACHE_RENDERED_CSV:
+            rendered_chunks.append(data)
+        yield data
+
+    if CACHE_RENDERED_CSV:
+        with _rendered_csv_lock:
+            _rendered_csv["signature"] = signature
+            _rendered_csv["chunks"] = rendered_chunks
+
+
+class MergedCsvStream(io.RawIOBase):
+    """
+    Read-only file object over a chunk iterator, so put_object can pull the CSV one
+    multipart part at a time instead of needing the whole payload up front.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = bytearray()
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._pending += chunk
+
+        if size < 0:
+            size = len(self._pending)
+
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data